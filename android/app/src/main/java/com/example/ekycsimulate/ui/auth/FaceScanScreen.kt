@@ -66,6 +66,7 @@ fun FaceScanScreen(
     var isRecording by remember { mutableStateOf(false) }
 
     var videoUri by remember { mutableStateOf<Uri?>(null) }
+    var faceFrames by remember { mutableStateOf<List<Bitmap>>(emptyList()) } // sent with the enrollment
     var recording by remember { mutableStateOf<Recording?>(null) }
     var videoCapture by remember { mutableStateOf<VideoCapture<Recorder>?>(null) }
 
@@ -209,6 +210,7 @@ fun FaceScanScreen(
                         enrollmentPayload = null
                         zkpDetails = null
                         videoUri = null
+                        faceFrames = emptyList()
                         debugLog = "Sẵn sàng."
                     },
                     modifier = Modifier.fillMaxWidth()
@@ -253,7 +255,8 @@ fun FaceScanScreen(
                         fullName = idCardInfo.fullName,
                         phoneNumber = "", // You can add input fields for these
                         address = idCardInfo.address,
-                        faceImageApproval = approvalStatus
+                        faceImageApproval = approvalStatus,
+                        faceFrames = faceFrames.ifEmpty { listOfNotNull(capturedImage) }
                     )
                     
                     enrollmentDataObj = enrollmentData
@@ -446,6 +449,7 @@ fun FaceScanScreen(
                                                                         
                                                                         if (ekycResult.livenessProb > livenessThreshold && 
                                                                             ekycResult.matchingScore > matchingThreshold) {
+                                                                            faceFrames = frames // Server checks this face for duplicates
                                                                             approvalStatus = 1 // Approved
                                                                             sendError = null
                                                                             debugLog = "✅ Xác thực thành công!\nLiveness: ${ekycResult.livenessProb}\nMatching: ${ekycResult.matchingScore}\n"
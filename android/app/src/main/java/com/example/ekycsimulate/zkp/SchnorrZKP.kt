@@ -55,7 +55,10 @@ object SchnorrZKP {
         // Data binding fields (proves data came from OCR and Face Scan)
         val fullNameHash: String,        // SHA256 of full name (from OCR)
         val dobHash: String,             // SHA256 of date of birth (from OCR)
-        val approval: Int                // Face scan approval status (from AI model)
+        val approval: Int,               // Face scan approval status (from AI model)
+        // Base64 JPEG frames of the face video; the server computes the face
+        // embedding from them for its duplicate-face check
+        val faceFrames: List<String>? = null
     )
 
     @Serializable
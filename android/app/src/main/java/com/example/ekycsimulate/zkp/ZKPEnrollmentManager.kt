@@ -2,9 +2,14 @@ package com.example.ekycsimulate.zkp
 
 import android.content.Context
 import android.content.SharedPreferences
+import android.graphics.Bitmap
+import android.util.Base64
 import com.example.ekycsimulate.ui.auth.IdCardInfo
+import org.json.JSONArray
 import org.json.JSONObject
+import java.io.ByteArrayOutputStream
 import java.math.BigInteger
+import java.security.MessageDigest
 
 /**
  * Manages ZKP enrollment process
@@ -30,6 +35,7 @@ class ZKPEnrollmentManager(private val context: Context) {
      * @param phoneNumber User's phone number
      * @param address User's address
      * @param faceImageApproval Approval status from face scan (1 = approved)
+     * @param faceFrames Frames of the face video, sent for the server's duplicate-face check
      * @return Enrollment data ready to send to server
      */
     fun performEnrollment(
@@ -37,7 +43,8 @@ class ZKPEnrollmentManager(private val context: Context) {
         fullName: String,
         phoneNumber: String,
         address: String,
-        faceImageApproval: Int
+        faceImageApproval: Int,
+        faceFrames: List<Bitmap> = emptyList()
     ): EnrollmentData {
         
         // 1. Generate key pair
@@ -69,6 +76,7 @@ class ZKPEnrollmentManager(private val context: Context) {
         // IMPORTANT: Message binds OCR data and approval to the proof
         // This proves the data came from OCR module and Face Scan passed
         val currentTimestamp = System.currentTimeMillis()
+        val encodedFrames = faceFrames.map { encodeFrame(it) }.ifEmpty { null }
         
         val enrollmentMessage = buildEnrollmentMessage(
             commitment = commitment,
@@ -76,7 +84,8 @@ class ZKPEnrollmentManager(private val context: Context) {
             fullNameHash = SchnorrZKP.sha256(fullName),
             dobHash = SchnorrZKP.sha256(idCardInfo.dob),
             approval = faceImageApproval,
-            timestamp = currentTimestamp
+            timestamp = currentTimestamp,
+            faceDigest = encodedFrames?.let { faceDigest(it) }
         )
         
         val proof = SchnorrZKP.generateProof(keyPair.privateKey, enrollmentMessage)
@@ -96,7 +105,8 @@ class ZKPEnrollmentManager(private val context: Context) {
             // Binding data proves OCR extraction and Face Scan approval
             fullNameHash = SchnorrZKP.sha256(fullName),
             dobHash = SchnorrZKP.sha256(idCardInfo.dob),
-            approval = faceImageApproval
+            approval = faceImageApproval,
+            faceFrames = encodedFrames?.map { Base64.encodeToString(it, Base64.NO_WRAP) }
         )
         
         // 8. Store private key securely on device
@@ -111,6 +121,7 @@ class ZKPEnrollmentManager(private val context: Context) {
     /**
      * Build enrollment message that binds OCR data and approval
      * This message is used in ZKP proof generation
+     * With face frames, ":face:<faceDigest>" is appended so they cannot be swapped
      */
     private fun buildEnrollmentMessage(
         commitment: String,
@@ -118,15 +129,35 @@ class ZKPEnrollmentManager(private val context: Context) {
         fullNameHash: String,
         dobHash: String,
         approval: Int,
-        timestamp: Long
+        timestamp: Long,
+        faceDigest: String? = null
     ): String {
-        return "ENROLL:" +
+        val message = "ENROLL:" +
                 "commitment:$commitment:" +
                 "id:$idNumberHash:" +
                 "name:$fullNameHash:" +
                 "dob:$dobHash:" +
                 "approval:$approval:" +
                 "ts:$timestamp"
+        return if (faceDigest != null) "$message:face:$faceDigest" else message
+    }
+
+    /**
+     * JPEG bytes of one face frame at the model's 224x224 input size
+     */
+    private fun encodeFrame(frame: Bitmap): ByteArray {
+        val out = ByteArrayOutputStream()
+        Bitmap.createScaledBitmap(frame, 224, 224, true).compress(Bitmap.CompressFormat.JPEG, 90, out)
+        return out.toByteArray()
+    }
+
+    /**
+     * SHA-256 over the SHA-256 of each frame, in order (schemas.face_digest on the server)
+     */
+    private fun faceDigest(frames: List<ByteArray>): String {
+        val digest = MessageDigest.getInstance("SHA-256")
+        frames.forEach { digest.update(MessageDigest.getInstance("SHA-256").digest(it)) }
+        return digest.digest().joinToString("") { "%02x".format(it) }
     }
 
     /**
@@ -262,6 +293,7 @@ class ZKPEnrollmentManager(private val context: Context) {
             put("fullNameHash", payload.fullNameHash)
             put("dobHash", payload.dobHash)
             put("approval", payload.approval)
+            payload.faceFrames?.let { put("faceFrames", JSONArray(it)) }
         }.toString(2) // Pretty print with indent
     }
 
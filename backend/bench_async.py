@@ -0,0 +1,119 @@
+"""
+Login throughput vs. proof-pool size.
+
+Starts a local uvicorn server on a temporary SQLite database for each
+configuration, enrolls a set of users, pre-generates their login proofs
+(so the client is not the bottleneck) and then fires /api/verify with a
+fixed number of requests in flight. Reports successful logins per second
+(and the failed logins separately) for the sync server and for the async
+server with 1, 2, 4, ... proof workers.
+
+Usage:
+    python bench_async.py [--users 50] [--logins 400] [--concurrency 32] [--workers 1,2,4]
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+import client_proofs
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(app: str, port: int, db_path: str, proof_workers: int) -> subprocess.Popen:
+    env = dict(os.environ,
+               DATABASE_URL=f"sqlite:///{db_path}",
+               PROOF_WORKERS=str(proof_workers))
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app, "--port", str(port), "--log-level", "warning"],
+        cwd=HERE, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/api/admin/stats", timeout=1)
+            return proc
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError(f"{app} did not start")
+
+
+async def run(base_url: str, users: int, logins: int, concurrency: int) -> tuple:
+    """(successful logins per second, failed logins)."""
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        keys = [client_proofs.generate_key() for _ in range(users)]
+        for sk in keys:
+            r = await client.post("/api/enroll", json=client_proofs.enrollment_payload(sk))
+            r.raise_for_status()
+
+        # Challenges and proofs are prepared up front
+        requests = []
+        for i in range(logins):
+            session_id = (await client.get("/api/challenge")).json()["sessionId"]
+            requests.append((session_id, client_proofs.verification_payload(keys[i % users], session_id)))
+
+        queue = asyncio.Queue()
+        for item in requests:
+            queue.put_nowait(item)
+        failures = 0
+
+        async def worker():
+            nonlocal failures
+            while not queue.empty():
+                session_id, payload = queue.get_nowait()
+                r = await client.post("/api/verify", params={"sessionId": session_id}, json=payload)
+                if r.status_code != 200:
+                    failures += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return (logins - failures) / elapsed, failures
+
+
+def main():
+    cpu = os.cpu_count() or 1
+    default_workers = ",".join(str(1 << i) for i in range(cpu.bit_length()) if 1 << i <= cpu)
+
+    parser = argparse.ArgumentParser(description="Benchmark sync vs async login throughput")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--logins", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--workers", default=default_workers, help="Comma-separated proof pool sizes")
+    args = parser.parse_args()
+
+    configs = [("sync (main:app)", "main:app", 1)]
+    configs += [(f"async, {n} proof worker(s)", "main_async:app", n)
+                for n in (int(w) for w in args.workers.split(","))]
+
+    print(f"{'configuration':<32}{'logins/s':>10}{'failed':>8}")
+    for label, app, workers in configs:
+        with tempfile.TemporaryDirectory() as tmp:
+            port = free_port()
+            proc = start_server(app, port, os.path.join(tmp, "bench.db"), workers)
+            try:
+                rps, failures = asyncio.run(run(f"http://127.0.0.1:{port}", args.users, args.logins, args.concurrency))
+            finally:
+                proc.terminate()
+                proc.wait()
+        print(f"{label:<32}{rps:>10.1f}{failures:>8}")
+
+
+if __name__ == "__main__":
+    main()
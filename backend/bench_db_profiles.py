@@ -0,0 +1,131 @@
+"""
+Concurrent enroll/verify throughput per database engine profile.
+
+For each DB_PROFILE, starts `uvicorn main:app` (several worker processes,
+stateless challenge tokens so any worker can verify) on a fresh temporary
+SQLite database - or on --database-url, e.g. a scratch Postgres database -
+enrolls a set of users, then replays a pre-generated mix of enrollments and
+logins with a fixed number of requests in flight. Reports operations per
+second, p50/p99 latency and failed requests.
+
+Usage:
+    python bench_db_profiles.py [--profiles default,web,serverless,durable]
+                                [--users 50] [--ops 600] [--enroll-ratio 0.2]
+                                [--concurrency 32] [--server-workers 2]
+                                [--database-url postgresql://...]
+"""
+import argparse
+import asyncio
+import os
+import random
+import secrets
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+import client_proofs
+from bench_async import HERE, free_port
+
+
+def start_server(port: int, database_url: str, profile: str, workers: int) -> subprocess.Popen:
+    env = dict(os.environ,
+               DATABASE_URL=database_url,
+               DB_PROFILE=profile,
+               CHALLENGE_MODE="token",
+               CHALLENGE_SECRET=secrets.token_hex(32))
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=HERE, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/api/admin/stats", timeout=1)
+            return proc
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError(f"server for profile {profile} did not start")
+
+
+async def run(base_url: str, users: int, ops: int, enroll_ratio: float, concurrency: int) -> dict:
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        keys = [client_proofs.generate_key() for _ in range(users)]
+        for sk in keys:
+            (await client.post("/api/enroll", json=client_proofs.enrollment_payload(sk))).raise_for_status()
+
+        # Every request is built up front so the client is not the bottleneck
+        rand = random.Random(0)
+        requests = []
+        for i in range(ops):
+            if rand.random() < enroll_ratio:
+                payload = client_proofs.enrollment_payload(client_proofs.generate_key())
+                requests.append(("enroll", "/api/enroll", {}, payload))
+            else:
+                session_id = (await client.get("/api/challenge")).json()["sessionId"]
+                payload = client_proofs.verification_payload(keys[i % users], session_id)
+                requests.append(("verify", "/api/verify", {"sessionId": session_id}, payload))
+
+        queue = asyncio.Queue()
+        for item in requests:
+            queue.put_nowait(item)
+        latencies = {"enroll": [], "verify": []}
+        failures = 0
+
+        async def worker():
+            nonlocal failures
+            while not queue.empty():
+                kind, path, params, payload = queue.get_nowait()
+                start = time.perf_counter()
+                r = await client.post(path, params=params, json=payload)
+                latencies[kind].append(time.perf_counter() - start)
+                if r.status_code != 200:
+                    failures += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    every = sorted(latencies["enroll"] + latencies["verify"])
+    return {
+        "ops_per_s": ops / elapsed,
+        "p50_ms": statistics.median(every) * 1000,
+        "p99_ms": every[min(len(every) - 1, int(len(every) * 0.99))] * 1000,
+        "failures": failures,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark database engine profiles")
+    parser.add_argument("--profiles", default="default,web,serverless,durable")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--ops", type=int, default=600)
+    parser.add_argument("--enroll-ratio", type=float, default=0.2)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--server-workers", type=int, default=2)
+    parser.add_argument("--database-url", help="Use this database instead of a temporary SQLite file")
+    args = parser.parse_args()
+
+    print(f"{'profile':<12}{'ops/s':>9}{'p50 ms':>9}{'p99 ms':>9}{'failed':>8}")
+    for profile in args.profiles.split(","):
+        with tempfile.TemporaryDirectory() as tmp:
+            database_url = args.database_url or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+            port = free_port()
+            proc = start_server(port, database_url, profile, args.server_workers)
+            try:
+                r = asyncio.run(run(f"http://127.0.0.1:{port}", args.users, args.ops,
+                                    args.enroll_ratio, args.concurrency))
+            finally:
+                proc.terminate()
+                proc.wait()
+        print(f"{profile:<12}{r['ops_per_s']:>9.1f}{r['p50_ms']:>9.1f}{r['p99_ms']:>9.1f}{r['failures']:>8}")
+
+
+if __name__ == "__main__":
+    main()
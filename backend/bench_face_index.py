@@ -0,0 +1,80 @@
+"""
+Duplicate-face lookup latency and recall of face_index.FaceIndex.
+
+Fills an index with --users random unit embeddings (no database), then runs
+--queries searches: half are noisy copies of an enrolled embedding (should
+be found as duplicates), half are new faces (should not). Random vectors
+have no cluster structure, so IVF recall here is a lower bound compared to
+real face embeddings.
+
+Usage:
+    python bench_face_index.py [--users 1000000] [--queries 2000] [--noise 0.2]
+"""
+import argparse
+import statistics
+import time
+
+import numpy as np
+
+from face_index import FaceIndex
+from schemas import FACE_EMBEDDING_DIM
+
+ADD_BATCH = 10000
+
+
+def unit_rows(rand: np.random.Generator, count: int) -> np.ndarray:
+    rows = rand.standard_normal((count, FACE_EMBEDDING_DIM), dtype=np.float32)
+    return rows / np.linalg.norm(rows, axis=1, keepdims=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Face index lookup benchmark")
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--noise", type=float, default=0.2, help="Noise norm added to duplicate queries")
+    parser.add_argument("--lists", type=int, default=1024)
+    parser.add_argument("--probe", type=int, default=8)
+    parser.add_argument("--threshold", type=float, default=0.9)
+    args = parser.parse_args()
+
+    rand = np.random.default_rng(0)
+    targets = np.sort(rand.choice(args.users, size=args.queries // 2, replace=False))
+    enrolled = np.empty((len(targets), FACE_EMBEDDING_DIM), dtype=np.float32)
+    index = FaceIndex(threshold=args.threshold, n_lists=args.lists, n_probe=args.probe)
+    start = time.perf_counter()
+    for first in range(0, args.users, ADD_BATCH):
+        rows = unit_rows(rand, min(ADD_BATCH, args.users - first))
+        index.add_many(np.arange(first, first + len(rows)), rows)
+        # Keep the rows that duplicate queries are made from
+        lo, hi = np.searchsorted(targets, [first, first + len(rows)])
+        enrolled[lo:hi] = rows[targets[lo:hi] - first]
+    index.wait_for_training()
+    stats = index.stats()
+    print(f"Indexed {len(index)} embeddings in {time.perf_counter() - start:.1f} s "
+          f"({stats['mode']}, {stats['size_bytes'] / 2**20:.0f} MB)")
+
+    noisy = enrolled + unit_rows(rand, len(targets)) * args.noise
+    queries = [(int(t), q) for t, q in zip(targets, noisy)]
+    queries += [(None, q) for q in unit_rows(rand, args.queries - len(queries))]
+    rand.shuffle(queries)
+
+    latencies, found, false_matches = [], 0, 0
+    for expected, query in queries:
+        t = time.perf_counter()
+        match = index.find_duplicate(query)
+        latencies.append(time.perf_counter() - t)
+        if expected is not None:
+            found += match is not None and match[0] == expected
+        else:
+            false_matches += match is not None
+
+    latencies.sort()
+    duplicates = len(targets)
+    print(f"search p50 {statistics.median(latencies) * 1000:.2f} ms, "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.2f} ms")
+    print(f"duplicates found {found}/{duplicates} ({found / duplicates:.1%}), "
+          f"false matches {false_matches}/{len(queries) - duplicates}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Row width and lookup latency with inline vs. deferred / compressed PII.
+
+Builds a temporary SQLite database of --users users with Android-sized
+encrypted PII ({"ciphertext": base64(AES-GCM), "iv": ...}, ~400 bytes) once
+with plain and once with compressed (PII_COMPRESSION=1) storage, then times
+the three user lookups the API does:
+
+  full row     - db.query(User) with every column undeferred (the old hot path)
+  login        - load_only(User.id) by public_key (verify / verify batch)
+  citizen      - load_only(User.id, User.created_at) by id_hash (check_citizen)
+
+Usage:
+    python bench_pii.py [--users 1000000] [--lookups 5000]
+"""
+import argparse
+import base64
+import json
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+INSERT_BATCH = 10000
+
+
+def fake_pii(rand: random.Random) -> str:
+    # PIIEncryption.encryptedDataToJson: AES-GCM over the ~250-byte PII JSON
+    ciphertext = base64.b64encode(rand.randbytes(266)).decode()
+    iv = base64.b64encode(rand.randbytes(12)).decode()
+    return json.dumps({"ciphertext": ciphertext, "iv": iv}, separators=(",", ":"))
+
+
+def fake_proof(rand: random.Random) -> dict:
+    return {"commitmentR": "02" + rand.randbytes(32).hex(),
+            "challenge": rand.randbytes(32).hex(), "response": rand.randbytes(32).hex()}
+
+
+def populate(users: int):
+    from sqlalchemy import insert
+    import models
+    from database import engine
+
+    rand = random.Random(0)
+    models.Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        for start in range(0, users, INSERT_BATCH):
+            conn.execute(insert(models.User), [{
+                "public_key": "02" + rand.randbytes(32).hex(),
+                "commitment": rand.randbytes(32).hex(),
+                "id_hash": rand.randbytes(32).hex(),
+                "encrypted_pii": fake_pii(rand),
+                "enrollment_proof": fake_proof(rand),
+            } for _ in range(min(INSERT_BATCH, users - start))])
+
+
+def run_layout(users: int, lookups: int) -> dict:
+    """Runs in a child process whose environment selects the storage layout."""
+    from sqlalchemy.orm import load_only, undefer
+    import models
+    from database import SessionLocal
+
+    populate(users)
+    db_path = os.environ["DATABASE_URL"].replace("sqlite:///", "", 1)
+    with sqlite3.connect(db_path) as conn:
+        page_bytes, payload_bytes = conn.execute(
+            "SELECT SUM(pgsize), SUM(payload) FROM dbstat WHERE name = 'users'").fetchone()
+
+    db = SessionLocal()
+    User = models.User
+    ids = random.Random(1).sample(range(1, users + 1), min(lookups, users))
+    sample = db.query(User.public_key, User.id_hash).filter(User.id.in_(ids)).all()
+    random.Random(2).shuffle(sample)
+
+    queries = {
+        "full row": lambda pk, ih: db.query(User).options(undefer(User.encrypted_pii), undefer(User.enrollment_proof))
+        .filter(User.public_key == pk).first(),
+        "login": lambda pk, ih: db.query(User).options(load_only(User.id)).filter(User.public_key == pk).first(),
+        "citizen": lambda pk, ih: db.query(User).options(load_only(User.id, User.created_at))
+        .filter(User.id_hash == ih).first(),
+    }
+    latency = {}
+    for label, query in queries.items():
+        start = time.perf_counter()
+        for public_key, id_hash in sample:
+            query(public_key, id_hash)
+            db.expunge_all()
+        latency[label] = (time.perf_counter() - start) / len(sample) * 1e6
+    db.close()
+
+    return {"payload_per_row": payload_bytes / users, "pages_per_row": page_bytes / users, "latency_us": latency}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PII storage layouts")
+    parser.add_argument("--users", type=int, default=1000000)
+    parser.add_argument("--lookups", type=int, default=5000)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_layout(args.users, args.lookups)))
+        return
+
+    results = {}
+    for label, compression in (("plain", "0"), ("compressed", "1")):
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+                       PII_COMPRESSION=compression)
+            print(f"Building {args.users} users ({label} PII)...", file=sys.stderr)
+            out = subprocess.run([sys.executable, __file__, "--child", "--users", str(args.users),
+                                  "--lookups", str(args.lookups)],
+                                 cwd=HERE, env=env, check=True, capture_output=True, text=True).stdout
+            results[label] = json.loads(out.strip().splitlines()[-1])
+
+    # payload = record bytes per row, pages = table pages (incl. free space) per row
+    print(f"\n{'PII storage':<12}{'payload B':>10}{'pages B':>9}{'full row us':>13}{'login us':>10}{'citizen us':>12}")
+    for label, r in results.items():
+        lat = r["latency_us"]
+        print(f"{label:<12}{r['payload_per_row']:>10.0f}{r['pages_per_row']:>9.0f}{lat['full row']:>13.1f}"
+              f"{lat['login']:>10.1f}{lat['citizen']:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""
+Offline benchmark suite: zkp microbenchmarks and in-process API macrobenchmarks.
+
+No server or network needed. Payloads are built by client_proofs, which uses
+the same construction as test_deployment.create_enrollment_payload; keys are
+derived from --seed so every run works on the same users.
+
+  micro   zkp.compute_challenge, zkp.hex_to_point, zkp.verify_proof
+          (median / min of --rounds rounds, microseconds per call)
+  macro   POST /api/enroll and POST /api/verify through FastAPI's TestClient
+          against a fresh temporary SQLite database (latency percentiles in
+          ms and sequential requests per second)
+
+Results are written as JSON together with the commit, Python version and
+curve backend, so two runs can be compared:
+
+    python bench_suite.py --out base.json
+    git checkout my-branch
+    python bench_suite.py --out new.json --compare base.json   # exit 1 on regression
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from ecdsa import SigningKey, SECP256k1
+
+import client_proofs
+import zkp
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def make_keys(count: int, seed: int) -> list:
+    rand = random.Random(seed)
+    return [SigningKey.from_secret_exponent(rand.randrange(1, SECP256k1.order), curve=SECP256k1)
+            for _ in range(count)]
+
+
+def per_call_us(fn, args: list, rounds: int) -> dict:
+    """Call fn(*a) for every a in args, `rounds` times; microseconds per call."""
+    for a in args[:10]:
+        fn(*a)
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for a in args:
+            fn(*a)
+        samples.append((time.perf_counter() - start) / len(args) * 1e6)
+    return {"median_us": statistics.median(samples), "min_us": min(samples)}
+
+
+def run_micro(keys: list, rounds: int) -> dict:
+    message = "bench-session|1700000000000"
+    proofs = [client_proofs.schnorr_proof(sk, message) for sk in keys]
+    public_keys = [client_proofs.public_key_hex(sk) for sk in keys]
+    points = [(zkp.hex_to_point(p["commitmentR"]), sk.verifying_key.pubkey.point) for sk, p in zip(keys, proofs)]
+
+    results = {
+        "compute_challenge": per_call_us(zkp.compute_challenge, [(R, P, message) for R, P in points], rounds),
+        "hex_to_point": per_call_us(zkp.hex_to_point, [(pk,) for pk in public_keys], rounds),
+        "verify_proof": per_call_us(zkp.verify_proof,
+                                    [(pk, p, message) for pk, p in zip(public_keys, proofs)], rounds),
+    }
+    if not all(zkp.verify_proof(pk, p, message) for pk, p in zip(public_keys, proofs)):
+        raise RuntimeError("generated proofs do not verify")
+    return results
+
+
+def latency_summary(latencies: list, failures: int) -> dict:
+    ordered = sorted(latencies)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(len(ordered) * q))] * 1000
+    return {
+        "requests": len(ordered),
+        "failures": failures,
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "p50_ms": pick(0.50),
+        "p90_ms": pick(0.90),
+        "p99_ms": pick(0.99),
+        "requests_per_s": len(ordered) / sum(ordered),
+    }
+
+
+def run_macro(keys: list) -> dict:
+    # main binds its engine at import time, so DATABASE_URL must be set first
+    from fastapi.testclient import TestClient
+    import main
+
+    client = TestClient(main.app)
+    enroll_payloads = [client_proofs.enrollment_payload(sk, id_number=f"BENCH_{i:08d}") for i, sk in enumerate(keys)]
+    latencies, failures = [], 0
+    for payload in enroll_payloads:
+        start = time.perf_counter()
+        r = client.post("/api/enroll", json=payload)
+        latencies.append(time.perf_counter() - start)
+        failures += r.status_code != 200
+    results = {"enroll": latency_summary(latencies, failures)}
+
+    # Challenges and proofs are prepared up front; only /api/verify is timed
+    logins = []
+    for sk in keys:
+        session_id = client.get("/api/challenge").json()["sessionId"]
+        logins.append((session_id, client_proofs.verification_payload(sk, session_id)))
+    latencies, failures = [], 0
+    for session_id, payload in logins:
+        start = time.perf_counter()
+        r = client.post("/api/verify", params={"sessionId": session_id}, json=payload)
+        latencies.append(time.perf_counter() - start)
+        failures += r.status_code != 200
+    results["verify"] = latency_summary(latencies, failures)
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# Metrics where larger is better; everything else (times) should not grow
+HIGHER_IS_BETTER = {"requests_per_s"}
+# p99 of a few hundred requests is too noisy to gate on; it is still recorded
+COMPARED = {"median_us", "p50_ms", "requests_per_s"}
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """(name, baseline, current, change) for every metric worse by more than `threshold`."""
+    regressions = []
+    for section in ("micro", "macro"):
+        for bench, values in current.get(section, {}).items():
+            for metric, value in values.items():
+                old = baseline.get(section, {}).get(bench, {}).get(metric)
+                if metric not in COMPARED or not old:
+                    continue
+                change = (value - old) / old
+                worse = -change if metric in HIGHER_IS_BETTER else change
+                if worse > threshold:
+                    regressions.append((f"{section}.{bench}.{metric}", old, value, change))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline zkp / API benchmark suite")
+    parser.add_argument("--proofs", type=int, default=200, help="Proofs per microbenchmark round")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--requests", type=int, default=200, help="Users enrolled and logged in by the macrobenchmark")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skip-macro", action="store_true")
+    parser.add_argument("--out", help="Write results to this JSON file")
+    parser.add_argument("--compare", metavar="BASELINE", help="Fail if results regress against this JSON file")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Allowed relative regression (default 0.15)")
+    args = parser.parse_args()
+
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "time": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "zkp_backend": zkp.backend.name,
+            "args": {k: v for k, v in vars(args).items() if k not in ("out", "compare")},
+        },
+        "micro": run_micro(make_keys(args.proofs, args.seed), args.rounds),
+    }
+    for name, r in results["micro"].items():
+        print(f"{name:<20}{r['median_us']:>10.1f} us  (min {r['min_us']:.1f})")
+
+    if not args.skip_macro:
+        with tempfile.TemporaryDirectory() as tmp:
+            os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+            os.environ.setdefault("LOG_SUCCESS_SAMPLE", "0")
+            results["macro"] = run_macro(make_keys(args.requests, args.seed + 1))
+        for name, r in results["macro"].items():
+            print(f"/api/{name:<15}{r['p50_ms']:>10.2f} ms p50 {r['p99_ms']:>8.2f} ms p99 "
+                  f"{r['requests_per_s']:>8.1f} req/s  ({r['failures']} failed)")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for name, old, new, change in regressions:
+            print(f"REGRESSION {name}: {old:.2f} -> {new:.2f} ({change:+.0%})")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold:.0%} against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
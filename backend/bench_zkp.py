@@ -0,0 +1,77 @@
+"""
+Microbenchmark: Schnorr verification cost per proof.
+
+Runs zkp.verify_proof and zkp.verify_proofs_batch on every available curve
+backend (see ec_backend.py) and reports the speedup over the reference
+"ecdsa" backend, which is the original python-ecdsa path (generator*s and
+R + P*c as two separate multiplications).
+
+Usage:
+    python bench_zkp.py [--proofs 50] [--rounds 5]
+"""
+import argparse
+import time
+
+from ecdsa import SigningKey, SECP256k1
+
+import ec_backend
+import zkp
+
+
+def make_proof(message: str):
+    """Build a valid (public_key_hex, proof, message) triple the way the client does."""
+    sk = SigningKey.generate(curve=SECP256k1)
+    r = SigningKey.generate(curve=SECP256k1)
+    P = sk.verifying_key.pubkey.point
+    R = r.verifying_key.pubkey.point
+
+    c = zkp.compute_challenge(R, P, message)
+    x = int.from_bytes(sk.to_string(), byteorder='big')
+    s = (int.from_bytes(r.to_string(), byteorder='big') + c * x) % SECP256k1.order
+
+    proof = {
+        "commitmentR": zkp.point_to_hex(R),
+        "challenge": zkp.int_to_hex(c),
+        "response": zkp.int_to_hex(s)
+    }
+    return zkp.point_to_hex(P), proof, message
+
+
+def best_per_proof(fn, items, rounds: int) -> float:
+    """Best-of-N wall time per proof, in microseconds."""
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn(items)
+        best = min(best, time.perf_counter() - start)
+    return best / len(items) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Schnorr proof verification")
+    parser.add_argument("--proofs", type=int, default=50, help="Number of distinct proofs")
+    parser.add_argument("--rounds", type=int, default=5, help="Repetitions (best is reported)")
+    args = parser.parse_args()
+
+    items = [make_proof(f"VERIFY:bench-{i}:0") for i in range(args.proofs)]
+
+    rows = []
+    for name in ec_backend.available_backends():
+        curve_backend = ec_backend.get_backend(name)
+        assert all(zkp.verify_proof(*x, curve_backend=curve_backend) for x in items)
+        assert all(zkp.verify_proofs_batch(items, curve_backend))
+
+        single = best_per_proof(lambda xs: [zkp.verify_proof(*x, curve_backend=curve_backend) for x in xs],
+                                items, args.rounds)
+        batch = best_per_proof(lambda xs: zkp.verify_proofs_batch(xs, curve_backend), items, args.rounds)
+        rows.append((f"{name} verify_proof", single))
+        rows.append((f"{name} verify_proofs_batch", batch))
+
+    reference = rows[0][1]
+    print(f"{'path':<36}{'us/proof':>12}{'speedup':>10}")
+    for name, value in rows:
+        print(f"{name:<36}{value:>12.1f}{reference / value:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Bulk enrollment client.
+
+Streams an NDJSON file of /api/enroll payloads (one per line) to
+POST /api/enroll/bulk and writes the per-record results as NDJSON. Lines are
+validated against EnrollmentPayload before upload so malformed records are
+reported locally (after the server's results) instead of costing a round trip.
+
+Usage:
+    python bulk_enroll.py payloads.ndjson [--url http://localhost:8001] [--out results.ndjson]
+    python bulk_enroll.py payloads.ndjson --direct        # ingest into DATABASE_URL, no server
+    python bulk_enroll.py --generate 1000 > payloads.ndjson   # synthetic test data
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+import httpx
+from pydantic import ValidationError
+
+from schemas import EnrollmentPayload
+
+
+def read_valid_lines(path: str, rejects: list):
+    """
+    Yield raw NDJSON lines that parse as EnrollmentPayload and collect the
+    rest; invalid lines are sent as blank lines so server line numbers match.
+    """
+    with open(path, "rb") as f:
+        for line_no, raw in enumerate(f, start=1):
+            if not raw.strip():
+                yield b"\n"
+                continue
+            try:
+                EnrollmentPayload.model_validate_json(raw)
+            except ValidationError as e:
+                rejects.append({"line": line_no, "success": False,
+                                "detail": f"Invalid payload: {e.errors()[0]['msg']}"})
+                yield b"\n"
+                continue
+            yield raw if raw.endswith(b"\n") else raw + b"\n"
+
+
+def upload(path: str, url: str, out, rejects: list) -> int:
+    """Stream the file to the server; returns the number of records enrolled."""
+    enrolled = 0
+    with httpx.Client(base_url=url, timeout=None) as client:
+        with client.stream("POST", "/api/enroll/bulk", content=read_valid_lines(path, rejects),
+                           headers={"Content-Type": "application/x-ndjson"}) as r:
+            r.raise_for_status()
+            for line in r.iter_lines():
+                if line:
+                    enrolled += json.loads(line)["success"]
+                    out.write(line + "\n")
+    return enrolled
+
+
+async def ingest_direct(path: str, out, rejects: list) -> int:
+    """Run the server-side ingestion pipeline in-process against DATABASE_URL."""
+    import enroll_ingest
+    import face_index
+    import models
+    import proof_pool
+    from database import engine, SessionLocal
+
+    models.Base.metadata.create_all(bind=engine)
+
+    async def chunks():
+        for raw in read_valid_lines(path, rejects):
+            yield raw
+
+    enrolled = 0
+    try:
+        async for line in enroll_ingest.ingest_ndjson(chunks(), SessionLocal, face_index=face_index.from_env()):
+            enrolled += json.loads(line)["success"]
+            out.write(line)
+    finally:
+        proof_pool.shutdown()
+    return enrolled
+
+
+def generate(count: int):
+    import client_proofs
+    for _ in range(count):
+        print(json.dumps(client_proofs.enrollment_payload(client_proofs.generate_key())))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-enroll users from an NDJSON file")
+    parser.add_argument("path", nargs="?", help="NDJSON file, one enrollment payload per line")
+    parser.add_argument("--url", default="http://localhost:8001")
+    parser.add_argument("--out", help="Write results here instead of stdout")
+    parser.add_argument("--direct", action="store_true", help="Ingest in-process instead of over HTTP")
+    parser.add_argument("--generate", type=int, metavar="N", help="Print N synthetic payloads and exit")
+    args = parser.parse_args()
+
+    if args.generate:
+        generate(args.generate)
+        return
+    if not args.path:
+        parser.error("path is required")
+
+    rejects = []
+    out = open(args.out, "w") if args.out else sys.stdout
+    start = time.perf_counter()
+    try:
+        if args.direct:
+            enrolled = asyncio.run(ingest_direct(args.path, out, rejects))
+        else:
+            enrolled = upload(args.path, args.url, out, rejects)
+        for reject in rejects:
+            out.write(json.dumps(reject) + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    elapsed = time.perf_counter() - start
+
+    print(f"Enrolled {enrolled} record(s), {len(rejects)} rejected locally, "
+          f"in {elapsed:.1f}s ({enrolled / elapsed:.1f} enrollments/s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
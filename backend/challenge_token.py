@@ -0,0 +1,73 @@
+"""
+Stateless login challenges.
+
+Instead of remembering issued session ids per process, the server can hand
+out self-contained tokens
+
+    v1.<issued_ms>.<expires_ms>.<nonce>.<mac>
+
+where mac = HMAC-SHA256(key, "v1.<issued_ms>.<expires_ms>.<nonce>"),
+base64url encoded. Any worker or instance holding the key can check a token
+without shared state. Tokens are single-use: a successful login records the
+nonce in the used_challenges table (main.claim_challenges) together with the
+verification log, whose primary key rejects a second use on any worker until the token has expired.
+All parts are URL safe, so the token is used as the `sessionId` verbatim.
+"""
+import base64
+import hashlib
+import hmac
+import secrets
+import time
+
+TOKEN_VERSION = "v1"
+
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+class ChallengeSigner:
+    def __init__(self, keys: list, ttl_seconds: float = 300):
+        """
+        `keys` are raw secret bytes; the first one signs new tokens and all of
+        them are accepted when verifying, so keys can be rotated without
+        invalidating challenges that are still in flight.
+        """
+        if not keys:
+            raise ValueError("ChallengeSigner needs at least one key")
+        self.keys = keys
+        self.ttl_ms = int(ttl_seconds * 1000)
+
+    def _mac(self, key: bytes, body: str) -> str:
+        return _b64(hmac.new(key, body.encode("ascii"), hashlib.sha256).digest())
+
+    def issue(self) -> str:
+        issued_ms = int(time.time() * 1000)
+        body = f"{TOKEN_VERSION}.{issued_ms}.{issued_ms + self.ttl_ms}.{_b64(secrets.token_bytes(16))}"
+        return f"{body}.{self._mac(self.keys[0], body)}"
+
+    def verify(self, token: str):
+        """Issue time (ms since epoch) of a valid, unexpired token, or None."""
+        claims = self.claims(token)
+        return claims[0] if claims is not None else None
+
+    def claims(self, token: str):
+        """(issued_ms, expires_ms, nonce) of a valid, unexpired token, or None."""
+        parts = token.split(".")
+        if len(parts) != 5 or parts[0] != TOKEN_VERSION:
+            return None
+        body, mac = token.rsplit(".", 1)
+        if not any(hmac.compare_digest(mac, self._mac(key, body)) for key in self.keys):
+            return None
+        try:
+            issued_ms, expires_ms = int(parts[1]), int(parts[2])
+        except ValueError:
+            return None
+        if expires_ms < int(time.time() * 1000):
+            return None
+        return issued_ms, expires_ms, parts[3]
+
+
+def load_keys(value: str) -> list:
+    """Comma-separated hex keys (newest first), e.g. from CHALLENGE_SECRET."""
+    return [bytes.fromhex(part.strip()) for part in value.split(",") if part.strip()]
@@ -0,0 +1,100 @@
+"""
+Client-side proof construction for benchmarks and load tests.
+
+Builds /api/enroll and /api/verify payloads exactly like the Android client
+(and test_deployment.create_enrollment_payload) does, but from a key the
+caller keeps, so the same user can enroll and then log in.
+"""
+import base64
+import hashlib
+import time
+import uuid
+
+from ecdsa import SigningKey, SECP256k1
+
+from schemas import face_digest
+from zkp import compute_challenge, point_to_hex, int_to_hex
+
+
+def generate_key() -> SigningKey:
+    return SigningKey.generate(curve=SECP256k1)
+
+
+def schnorr_proof(sk: SigningKey, message: str) -> dict:
+    """Schnorr proof of knowledge of sk bound to message: (R, c, s = r + c*x)."""
+    r = SigningKey.generate(curve=SECP256k1)
+    R = r.verifying_key.pubkey.point
+    c = compute_challenge(R, sk.verifying_key.pubkey.point, message)
+    x = int.from_bytes(sk.to_string(), byteorder='big')
+    s = (int.from_bytes(r.to_string(), byteorder='big') + c * x) % SECP256k1.order
+    return {
+        "commitmentR": point_to_hex(R),
+        "challenge": int_to_hex(c),
+        "response": int_to_hex(s)
+    }
+
+
+def public_key_hex(sk: SigningKey) -> str:
+    return point_to_hex(sk.verifying_key.pubkey.point)
+
+
+def enrollment_payload(sk: SigningKey, id_number: str = None, face_frames: list = None) -> dict:
+    """face_frames: encoded images (JPEG/PNG bytes) of the face clip, sent as faceFrames."""
+    id_number = id_number or f"ID_{uuid.uuid4()}"
+    timestamp = int(time.time() * 1000)
+    approval = 1
+    id_hash = hashlib.sha256(id_number.encode()).hexdigest()
+    name_hash = hashlib.sha256(b"Test User").hexdigest()
+    dob_hash = hashlib.sha256(b"1990-01-01").hexdigest()
+
+    # The commitment is R from the proof itself, so R must be fixed before
+    # the message is built: draw r here instead of inside schnorr_proof
+    r = SigningKey.generate(curve=SECP256k1)
+    R = r.verifying_key.pubkey.point
+    commitment_hex = point_to_hex(R)
+    message = (f"ENROLL:commitment:{commitment_hex}:"
+               f"id:{id_hash}:"
+               f"name:{name_hash}:"
+               f"dob:{dob_hash}:"
+               f"approval:{approval}:"
+               f"ts:{timestamp}")
+    if face_frames is not None:
+        face_frames = [base64.b64encode(frame).decode("ascii") for frame in face_frames]
+        message += f":face:{face_digest(face_frames)}"
+    c = compute_challenge(R, sk.verifying_key.pubkey.point, message)
+    x = int.from_bytes(sk.to_string(), byteorder='big')
+    s = (int.from_bytes(r.to_string(), byteorder='big') + c * x) % SECP256k1.order
+
+    payload = {
+        "publicKey": public_key_hex(sk),
+        "commitment": commitment_hex,
+        "idNumberHash": id_hash,
+        "encryptedPII": "dummy_encrypted_data",
+        "proof": {
+            "commitmentR": commitment_hex,
+            "challenge": int_to_hex(c),
+            "response": int_to_hex(s)
+        },
+        "timestamp": timestamp,
+        "fullNameHash": name_hash,
+        "dobHash": dob_hash,
+        "approval": approval
+    }
+    if face_frames is not None:
+        payload["faceFrames"] = face_frames
+    return payload
+
+
+def nullifier_for(sk: SigningKey, session_id: str) -> str:
+    """SHA-256(private key hex || session id), as SchnorrZKP.generateNullifier."""
+    return hashlib.sha256((int_to_hex(int.from_bytes(sk.to_string(), "big")) + session_id).encode()).hexdigest()
+
+
+def verification_payload(sk: SigningKey, session_id: str, nullifier: str = None) -> dict:
+    timestamp = int(time.time() * 1000)
+    return {
+        "publicKey": public_key_hex(sk),
+        "proof": schnorr_proof(sk, f"VERIFY:{session_id}:{timestamp}"),
+        "nullifier": nullifier or nullifier_for(sk, session_id),
+        "timestamp": timestamp
+    }
@@ -1,9 +1,84 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
 import os
 
+# Engine profiles (DB_PROFILE). Pool settings apply to Postgres / Cloud SQL,
+# sqlite_* settings to SQLite; any single value can be overridden with the
+# matching DB_* / SQLITE_* variable in _OVERRIDES.
+#   default    - SQLAlchemy and SQLite defaults (rollback journal)
+#   web        - long-running server: bigger pool, WAL
+#   serverless - Cloud Run style instances: small pool, short recycle, WAL
+#   durable    - like web, but fsync on every commit (synchronous=FULL)
+ENGINE_PROFILES = {
+    "default": {},
+    "web": {
+        "pool_size": 10, "max_overflow": 20, "pool_pre_ping": True, "pool_recycle": 1800, "pool_timeout": 30,
+        "sqlite_journal_mode": "WAL", "sqlite_synchronous": "NORMAL",
+        "sqlite_mmap_size": 256 * 1024 * 1024, "sqlite_busy_timeout": 5000,
+    },
+    "serverless": {
+        "pool_size": 2, "max_overflow": 3, "pool_pre_ping": True, "pool_recycle": 300, "pool_timeout": 10,
+        "sqlite_journal_mode": "WAL", "sqlite_synchronous": "NORMAL", "sqlite_busy_timeout": 5000,
+    },
+    "durable": {
+        "pool_size": 10, "max_overflow": 20, "pool_pre_ping": True, "pool_recycle": 1800, "pool_timeout": 30,
+        "sqlite_journal_mode": "WAL", "sqlite_synchronous": "FULL",
+        "sqlite_mmap_size": 256 * 1024 * 1024, "sqlite_busy_timeout": 5000,
+    },
+}
+
+_OVERRIDES = {
+    "pool_size": ("DB_POOL_SIZE", int),
+    "max_overflow": ("DB_MAX_OVERFLOW", int),
+    "pool_pre_ping": ("DB_POOL_PRE_PING", lambda v: v == "1"),
+    "pool_recycle": ("DB_POOL_RECYCLE", int),
+    "pool_timeout": ("DB_POOL_TIMEOUT", float),
+    "sqlite_journal_mode": ("SQLITE_JOURNAL_MODE", str),
+    "sqlite_synchronous": ("SQLITE_SYNCHRONOUS", str),
+    "sqlite_mmap_size": ("SQLITE_MMAP_SIZE", int),
+    "sqlite_busy_timeout": ("SQLITE_BUSY_TIMEOUT_MS", int),
+}
+
+DB_PROFILE = os.getenv("DB_PROFILE", "default")
+
+def _engine_settings() -> dict:
+    if DB_PROFILE not in ENGINE_PROFILES:
+        raise ValueError(f"Unknown DB_PROFILE {DB_PROFILE!r} (choose from {', '.join(ENGINE_PROFILES)})")
+    settings = dict(ENGINE_PROFILES[DB_PROFILE])
+    for name, (var, parse) in _OVERRIDES.items():
+        if os.getenv(var):
+            settings[name] = parse(os.environ[var])
+    return settings
+
+ENGINE_SETTINGS = _engine_settings()
+
+def engine_options(url: str) -> dict:
+    """create_engine keyword arguments for url under the current profile."""
+    if url.startswith("sqlite"):
+        return {}
+    return {k: v for k, v in ENGINE_SETTINGS.items() if not k.startswith("sqlite_")}
+
+def sqlite_pragmas() -> list:
+    """PRAGMA statements run on every new SQLite connection."""
+    return [f"PRAGMA {name}={ENGINE_SETTINGS['sqlite_' + name]}"
+            for name in ("journal_mode", "synchronous", "mmap_size", "busy_timeout")
+            if "sqlite_" + name in ENGINE_SETTINGS]
+
+def configure_sqlite(sync_engine):
+    """Run the profile's PRAGMAs on each connection sync_engine opens."""
+    pragmas = sqlite_pragmas()
+    if not pragmas:
+        return
+
+    @event.listens_for(sync_engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
 # Check if running in Cloud Run with Cloud SQL settings
 # Check if running in Cloud Run with Cloud SQL settings
 if os.getenv("DATABASE_URL"):
@@ -12,7 +87,8 @@ if os.getenv("DATABASE_URL"):
     url = os.environ["DATABASE_URL"]
     if url.startswith("postgres://"):
         url = url.replace("postgres://", "postgresql://", 1)
-    engine = create_engine(url)
+    SQLALCHEMY_DATABASE_URL = url
+    engine = create_engine(url, **engine_options(url))
 elif os.getenv("INSTANCE_CONNECTION_NAME"):
     db_user = os.environ["DB_USER"]
     db_pass = os.environ["DB_PASSWORD"]
@@ -26,7 +102,7 @@ elif os.getenv("INSTANCE_CONNECTION_NAME"):
     # postgresql+psycopg2://<user>:<password>@/<dbname>?host=/cloudsql/<instance_connection_name>
     SQLALCHEMY_DATABASE_URL = f"postgresql+psycopg2://{db_user}:{db_pass}@/{db_name}?host={socket_path}"
     
-    engine = create_engine(SQLALCHEMY_DATABASE_URL)
+    engine = create_engine(SQLALCHEMY_DATABASE_URL, **engine_options(SQLALCHEMY_DATABASE_URL))
 else:
     # Fallback to Local SQLite
     SQLALCHEMY_DATABASE_URL = "sqlite:///./ekyc.db"
@@ -35,6 +111,9 @@ else:
         SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
     )
 
+if SQLALCHEMY_DATABASE_URL.startswith("sqlite"):
+    configure_sqlite(engine)
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
@@ -45,3 +124,31 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# ---------------------------------------------------------------------------
+# Async engine (used by main_async.py only)
+#
+# Created lazily so the sync server does not need aiosqlite/asyncpg installed.
+# ---------------------------------------------------------------------------
+
+_async_sessionmaker = None
+
+def async_database_url(url: str) -> str:
+    """Map a sync SQLAlchemy URL onto the matching asyncio driver."""
+    if url.startswith("sqlite:"):
+        return url.replace("sqlite:", "sqlite+aiosqlite:", 1)
+    for prefix in ("postgresql+psycopg2:", "postgresql:"):
+        if url.startswith(prefix):
+            return url.replace(prefix, "postgresql+asyncpg:", 1)
+    return url
+
+def get_async_sessionmaker():
+    global _async_sessionmaker
+    if _async_sessionmaker is None:
+        from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+        async_engine = create_async_engine(async_database_url(SQLALCHEMY_DATABASE_URL),
+                                           **engine_options(SQLALCHEMY_DATABASE_URL))
+        if SQLALCHEMY_DATABASE_URL.startswith("sqlite"):
+            configure_sqlite(async_engine.sync_engine)
+        _async_sessionmaker = async_sessionmaker(async_engine, expire_on_commit=False)
+    return _async_sessionmaker
@@ -0,0 +1,134 @@
+"""
+Column types for the compact schema (COMPACT_SCHEMA=1) and compressed PII
+(PII_COMPRESSION=1).
+
+Keys, hashes and nullifiers are hex strings everywhere in the API and the
+code; with the compact schema they are stored as raw bytes instead (33 bytes
+for a compressed point, 32 for a SHA-256 hash; the lengths are enforced on
+write, the commitment - a hash from the Android client, a point from the
+Python tools - is variable) and proofs as a packed
+97-byte R || c || s blob instead of a JSON dict of hex strings. That halves
+every unique index and removes JSON parsing on load. The conversion happens
+in the TypeDecorators below, so queries and ORM objects keep using hex.
+"""
+import json
+import os
+import zlib
+
+from sqlalchemy.types import LargeBinary, TypeDecorator
+
+COMPACT_SCHEMA = os.getenv("COMPACT_SCHEMA", "0") == "1"
+PII_COMPRESSION = os.getenv("PII_COMPRESSION", "0") == "1"
+
+POINT_BYTES = 33
+SCALAR_BYTES = 32
+HASH_BYTES = 32
+PACKED_PROOF_BYTES = POINT_BYTES + 2 * SCALAR_BYTES
+
+
+def storable_hex(value: str, length: int = None) -> bool:
+    """Whether `value` can be stored in a HexBinary(length) column under the current schema."""
+    if not COMPACT_SCHEMA:
+        return True
+    try:
+        raw = bytes.fromhex(value)
+    except ValueError:
+        return False
+    return length is None or len(raw) == length
+
+
+class HexBinary(TypeDecorator):
+    """
+    Hex string in Python, raw bytes in the database (read back as lowercase
+    hex). With a length, values that do not decode to exactly that many bytes
+    are rejected with ValueError.
+    """
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        raw = bytes.fromhex(value)
+        if self.length is not None and len(raw) != self.length:
+            raise ValueError(f"expected {self.length} bytes, got {len(raw)}")
+        return raw
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return bytes(value).hex()
+
+
+def pack_proof(proof: dict) -> bytes:
+    """
+    R (33 bytes) || c (32) || s (32). Proofs that do not fit (uncompressed R,
+    unreduced scalars) are stored as JSON instead; a packed proof always
+    starts with 0x02/0x03, JSON with '{'.
+    """
+    try:
+        r = bytes.fromhex(proof["commitmentR"])
+        c = int(proof["challenge"], 16)
+        s = int(proof["response"], 16)
+        if len(r) == POINT_BYTES and r[0] in (2, 3):
+            return r + c.to_bytes(SCALAR_BYTES, "big") + s.to_bytes(SCALAR_BYTES, "big")
+    except (ValueError, OverflowError):
+        pass
+    return json.dumps(proof).encode("utf-8")
+
+
+def unpack_proof(data: bytes) -> dict:
+    data = bytes(data)
+    if len(data) == PACKED_PROOF_BYTES and data[0] in (2, 3):
+        return {
+            "commitmentR": data[:POINT_BYTES].hex(),
+            "challenge": data[POINT_BYTES:POINT_BYTES + SCALAR_BYTES].hex(),
+            "response": data[POINT_BYTES + SCALAR_BYTES:].hex(),
+        }
+    return json.loads(data)
+
+
+class PackedProof(TypeDecorator):
+    """Proof dict in Python, packed R || c || s bytes in the database."""
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return pack_proof(value)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return unpack_proof(value)
+
+
+_RAW, _ZLIB = b"\x00", b"\x01"
+
+
+class CompressedText(TypeDecorator):
+    """
+    Text in Python, zlib-compressed bytes in the database (stored raw when
+    compression does not help, e.g. short values). Plain strings written
+    before the column was switched are returned as they are, so an existing
+    SQLite database needs no migration.
+    """
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        raw = value.encode("utf-8")
+        packed = zlib.compress(raw, 6)
+        return _ZLIB + packed if len(packed) < len(raw) else _RAW + raw
+
+    def process_result_value(self, value, dialect):
+        if value is None or isinstance(value, str):
+            return value
+        value = bytes(value)
+        if value[:1] == _ZLIB:
+            return zlib.decompress(value[1:]).decode("utf-8")
+        return value[1:].decode("utf-8")
+
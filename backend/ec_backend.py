@@ -0,0 +1,477 @@
+"""
+Elliptic-curve backends for the ZKP verifier.
+
+zkp.py only needs a handful of operations on secp256k1 points: decoding,
+compressed encoding, addition, scalar multiplication and the Schnorr
+equation check s*G == R + c*P. Each backend implements them on its own
+point type:
+
+  - "ecdsa"        reference implementation, plain python-ecdsa Point math
+                   (the original verification code path)
+  - "python"       pure-Python fast path: ecdsa Points for parsing, Jacobian
+                   integer arithmetic with a fixed-base generator table,
+                   GLV and wNAF for the equation check
+  - "libsecp256k1" bindings to bitcoin-core's libsecp256k1 via `coincurve`,
+                   available only when the package is installed
+
+select_backend() picks the fastest available one unless ZKP_EC_BACKEND
+names a specific backend.
+"""
+import os
+import sys
+import secrets
+import binascii
+from ecdsa import SECP256k1, VerifyingKey
+from ecdsa.ellipticcurve import Point
+
+try:
+    import coincurve
+except ImportError:
+    coincurve = None
+
+# Curve parameters
+curve = SECP256k1
+generator = curve.generator
+order = curve.order
+field_prime = curve.curve.p()
+
+# Point at infinity in Jacobian coordinates (Z == 0)
+_INFINITY = (0, 1, 0)
+
+
+# ---------------------------------------------------------------------------
+# Jacobian arithmetic (secp256k1, a = 0)
+#
+# Points are (X, Y, Z) tuples of plain ints representing x = X/Z^2, y = Y/Z^3.
+# Working on ints directly avoids the per-operation object overhead of
+# python-ecdsa's Point class and lets us share doublings across many points.
+# ---------------------------------------------------------------------------
+
+def _to_jacobian(point: Point) -> tuple:
+    return (point.x(), point.y(), 1)
+
+def _jacobian_neg(P: tuple) -> tuple:
+    X, Y, Z = P
+    return (X, (-Y) % field_prime, Z)
+
+def _jacobian_double(P: tuple) -> tuple:
+    X, Y, Z = P
+    if not Z or not Y:
+        return _INFINITY
+    p = field_prime
+    YY = Y * Y % p
+    S = 4 * X * YY % p
+    M = 3 * X * X % p
+    X3 = (M * M - 2 * S) % p
+    Y3 = (M * (S - X3) - 8 * YY * YY) % p
+    Z3 = 2 * Y * Z % p
+    return (X3, Y3, Z3)
+
+def _jacobian_add(P: tuple, Q: tuple) -> tuple:
+    X1, Y1, Z1 = P
+    X2, Y2, Z2 = Q
+    if not Z1:
+        return Q
+    if not Z2:
+        return P
+    p = field_prime
+    Z1Z1 = Z1 * Z1 % p
+    Z2Z2 = Z2 * Z2 % p
+    U1 = X1 * Z2Z2 % p
+    U2 = X2 * Z1Z1 % p
+    S1 = Y1 * Z2 * Z2Z2 % p
+    S2 = Y2 * Z1 * Z1Z1 % p
+    H = (U2 - U1) % p
+    r = (S2 - S1) % p
+    if not H:
+        if not r:
+            return _jacobian_double(P)
+        return _INFINITY
+    HH = H * H % p
+    HHH = H * HH % p
+    V = U1 * HH % p
+    X3 = (r * r - HHH - 2 * V) % p
+    Y3 = (r * (V - X3) - S1 * HHH) % p
+    Z3 = Z1 * Z2 * H % p
+    return (X3, Y3, Z3)
+
+def _jacobian_add_affine(P: tuple, Q: tuple) -> tuple:
+    """Mixed addition: P in Jacobian, Q = (x, y) affine (implicit Z = 1)."""
+    X1, Y1, Z1 = P
+    x2, y2 = Q
+    if not Z1:
+        return (x2, y2, 1)
+    p = field_prime
+    Z1Z1 = Z1 * Z1 % p
+    U2 = x2 * Z1Z1 % p
+    S2 = y2 * Z1 * Z1Z1 % p
+    H = (U2 - X1) % p
+    r = (S2 - Y1) % p
+    if not H:
+        if not r:
+            return _jacobian_double(P)
+        return _INFINITY
+    HH = H * H % p
+    HHH = H * HH % p
+    V = X1 * HH % p
+    X3 = (r * r - HHH - 2 * V) % p
+    Y3 = (r * (V - X3) - Y1 * HHH) % p
+    Z3 = Z1 * H % p
+    return (X3, Y3, Z3)
+
+def _jacobian_is_infinity(P: tuple) -> bool:
+    return not P[2]
+
+def _jacobian_equals_affine(P: tuple, Q: Point) -> bool:
+    """Compare a Jacobian point with an affine Point without inverting Z."""
+    X, Y, Z = P
+    if not Z:
+        return False
+    p = field_prime
+    ZZ = Z * Z % p
+    return X == Q.x() * ZZ % p and Y == Q.y() * ZZ * Z % p
+
+def _batch_to_affine(points: list) -> list:
+    """
+    Normalize finite Jacobian points to affine (x, y) using Montgomery's trick
+    (one modular inversion for the whole list).
+    """
+    p = field_prime
+    prefix = []
+    acc = 1
+    for _, _, Z in points:
+        prefix.append(acc)
+        acc = acc * Z % p
+    inv = pow(acc, -1, p)
+    affine = [None] * len(points)
+    for i in range(len(points) - 1, -1, -1):
+        X, Y, Z = points[i]
+        z_inv = inv * prefix[i] % p
+        inv = inv * Z % p
+        zz = z_inv * z_inv % p
+        affine[i] = (X * zz % p, Y * zz * z_inv % p)
+    return affine
+
+def _window_table(P: tuple, window: int) -> list:
+    """Affine table [None, P, 2P, ..., (2^window - 1)P] for mixed additions."""
+    multiples = [P]
+    for _ in range((1 << window) - 2):
+        multiples.append(_jacobian_add(multiples[-1], P))
+    return [None] + _batch_to_affine(multiples)
+
+# ---------------------------------------------------------------------------
+# Fixed-base tables
+#
+# table[j][d] = d * 2^(window*j) * P in affine form, so k*P is just one
+# mixed addition per window of k and no doublings at all. The generator
+# table is built once at import; per-key tables are built on demand for
+# frequently seen public keys (see key_cache.py).
+# ---------------------------------------------------------------------------
+
+_G_WINDOW = 8
+KEY_TABLE_WINDOW = 4
+
+def _build_fixed_base_table(P: tuple, window: int) -> list:
+    table = []
+    base = P
+    for _ in range((order.bit_length() + window - 1) // window):
+        table.append(_window_table(base, window))
+        for _ in range(window):
+            base = _jacobian_double(base)
+    return table
+
+def _fixed_base_mul(table: list, k: int, acc: tuple = _INFINITY) -> tuple:
+    """Return acc + k*P for the point P the fixed-base table was built from."""
+    k %= order
+    window = (len(table[0]) - 1).bit_length()
+    mask = (1 << window) - 1
+    for row in table:
+        if not k:
+            break
+        digit = k & mask
+        if digit:
+            acc = _jacobian_add_affine(acc, row[digit])
+        k >>= window
+    return acc
+
+def fixed_base_table_bytes(table: list) -> int:
+    """Approximate memory held by a fixed-base table."""
+    size = sys.getsizeof(table)
+    for row in table:
+        size += sys.getsizeof(row)
+        for entry in row[1:]:
+            size += sys.getsizeof(entry) + sys.getsizeof(entry[0]) + sys.getsizeof(entry[1])
+    return size
+
+_G_TABLE = _build_fixed_base_table(_to_jacobian(generator), _G_WINDOW)
+
+def _generator_mul(k: int, acc: tuple = _INFINITY) -> tuple:
+    """Return acc + k*G using the precomputed generator table."""
+    return _fixed_base_mul(_G_TABLE, k, acc)
+
+# ---------------------------------------------------------------------------
+# GLV endomorphism: phi(x, y) = (beta*x, y) equals lambda*(x, y) on secp256k1.
+# A 256-bit scalar k splits into k1 + k2*lambda with |k1|, |k2| ~ 128 bits,
+# which halves the doublings of a variable-base multiplication.
+# ---------------------------------------------------------------------------
+
+_GLV_LAMBDA = 0x5363ad4cc05c30e0a5261c028812645a122e22ea20816678df02967c1b23bd72
+_GLV_BETA = 0x7ae96a2b657c07106e64479eac3434e99cf0497512f58995c1396c28719501ee
+_GLV_A1 = 0x3086d221a7d46bcde86c90e49284eb15
+_GLV_B1 = -0xe4437ed6010e88286f547fa90abfe4c3
+_GLV_A2 = 0x114ca50f7a8e2f3f657c1108d9d44cfd8
+_GLV_B2 = _GLV_A1
+
+def _glv_split(P: tuple, k: int) -> list:
+    """Return [(P1, k1), (P2, k2)] with non-negative ~128-bit scalars and k*P == k1*P1 + k2*P2."""
+    c1 = (_GLV_B2 * k + order // 2) // order
+    c2 = (-_GLV_B1 * k + order // 2) // order
+    k1 = k - c1 * _GLV_A1 - c2 * _GLV_A2
+    k2 = -c1 * _GLV_B1 - c2 * _GLV_B2
+    X, Y, Z = P
+    P2 = (_GLV_BETA * X % field_prime, Y, Z)
+    parts = []
+    for Q, k_part in ((P, k1), (P2, k2)):
+        if k_part < 0:
+            Q, k_part = _jacobian_neg(Q), -k_part
+        parts.append((Q, k_part))
+    return parts
+
+def _odd_multiples_table(P: tuple, window: int) -> list:
+    """Affine odd multiples [P, 3P, 5P, ..., (2^(window-1) - 1)P] for wNAF digits."""
+    P2 = _jacobian_double(P)
+    multiples = [P]
+    for _ in range((1 << (window - 2)) - 1):
+        multiples.append(_jacobian_add(multiples[-1], P2))
+    return _batch_to_affine(multiples)
+
+def _wnaf(k: int, window: int) -> list:
+    """Width-w non-adjacent form of k, least significant digit first."""
+    digits = []
+    modulus = 1 << window
+    half = modulus >> 1
+    while k:
+        if k & 1:
+            digit = k & (modulus - 1)
+            if digit >= half:
+                digit -= modulus
+            k -= digit
+        else:
+            digit = 0
+        digits.append(digit)
+        k >>= 1
+    return digits
+
+def _multi_scalar_mul(pairs: list, base_scalar: int = 0, window: int = 5) -> tuple:
+    """
+    Compute base_scalar*G + sum(k_i * P_i) with Straus' interleaved wNAF
+    method. All variable points share a single chain of doublings, so N
+    terms cost roughly one (GLV-halved) scalar multiplication worth of
+    doublings plus N * bits / (window + 1) additions. The generator term
+    uses the fixed-base table and needs no doublings.
+    """
+    p = field_prime
+    terms = []
+    max_len = 0
+    for P, k in pairs:
+        k %= order
+        if not k or _jacobian_is_infinity(P):
+            continue
+        for Q, k_part in (_glv_split(P, k) if k.bit_length() > 128 else [(P, k)]):
+            if not k_part:
+                continue
+            digits = _wnaf(k_part, window)
+            terms.append((_odd_multiples_table(Q, window), digits))
+            max_len = max(max_len, len(digits))
+
+    acc = _INFINITY
+    for i in range(max_len - 1, -1, -1):
+        acc = _jacobian_double(acc)
+        for table, digits in terms:
+            if i < len(digits):
+                digit = digits[i]
+                if digit > 0:
+                    acc = _jacobian_add_affine(acc, table[digit >> 1])
+                elif digit < 0:
+                    x, y = table[(-digit) >> 1]
+                    acc = _jacobian_add_affine(acc, (x, p - y))
+    return _generator_mul(base_scalar, acc)
+
+
+# ---------------------------------------------------------------------------
+# Backends
+# ---------------------------------------------------------------------------
+
+class CurveBackend:
+    """
+    Interface every backend implements. Points are opaque to callers; only
+    the backend that produced a point may operate on it.
+    """
+    name = "base"
+
+    def decode_point(self, data: bytes):
+        raise NotImplementedError
+
+    def encode_point(self, point) -> bytes:
+        """Compressed SEC1 encoding (02/03 + x)."""
+        raise NotImplementedError
+
+    def add(self, a, b):
+        raise NotImplementedError
+
+    def mul(self, point, k: int):
+        raise NotImplementedError
+
+    def mul_base(self, k: int):
+        raise NotImplementedError
+
+    def build_key_table(self, point):
+        """
+        Optional per-key precomputation that speeds up P*c for a key seen
+        often. Returns (table, approximate_bytes) or None if unsupported.
+        """
+        return None
+
+    def verify_equation(self, P, R, c: int, s: int, key_table=None) -> bool:
+        """Check s*G == R + c*P, using key_table (from build_key_table) if given."""
+        try:
+            left = self.encode_point(self.mul_base(s))
+            right = self.encode_point(self.add(R, self.mul(P, c)))
+        except ValueError:
+            return False
+        return left == right
+
+    def verify_equations(self, entries: list) -> bool:
+        """Check every (P, R, c, s) entry, one by one; True only if all hold."""
+        return all(self.verify_equation(P, R, c, s) for P, R, c, s in entries)
+
+
+class EcdsaBackend(CurveBackend):
+    """Reference backend: python-ecdsa Point objects, generic arithmetic."""
+    name = "ecdsa"
+
+    def decode_point(self, data: bytes) -> Point:
+        try:
+            return VerifyingKey.from_string(data, curve=curve).pubkey.point
+        except Exception as e:
+            raise ValueError(f"Invalid point: {binascii.hexlify(data).decode('utf-8')}") from e
+
+    def encode_point(self, point: Point) -> bytes:
+        try:
+            return point.to_bytes(encoding="compressed")
+        except Exception as e:
+            # Point at infinity has no SEC1 encoding
+            raise ValueError("Cannot encode point at infinity") from e
+
+    def add(self, a: Point, b: Point) -> Point:
+        return a + b
+
+    def mul(self, point: Point, k: int) -> Point:
+        return point * k
+
+    def mul_base(self, k: int) -> Point:
+        return generator * k
+
+    def verify_equation(self, P: Point, R: Point, c: int, s: int, key_table=None) -> bool:
+        return generator * s == R + (P * c)
+
+
+class PythonBackend(EcdsaBackend):
+    """
+    Pure-Python fast path. Shares point parsing/encoding with the reference
+    backend but evaluates the equations with the Jacobian routines above.
+    """
+    name = "python"
+
+    def build_key_table(self, point: Point):
+        table = _build_fixed_base_table(_to_jacobian(point), KEY_TABLE_WINDOW)
+        return table, fixed_base_table_bytes(table)
+
+    def verify_equation(self, P: Point, R: Point, c: int, s: int, key_table=None) -> bool:
+        if key_table is not None:
+            # Both terms come from fixed-base tables: no doublings at all
+            left = _fixed_base_mul(key_table, order - c % order, _generator_mul(s))
+        else:
+            # s*G - c*P in one joint multiplication
+            left = _multi_scalar_mul([(_to_jacobian(P), order - c % order)], base_scalar=s)
+        return _jacobian_equals_affine(left, R)
+
+    def verify_equations(self, entries: list) -> bool:
+        """
+        Random-linear-combination batch check: with random 128-bit a_i,
+
+            (sum a_i*s_i)*G - sum a_i*R_i - sum (a_i*c_i)*P_i == O
+
+        evaluated as one multi-scalar multiplication.
+        """
+        s_total = 0
+        pairs = []
+        for P, R, c, s in entries:
+            a = secrets.randbits(128) | 1
+            s_total += a * s
+            pairs.append((_jacobian_neg(_to_jacobian(R)), a))
+            pairs.append((_jacobian_neg(_to_jacobian(P)), a * c))
+        return _jacobian_is_infinity(_multi_scalar_mul(pairs, base_scalar=s_total))
+
+
+class Libsecp256k1Backend(CurveBackend):
+    """
+    libsecp256k1 through coincurve; points are coincurve.PublicKey.
+    coincurve exposes no multi-scalar multiplication, so verify_equations
+    checks proofs one by one; that still beats PythonBackend's batch check.
+    """
+    name = "libsecp256k1"
+
+    def decode_point(self, data: bytes):
+        try:
+            return coincurve.PublicKey(data)
+        except Exception as e:
+            raise ValueError(f"Invalid point: {binascii.hexlify(data).decode('utf-8')}") from e
+
+    def encode_point(self, point) -> bytes:
+        return point.format(compressed=True)
+
+    def add(self, a, b):
+        # Raises ValueError if the sum is the point at infinity
+        return coincurve.PublicKey.combine_keys([a, b])
+
+    def mul(self, point, k: int):
+        k %= order
+        if not k:
+            raise ValueError("Scalar multiple is the point at infinity")
+        return point.multiply(k.to_bytes(32, byteorder='big'))
+
+    def mul_base(self, k: int):
+        k %= order
+        if not k:
+            raise ValueError("Scalar multiple is the point at infinity")
+        return coincurve.PrivateKey(k.to_bytes(32, byteorder='big')).public_key
+
+
+_BACKENDS = {
+    EcdsaBackend.name: EcdsaBackend,
+    PythonBackend.name: PythonBackend,
+    Libsecp256k1Backend.name: Libsecp256k1Backend,
+}
+
+def available_backends() -> list:
+    """Names of the backends usable in this environment, reference first."""
+    names = [EcdsaBackend.name, PythonBackend.name]
+    if coincurve is not None:
+        names.append(Libsecp256k1Backend.name)
+    return names
+
+def get_backend(name: str) -> CurveBackend:
+    if name not in available_backends():
+        raise ValueError(f"EC backend '{name}' is not available (have: {', '.join(available_backends())})")
+    return _BACKENDS[name]()
+
+def select_backend() -> CurveBackend:
+    """
+    Backend named by ZKP_EC_BACKEND, or with "auto" (default) the fastest
+    installed one: libsecp256k1 if coincurve is importable, else python.
+    """
+    name = os.getenv("ZKP_EC_BACKEND", "auto")
+    if name == "auto":
+        name = available_backends()[-1]
+    return get_backend(name)
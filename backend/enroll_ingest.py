@@ -0,0 +1,302 @@
+"""
+Bulk enrollment ingestion (NDJSON).
+
+Used by POST /api/enroll/bulk and by bulk_enroll.py --direct to replay large
+numbers of enrollment payloads (e.g. a partner-bank migration) without one
+HTTP call, uniqueness query, commit and refresh per record. Records are
+processed in chunks:
+
+  1. each line is parsed into an EnrollmentPayload
+  2. id_hash / public_key uniqueness is checked for the whole chunk with
+     two `IN (...)` queries (plus duplicates inside the chunk itself)
+  3. the remaining proofs are checked in parallel on the proof pool, one
+     batch verification per worker
+  4. with a face index, the face clips are embedded by the face embedding
+     service (face_embedding.py), outside any transaction
+  5. accepted users are inserted in one transaction; with a face index, that
+     transaction first takes face_index.lock_inserts() and checks the face
+     embeddings against the index and the earlier records of the chunk
+
+and one result line is produced per input record, in input order.
+"""
+import asyncio
+import json
+import os
+
+import anyio
+import numpy as np
+from pydantic import ValidationError
+from sqlalchemy.exc import IntegrityError
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import StreamingResponse
+
+import face_embedding
+import models
+import proof_pool
+from face_index import lock_inserts, to_bytes
+from schemas import EnrollmentPayload, enrollment_message, proof_to_dict
+
+CHUNK_SIZE = int(os.getenv("BULK_ENROLL_CHUNK", "500"))
+BODY_QUEUE = 16     # body messages buffered ahead of the ingest
+
+
+def conflict_detail(error: IntegrityError) -> str:
+    """Rejection detail for a unique-constraint error on INSERT INTO users."""
+    # SQLite names the column (users.public_key), Postgres the index (ix_users_public_key)
+    if "public_key" in str(error.orig):
+        return "Public key already enrolled"
+    return "ID already enrolled"
+
+
+def parse_line(line_no: int, text: str):
+    """Return (payload, None) or (None, error result) for one NDJSON line."""
+    try:
+        return EnrollmentPayload.model_validate_json(text), None
+    except ValidationError as e:
+        return None, {"line": line_no, "success": False, "detail": f"Invalid payload: {e.errors()[0]['msg']}"}
+
+
+def check_unique(db, records: list) -> dict:
+    """
+    Map line number -> rejection result for records whose id_hash or public
+    key is already enrolled or repeated earlier in the same chunk.
+    """
+    id_hashes = [p.idNumberHash for _, p in records]
+    public_keys = [p.publicKey for _, p in records]
+    taken_ids = {row[0] for row in db.query(models.User.id_hash).filter(models.User.id_hash.in_(id_hashes))}
+    taken_keys = {row[0] for row in db.query(models.User.public_key).filter(models.User.public_key.in_(public_keys))}
+
+    rejected = {}
+    for line_no, payload in records:
+        if payload.idNumberHash in taken_ids:
+            rejected[line_no] = "ID already enrolled"
+        elif payload.publicKey in taken_keys:
+            rejected[line_no] = "Public key already enrolled"
+        else:
+            taken_ids.add(payload.idNumberHash)
+            taken_keys.add(payload.publicKey)
+    return rejected
+
+
+async def verify_parallel(records: list) -> list:
+    """Verify the enrollment proofs of `records`, spread over the proof pool."""
+    items = [(p.publicKey, proof_to_dict(p.proof), enrollment_message(p)) for _, p in records]
+    await proof_pool.started()
+    size = max(1, -(-len(items) // proof_pool.workers))
+    slices = [items[i:i + size] for i in range(0, len(items), size)]
+    results = await asyncio.gather(*(proof_pool.verify_proofs_batch(part) for part in slices))
+    return [ok for part in results for ok in part]
+
+
+def embed_faces(records: list):
+    """
+    (rejected, vectors): line number -> rejection detail for missing or
+    unreadable face clips, and line number -> embedding for the others.
+    """
+    rejected, vectors = {}, {}
+    clips = []
+    for line_no, payload in records:
+        if payload.faceFrames is None:
+            rejected[line_no] = "Face frames required"
+        else:
+            clips.append((line_no, payload.faceFrames))
+    try:
+        embeddings = face_embedding.embed([frames for _, frames in clips])
+    except face_embedding.EmbeddingUnavailable:
+        rejected.update((line_no, "Face embedding service unavailable") for line_no, _ in clips)
+        return rejected, vectors
+    for (line_no, _), vector in zip(clips, embeddings):
+        if vector is None:
+            rejected[line_no] = "Invalid face frames"
+        else:
+            vectors[line_no] = vector
+    return rejected, vectors
+
+
+def check_faces(db, index, records: list, vectors: dict) -> dict:
+    """
+    Line number -> rejection detail for records whose face is already
+    enrolled or repeated earlier in the chunk.
+    """
+    index.sync(db, models.FaceEmbedding)
+    rejected = {}
+    accepted = np.empty((len(records), index.dim), dtype=np.float32)
+    count = 0
+    for line_no, _ in records:
+        vector = vectors[line_no]
+        in_chunk = count and float(np.max(accepted[:count] @ vector)) >= index.threshold
+        if in_chunk or index.find_duplicate(vector) is not None:
+            rejected[line_no] = "Face already enrolled"
+        else:
+            accepted[count] = vector
+            count += 1
+    return rejected
+
+
+def insert_users(db, records: list, face_index=None, vectors: dict = None) -> dict:
+    """
+    Insert records in one transaction; map line number -> user id or
+    rejection detail. With a face index the faces (`vectors`, from
+    embed_faces) are checked inside that transaction (see
+    face_index.lock_inserts).
+    """
+    def insert(batch: list) -> dict:
+        rejected = {}
+        if face_index is not None:
+            lock_inserts(db)
+            rejected = check_faces(db, face_index, batch, vectors)
+        users = []
+        for line_no, p in batch:
+            if line_no in rejected:
+                continue
+            user = models.User(
+                public_key=p.publicKey,
+                commitment=p.commitment,
+                id_hash=p.idNumberHash,
+                encrypted_pii=p.encryptedPII,
+                enrollment_proof=proof_to_dict(p.proof)
+            )
+            if face_index is not None:
+                user.face_embedding = models.FaceEmbedding(embedding=to_bytes(vectors[line_no]))
+            users.append((line_no, user))
+        db.add_all([user for _, user in users])
+        db.commit()
+        if face_index is not None:
+            for line_no, user in users:
+                face_index.add(user.id, vectors[line_no])
+        return {**rejected, **{line_no: user.id for line_no, user in users}}
+
+    try:
+        return insert(records)
+    except IntegrityError:
+        # Enrolled concurrently by someone else: fall back to one row at a time
+        db.rollback()
+
+    outcome = {}
+    for record in records:
+        try:
+            outcome.update(insert([record]))
+        except IntegrityError as e:
+            db.rollback()
+            outcome[record[0]] = conflict_detail(e)
+    return outcome
+
+
+async def process_chunk(session_factory, lines: list, face_index=None) -> list:
+    """Run one chunk of (line_no, text) through all stages; results in input order."""
+    results = {}
+    records = []
+    for line_no, text in lines:
+        payload, error = parse_line(line_no, text)
+        if error:
+            results[line_no] = error
+        else:
+            records.append((line_no, payload))
+
+    db = session_factory(expire_on_commit=False)
+    try:
+        if records:
+            rejected = await run_in_threadpool(check_unique, db, records)
+            for line_no, detail in rejected.items():
+                results[line_no] = {"line": line_no, "success": False, "detail": detail}
+            records = [(n, p) for n, p in records if n not in rejected]
+
+        if records:
+            checks = await verify_parallel(records)
+            for (line_no, _), ok in zip(records, checks):
+                if not ok:
+                    results[line_no] = {"line": line_no, "success": False, "detail": "Invalid ZKP Proof"}
+            records = [(n, p) for (n, p), ok in zip(records, checks) if ok]
+
+        vectors = None
+        if records and face_index is not None:
+            rejected, vectors = await run_in_threadpool(embed_faces, records)
+            for line_no, detail in rejected.items():
+                results[line_no] = {"line": line_no, "success": False, "detail": detail}
+            records = [(n, p) for n, p in records if n not in rejected]
+
+        if records:
+            inserted = await run_in_threadpool(insert_users, db, records, face_index, vectors)
+            for line_no, outcome in inserted.items():
+                if isinstance(outcome, str):
+                    results[line_no] = {"line": line_no, "success": False, "detail": outcome}
+                else:
+                    results[line_no] = {"line": line_no, "success": True, "userId": outcome}
+    finally:
+        db.close()
+
+    return [results[line_no] for line_no, _ in lines]
+
+
+async def iter_lines(byte_chunks):
+    """Split an async stream of bytes into (line_no, text) for non-blank lines."""
+    buffer = b""
+    line_no = 0
+    async for chunk in byte_chunks:
+        buffer += chunk
+        *complete, buffer = buffer.split(b"\n")
+        for raw in complete:
+            line_no += 1
+            if raw.strip():
+                yield line_no, raw.decode("utf-8")
+    if buffer.strip():
+        yield line_no + 1, buffer.decode("utf-8")
+
+
+async def ingest_ndjson(byte_chunks, session_factory, chunk_size: int = CHUNK_SIZE, face_index=None):
+    """Async generator of NDJSON result lines for an NDJSON enrollment stream."""
+    pending = []
+    async for line in iter_lines(byte_chunks):
+        pending.append(line)
+        if len(pending) >= chunk_size:
+            for result in await process_chunk(session_factory, pending, face_index):
+                yield json.dumps(result) + "\n"
+            pending = []
+    if pending:
+        for result in await process_chunk(session_factory, pending, face_index):
+            yield json.dumps(result) + "\n"
+
+
+class NDJSONStreamingResponse(StreamingResponse):
+    """
+    Streams the results of `ingest(byte_chunks)` while the body is uploaded.
+
+    The stock class listens for http.disconnect on receive() while it streams,
+    which would swallow the body messages the ingest is waiting for. Here one
+    task is the only reader of receive(): it feeds body chunks to the ingest,
+    then keeps listening, and a disconnect at any point cancels the ingest
+    (chunks already committed stay committed).
+    """
+    media_type = "application/x-ndjson"
+
+    def __init__(self, ingest):
+        super().__init__(iter(()))
+        self.ingest = ingest
+
+    async def read_body(self, receive, chunks):
+        async with chunks:
+            more_body = True
+            while more_body:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    return
+                more_body = message.get("more_body", False)
+                if message.get("body"):
+                    await chunks.send(message["body"])
+        await self.listen_for_disconnect(receive)
+
+    async def __call__(self, scope, receive, send):
+        chunks, byte_chunks = anyio.create_memory_object_stream(BODY_QUEUE)
+        self.body_iterator = self.ingest(byte_chunks)
+        async with anyio.create_task_group() as task_group:
+            async def stream():
+                try:
+                    await self.stream_response(send)
+                except OSError:
+                    pass  # client gone (ASGI 2.4 servers raise on send)
+                task_group.cancel_scope.cancel()
+
+            task_group.start_soon(stream)
+            await self.read_body(receive, chunks)
+            task_group.cancel_scope.cancel()
+
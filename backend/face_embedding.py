@@ -0,0 +1,47 @@
+"""
+Server-side face embeddings for the duplicate-face check.
+
+An enrollment carries its face clip (faceFrames: base64 JPEG/PNG frames,
+signed as part of the enrollment message). The embedding the face index
+compares is computed from those frames by the face embedding model
+(FaceEmbeddingWrapper in ekyc-train.ipynb), served by inference_service.py
+on POST /embed at FACE_EMBEDDING_URL. Client-supplied embeddings are never
+used: a modified app could send any vector it likes.
+"""
+import os
+
+import httpx
+
+from face_index import normalize
+
+FACE_EMBEDDING_URL = os.getenv("FACE_EMBEDDING_URL", "http://127.0.0.1:8100")
+FACE_EMBEDDING_TIMEOUT = float(os.getenv("FACE_EMBEDDING_TIMEOUT", "10"))
+EMBED_BATCH = 32    # clips per /embed call
+
+_client = httpx.Client(base_url=FACE_EMBEDDING_URL, timeout=FACE_EMBEDDING_TIMEOUT)
+
+
+class EmbeddingUnavailable(Exception):
+    """The embedding service could not be reached or returned no usable result."""
+
+
+def embed(clips: list) -> list:
+    """
+    Normalized float32 embedding per clip (a list of base64 frames), or None
+    for a clip whose frames are not readable images.
+    Raises EmbeddingUnavailable if the service is down or fails.
+    """
+    vectors = []
+    for start in range(0, len(clips), EMBED_BATCH):
+        try:
+            response = _client.post("/embed", json={"faces": clips[start:start + EMBED_BATCH]})
+            response.raise_for_status()
+            embeddings = response.json()["embeddings"]
+        except (httpx.HTTPError, KeyError, ValueError) as e:
+            raise EmbeddingUnavailable(f"{type(e).__name__}: {e}") from e
+        for embedding in embeddings:
+            try:
+                vectors.append(None if embedding is None else normalize(embedding))
+            except ValueError as e:
+                raise EmbeddingUnavailable(f"Invalid embedding from the model: {e}") from e
+    return vectors
@@ -0,0 +1,344 @@
+"""
+In-memory nearest-neighbour index of enrollment face embeddings.
+
+The id_hash uniqueness check only catches the same ID number twice; one face
+enrolled under several (forged) IDs passes it. With FACE_INDEX=1 every
+enrollment must carry its face clip (faceFrames, signed as part of the
+enrollment message), and the server computes the embedding from it with the
+128-d face branch of MobileKYCModel (face_embedding.py, ekyc-train.ipynb).
+It is checked against every embedding already enrolled, and rejected when
+the closest one has cosine similarity >= the threshold.
+
+Embeddings are L2-normalized and stored as float16 (256 bytes each, 256 MB
+for a million users). Up to `train_size` embeddings the index is a flat
+array scanned exactly; after that it becomes an inverted file (IVF): a
+spherical k-means over the stored embeddings picks `n_lists` centroids,
+every embedding lives in the list of its nearest centroid, and a search
+only scans the `n_probe` lists closest to the query (about
+n_probe / n_lists of the index, ~8k rows at a million users with the
+defaults). Near-duplicates sit close to each other, so they fall in the
+same or a neighbouring list; scores are computed in float32. The lists are
+re-clustered once, at 4 x train_size rows. Clustering takes a few seconds,
+so the add that makes it due only takes a snapshot and runs k-means on a
+background thread; adds and searches keep using the old layout meanwhile,
+and the new lists (plus the rows added meanwhile) are swapped in at the end.
+wait_for_training() finishes any due clustering, for startup and benchmarks.
+
+The face_embeddings table is the persistent copy. sync() loads rows with a
+user id above the highest one seen so far, so each worker picks up other
+workers' enrollments before it searches. Ids are allocated at INSERT but
+rows become visible at COMMIT, so a lower id can appear after a higher one
+was loaded: sync() also re-reads the `sync_overlap` ids below the highest
+one and loads any it has not indexed yet.
+
+The check and the insert must not interleave across workers (both could
+pass for the same face), so enrollments with a face call lock_inserts()
+first, then sync(), check and insert in that one transaction.
+"""
+import os
+import threading
+
+import numpy as np
+from sqlalchemy import text
+
+from schemas import FACE_EMBEDDING_DIM
+
+SCAN_CHUNK = 65536      # rows converted to float32 at a time
+LOAD_BATCH = 10000
+KMEANS_ITERATIONS = 10
+LOCK_KEY = 0x66616365   # pg_advisory_xact_lock key ("face")
+
+
+def lock_inserts(db):
+    """
+    Serialize face enrollments across workers until db's transaction ends:
+    an advisory lock on Postgres, the database write lock on SQLite.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": LOCK_KEY})
+    else:
+        # An empty write starts the write transaction
+        db.execute(text("DELETE FROM face_embeddings WHERE 0"))
+
+
+def normalize(embedding) -> np.ndarray:
+    """float32 unit vector; raises ValueError for a wrong size or a zero vector."""
+    vector = np.asarray(embedding, dtype=np.float32).reshape(-1)
+    if vector.shape[0] != FACE_EMBEDDING_DIM:
+        raise ValueError(f"embedding must have {FACE_EMBEDDING_DIM} values")
+    norm = float(np.linalg.norm(vector))
+    if not np.isfinite(norm) or norm == 0:
+        raise ValueError("embedding must be a finite non-zero vector")
+    return vector / norm
+
+
+def to_bytes(vector: np.ndarray) -> bytes:
+    """Storage format of the face_embeddings table: float16, little-endian."""
+    return vector.astype("<f2").tobytes()
+
+
+def from_bytes(blob: bytes) -> np.ndarray:
+    return np.frombuffer(blob, dtype="<f2")
+
+
+class _Block:
+    """Growable float16 matrix of embeddings with their user ids."""
+
+    def __init__(self, dim: int, capacity: int = 64):
+        self.vectors = np.empty((capacity, dim), dtype=np.float16)
+        self.ids = np.empty(capacity, dtype=np.int64)
+        self.count = 0
+
+    def append(self, ids: np.ndarray, vectors: np.ndarray):
+        end = self.count + len(ids)
+        if end > len(self.ids):
+            capacity = max(end, 2 * len(self.ids))
+            grown = np.empty((capacity, self.vectors.shape[1]), dtype=np.float16)
+            grown[:self.count] = self.vectors[:self.count]
+            self.vectors = grown
+            self.ids = np.resize(self.ids, capacity)
+        self.vectors[self.count:end] = vectors
+        self.ids[self.count:end] = ids
+        self.count = end
+
+    def best(self, query: np.ndarray):
+        """(user id, similarity) of the closest row, or (None, -1.0) if empty."""
+        best_id, best_score = None, -1.0
+        for start in range(0, self.count, SCAN_CHUNK):
+            chunk = self.vectors[start:min(start + SCAN_CHUNK, self.count)].astype(np.float32)
+            scores = chunk @ query
+            i = int(np.argmax(scores))
+            if scores[i] > best_score:
+                best_id, best_score = int(self.ids[start + i]), float(scores[i])
+        return best_id, best_score
+
+    @property
+    def size_bytes(self) -> int:
+        return self.vectors.nbytes + self.ids.nbytes
+
+
+def _nearest(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Index of the closest centroid for every row (chunked to bound memory)."""
+    out = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), SCAN_CHUNK):
+        chunk = vectors[start:start + SCAN_CHUNK].astype(np.float32)
+        out[start:start + len(chunk)] = np.argmax(chunk @ centroids.T, axis=1)
+    return out
+
+
+def spherical_kmeans(vectors: np.ndarray, k: int, iterations: int = KMEANS_ITERATIONS, seed: int = 0) -> np.ndarray:
+    """k unit-norm centroids for unit-norm float32 rows."""
+    rand = np.random.default_rng(seed)
+    centroids = vectors[rand.choice(len(vectors), size=k, replace=False)].copy()
+    for _ in range(iterations):
+        assign = _nearest(vectors, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, vectors)
+        counts = np.bincount(assign, minlength=k)
+        empty = counts == 0
+        # Re-seed empty clusters with random rows
+        sums[empty] = vectors[rand.choice(len(vectors), size=int(empty.sum()))]
+        centroids = sums / np.linalg.norm(sums, axis=1, keepdims=True)
+    return centroids
+
+
+def _distribute(lists: list, centroids: np.ndarray, user_ids: np.ndarray, vectors: np.ndarray):
+    """Append each row to the block of its nearest centroid."""
+    assign = _nearest(vectors, centroids)
+    order = np.argsort(assign, kind="stable")
+    used, starts = np.unique(assign[order], return_index=True)
+    for list_no, rows in zip(used, np.split(order, starts[1:])):
+        lists[list_no].append(user_ids[rows], vectors[rows])
+
+
+class FaceIndex:
+    def __init__(self, threshold: float = 0.9, n_lists: int = 1024, n_probe: int = 8,
+                 train_size: int = None, sync_overlap: int = 1000, dim: int = FACE_EMBEDDING_DIM):
+        self.threshold = threshold
+        self.sync_overlap = sync_overlap
+        self.dim = dim
+        self.n_lists = n_lists
+        self.n_probe = min(n_probe, n_lists)
+        # First clustering at ~8 rows per centroid (an exact scan of more rows is
+        # slower than probing lists), redone once at ~32 rows per centroid
+        self.train_size = train_size or 8 * n_lists
+        self.retrain_size = 4 * self.train_size
+        self._flat = _Block(dim)
+        self._centroids = None
+        self._lists = None
+        self._trained_on = 0
+        self._training = False
+        self._trainer = None
+        self._added_while_training = []
+        self._max_user_id = 0
+        self._recent = set()    # indexed ids within sync_overlap of _max_user_id
+        self._lock = threading.Lock()
+
+        self.searches = 0
+        self.duplicates = 0
+
+    def __len__(self):
+        if self._lists is None:
+            return self._flat.count
+        return sum(block.count for block in self._lists)
+
+    def add(self, user_id: int, embedding):
+        self.add_many(np.array([user_id], dtype=np.int64), normalize(embedding)[None, :])
+
+    def add_many(self, user_ids: np.ndarray, vectors: np.ndarray):
+        """Add unit-norm rows (float16 or float32) for the given user ids."""
+        if len(user_ids) == 0:
+            return
+        with self._lock:
+            # sync() re-reads recent ids, and a worker's own enrollments come
+            # back through it: skip rows that are already indexed
+            known = np.fromiter((i in self._recent for i in user_ids.tolist()), dtype=bool, count=len(user_ids))
+            if known.any():
+                user_ids, vectors = user_ids[~known], vectors[~known]
+                if len(user_ids) == 0:
+                    return
+            self._max_user_id = max(self._max_user_id, int(user_ids.max()))
+            floor = self._max_user_id - self.sync_overlap
+            self._recent.update(user_ids[user_ids > floor].tolist())
+            if len(self._recent) > 2 * self.sync_overlap:
+                self._recent = {i for i in self._recent if i > floor}
+            if self._lists is None:
+                self._flat.append(user_ids, vectors)
+            else:
+                _distribute(self._lists, self._centroids, user_ids, vectors)
+            if self._training:
+                self._added_while_training.append((user_ids, np.array(vectors, dtype=np.float16)))
+                return
+            snapshot = self._snapshot_if_due()
+            if snapshot is None:
+                return
+            self._trainer = threading.Thread(target=self._train, args=snapshot, name="face-index-train", daemon=True)
+            self._trainer.start()
+
+    def _snapshot_if_due(self):
+        """(ids, vectors) to cluster if a run is due, else None; the lock must be held."""
+        if self._training:
+            return None
+        if self._lists is None:
+            due = self._flat.count >= self.train_size
+        else:
+            due = self._trained_on < self.retrain_size <= len(self)
+        if not due:
+            return None
+        self._training = True
+        # Copies: the blocks keep growing while k-means runs
+        blocks = [self._flat] if self._lists is None else self._lists
+        ids = np.concatenate([block.ids[:block.count] for block in blocks])
+        stored = np.concatenate([block.vectors[:block.count] for block in blocks])
+        return ids, stored
+
+    def _train(self, ids: np.ndarray, vectors: np.ndarray):
+        """Cluster a snapshot into new IVF lists, then swap them in (lock not held)."""
+        try:
+            rand = np.random.default_rng(0)
+            sample = vectors[rand.choice(len(ids), size=min(len(ids), self.retrain_size), replace=False)]
+            centroids = spherical_kmeans(sample.astype(np.float32), self.n_lists)
+            lists = [_Block(self.dim) for _ in range(self.n_lists)]
+            _distribute(lists, centroids, ids, vectors)
+            with self._lock:
+                for added_ids, added in self._added_while_training:
+                    _distribute(lists, centroids, added_ids, added)
+                self._centroids = centroids
+                self._lists = lists
+                # Rows added meanwhile were not in the sample: a re-clustering may still be due
+                self._trained_on = len(ids)
+                self._flat = None
+        finally:
+            with self._lock:
+                self._training = False
+                self._added_while_training = []
+
+    def wait_for_training(self):
+        """Wait for a background clustering run, then run any due one inline."""
+        while True:
+            trainer = self._trainer
+            if trainer is not None:
+                trainer.join()
+            with self._lock:
+                snapshot = self._snapshot_if_due()
+            if snapshot is None:
+                return
+            self._train(*snapshot)
+
+    def search(self, embedding):
+        """(user id, cosine similarity) of the closest enrolled face, or (None, -1.0)."""
+        query = normalize(embedding)
+        with self._lock:
+            self.searches += 1
+            if self._lists is None:
+                return self._flat.best(query)
+            probe = np.argpartition(self._centroids @ query, -self.n_probe)[-self.n_probe:]
+            best_id, best_score = None, -1.0
+            for list_no in probe:
+                user_id, score = self._lists[list_no].best(query)
+                if score > best_score:
+                    best_id, best_score = user_id, score
+            return best_id, best_score
+
+    def find_duplicate(self, embedding):
+        """(user id, similarity) if a face at or above the threshold is enrolled, else None."""
+        user_id, score = self.search(embedding)
+        if user_id is None or score < self.threshold:
+            return None
+        self.duplicates += 1
+        return user_id, score
+
+    def sync(self, db, model):
+        """Load the rows of `model` (user_id, embedding) that are not indexed yet."""
+        with self._lock:
+            top = self._max_user_id
+            recent = set(self._recent)
+        # Committed late, below the highest id already loaded
+        late = [user_id for (user_id,) in db.query(model.user_id)
+                .filter(model.user_id > top - self.sync_overlap, model.user_id <= top)
+                if user_id not in recent]
+        if late:
+            self._add_rows(db.query(model.user_id, model.embedding).filter(model.user_id.in_(late)).all())
+
+        query = db.query(model.user_id, model.embedding) \
+            .filter(model.user_id > top) \
+            .order_by(model.user_id)
+        batch = []
+        for row in query.yield_per(LOAD_BATCH):
+            batch.append(row)
+            if len(batch) == LOAD_BATCH:
+                self._add_rows(batch)
+                batch = []
+        self._add_rows(batch)
+
+    def _add_rows(self, rows: list):
+        if not rows:
+            return
+        ids = np.fromiter((user_id for user_id, _ in rows), dtype=np.int64, count=len(rows))
+        vectors = from_bytes(b"".join(blob for _, blob in rows)).reshape(len(rows), self.dim)
+        self.add_many(ids, vectors)
+
+    def stats(self) -> dict:
+        blocks = self._lists if self._lists is not None else [self._flat]
+        return {
+            "items": len(self),
+            "mode": "flat" if self._lists is None else "ivf",
+            "lists": self.n_lists if self._lists is not None else None,
+            "probe": self.n_probe,
+            "size_bytes": sum(block.size_bytes for block in blocks),
+            "threshold": self.threshold,
+            "searches": self.searches,
+            "duplicates": self.duplicates,
+        }
+
+
+def from_env():
+    """FaceIndex configured from the environment, or None unless FACE_INDEX=1."""
+    if os.getenv("FACE_INDEX", "0") != "1":
+        return None
+    return FaceIndex(
+        threshold=float(os.getenv("FACE_DUPLICATE_THRESHOLD", "0.9")),
+        n_lists=int(os.getenv("FACE_INDEX_LISTS", "1024")),
+        n_probe=int(os.getenv("FACE_INDEX_PROBE", "8")),
+        sync_overlap=int(os.getenv("FACE_INDEX_SYNC_OVERLAP", "1000")),
+    )
@@ -1,11 +1,28 @@
 import requests
+import argparse
+import csv
 import hashlib
 import json
 import os
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 
 # Configuration
 API_URL = "https://ekyc-backend-436637848640.asia-northeast1.run.app"  # Cloud Run Deployment
+BATCH_CHUNK = 1000   # ID hashes per /api/admin/check_citizens request
+BATCH_WORKERS = 4    # chunks in flight at once
+
+def make_session(pool_size: int) -> requests.Session:
+    """Pooled keep-alive session (instead of a new TCP/TLS connection per query)."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+session = make_session(BATCH_WORKERS)
 
 def sha256(data: str) -> str:
     """Compute SHA256 hash of a string."""
@@ -24,7 +41,7 @@ def query_citizen_status(id_number: str, full_name: str):
     id_hash = sha256(id_number)
     
     try:
-        response = requests.get(f"{API_URL}/api/admin/check_citizen/{id_hash}")
+        response = session.get(f"{API_URL}/api/admin/check_citizen/{id_hash}")
         
         if response.status_code == 200:
             data = response.json()
@@ -49,6 +66,56 @@ def query_citizen_status(id_number: str, full_name: str):
         print(f"Connection failed: {e}")
         print("Make sure the backend server availability.")
 
+def read_citizens(path: str) -> list:
+    """
+    Read (id_number, full_name) rows from a CSV file with an id_number column
+    (full_name optional). A file without a header is read as one ID per line.
+    """
+    with open(path, newline='', encoding='utf-8') as f:
+        sample = f.readline()
+        f.seek(0)
+        if "id_number" in sample:
+            return [(row["id_number"].strip(), (row.get("full_name") or "").strip())
+                    for row in csv.DictReader(f) if row["id_number"].strip()]
+        return [(line.strip(), "") for line in f if line.strip()]
+
+def lookup_chunk(id_hashes: list) -> list:
+    response = session.post(f"{API_URL}/api/admin/check_citizens", json={"idHashes": id_hashes})
+    response.raise_for_status()
+    return response.json()["results"]
+
+def batch_query(path: str, out_path: str = None, chunk_size: int = BATCH_CHUNK, workers: int = BATCH_WORKERS):
+    """
+    Look up every citizen in a CSV file: IDs are hashed locally and sent in
+    chunks of `chunk_size` hashes, `workers` chunks at a time, over the pooled
+    session. Writes id_number,full_name,exists,user_id,created_at rows.
+    """
+    citizens = read_citizens(path)
+    id_hashes = [sha256(id_number) for id_number, _ in citizens]
+    chunks = [id_hashes[i:i + chunk_size] for i in range(0, len(id_hashes), chunk_size)]
+    print(f"Querying {len(citizens)} citizens in {len(chunks)} chunk(s) of up to {chunk_size}...")
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = [r for chunk_results in pool.map(lookup_chunk, chunks) for r in chunk_results]
+    elapsed = time.perf_counter() - start
+
+    out = open(out_path, "w", newline='', encoding='utf-8') if out_path else sys.stdout
+    try:
+        writer = csv.writer(out)
+        writer.writerow(["id_number", "full_name", "exists", "user_id", "created_at"])
+        for (id_number, full_name), result in zip(citizens, results):
+            writer.writerow([id_number, full_name, result["exists"],
+                             result.get("user_id", ""), result.get("created_at", "")])
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    matches = sum(r["exists"] for r in results)
+    print(f"\n[RESULT] {matches} of {len(citizens)} citizens have a bank account", file=sys.stderr)
+    print(f"Throughput: {len(citizens) / elapsed:.0f} lookups/s ({elapsed:.2f}s, "
+          f"{len(chunks)} request(s), {workers} concurrent)", file=sys.stderr)
+
 def print_header():
     print("==================================================")
     print("          GOVERNMENT CITIZEN QUERY TOOL           ")
@@ -87,6 +154,20 @@ def main():
             input("\nPress Enter to continue...")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Government citizen query tool")
+    parser.add_argument("--batch", metavar="CSV", help="Look up every citizen in a CSV file instead of the interactive menu")
+    parser.add_argument("--out", help="Write batch results to this CSV (default: stdout)")
+    parser.add_argument("--url", default=API_URL, help="Backend base URL")
+    parser.add_argument("--chunk", type=int, default=BATCH_CHUNK, help="ID hashes per request")
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS, help="Concurrent requests")
+    args = parser.parse_args()
+    API_URL = args.url
+
+    if args.batch:
+        session = make_session(args.workers)
+        batch_query(args.batch, args.out, args.chunk, args.workers)
+        sys.exit(0)
+
     try:
         main()
     except KeyboardInterrupt:
@@ -0,0 +1,136 @@
+"""
+Cache of decoded public keys for the ZKP verifier.
+
+A user's public key never changes, yet every verification used to decode it
+again (VerifyingKey construction plus a modular square root). PublicKeyCache
+keeps the decoded backend point in a bounded LRU keyed by the hex string the
+client sends, and - for keys seen at least `table_min_uses` times - an
+optional precomputed fixed-base table that makes P*c doubling-free. Tables
+are evicted least-recently-used first to stay under `table_budget_bytes`.
+"""
+import threading
+from collections import OrderedDict
+
+
+class _Entry:
+    __slots__ = ("point", "uses", "table")
+
+    def __init__(self, point):
+        self.point = point
+        self.uses = 0
+        self.table = None
+
+
+class PublicKeyCache:
+    def __init__(self, curve_backend, max_entries: int = 100_000,
+                 table_budget_bytes: int = 0, table_min_uses: int = 3):
+        self.backend = curve_backend
+        self.max_entries = max_entries
+        self.table_budget_bytes = table_budget_bytes
+        self.table_min_uses = table_min_uses
+
+        self._entries = OrderedDict()   # hex -> _Entry, LRU order
+        self._tables = OrderedDict()    # hex -> table bytes, LRU order
+        self._table_bytes = 0
+        self._tables_supported = True
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.table_builds = 0
+        self.table_evictions = 0
+
+    def get(self, public_key_hex: str):
+        """
+        Return (point, key_table) for the key, decoding it on a miss.
+        key_table is None unless a table has been built for this key.
+        Raises ValueError for an invalid key (invalid keys are not cached).
+        """
+        key = public_key_hex.lower()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                entry.uses += 1
+                if entry.table is not None:
+                    self._tables.move_to_end(key)
+                    return entry.point, entry.table
+                build = self._should_build_table(entry)
+            else:
+                self.misses += 1
+
+        if entry is None:
+            point = self.backend.decode_point(bytes.fromhex(key))
+            self._insert(key, point)
+            return point, None
+
+        if build:
+            self._build_table(key, entry)
+        return entry.point, entry.table
+
+    def _should_build_table(self, entry: _Entry) -> bool:
+        return (self.table_budget_bytes > 0
+                and self._tables_supported
+                and entry.table is None
+                and entry.uses >= self.table_min_uses)
+
+    def _insert(self, key: str, point):
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = _Entry(point)
+            while len(self._entries) > self.max_entries:
+                old_key, _ = self._entries.popitem(last=False)
+                self._drop_table(old_key)
+                self.evictions += 1
+
+    def _build_table(self, key: str, entry: _Entry):
+        # Built outside the lock; a rare duplicate build is cheaper than
+        # blocking every other verification for the ~10 ms it takes.
+        built = self.backend.build_key_table(entry.point)
+        if built is None:
+            # Backend has no per-key tables; stop trying
+            self._tables_supported = False
+            return
+        table, size = built
+        if size > self.table_budget_bytes:
+            return
+
+        with self._lock:
+            if key not in self._entries or entry.table is not None:
+                return
+            while self._tables and self._table_bytes + size > self.table_budget_bytes:
+                old_key, old_size = self._tables.popitem(last=False)
+                self._table_bytes -= old_size
+                self._entries[old_key].table = None
+                self.table_evictions += 1
+            entry.table = table
+            self._tables[key] = size
+            self._table_bytes += size
+            self.table_builds += 1
+
+    def _drop_table(self, key: str):
+        """Release the table of an evicted entry; caller holds the lock."""
+        size = self._tables.pop(key, None)
+        if size is not None:
+            self._table_bytes -= size
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": self.backend.name,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "tables": len(self._tables),
+                "table_bytes": self._table_bytes,
+                "table_budget_bytes": self.table_budget_bytes,
+                "table_builds": self.table_builds,
+                "table_evictions": self.table_evictions,
+            }
@@ -0,0 +1,196 @@
+"""
+Time partitioning, retention and archival for verification_logs.
+
+verification_logs is the hot table: it keeps its unique nullifier index and
+only holds the last LOG_HOT_HOURS of logins (never less than the session /
+challenge-token lifetime, so a replay inside the session-validity window
+always hits that index). This job
+
+  1. moves older rows into one partition per UTC day
+       Postgres - native partitions of verification_logs_archive
+                  (PARTITION BY RANGE (verified_at)), verification_logs_pYYYYMMDD
+       SQLite   - rolling tables verification_logs_YYYYMMDD
+  2. writes partitions older than LOG_RETENTION_DAYS to gzip-compressed
+     JSONL files in LOG_ARCHIVE_DIR and drops them.
+
+The hot table and its nullifier index therefore stay proportional to the
+login rate, not to the age of the system. Partitions carry no indexes.
+
+Limitation: only the archive is partitioned. verification_logs itself stays
+a plain table on Postgres too, because a unique index on a partitioned table
+must include the partition key, so nullifier uniqueness would have to move to
+a separate narrow table. Moving rows out is therefore INSERT ... SELECT +
+DELETE, not a partition detach: the moved rows stay behind as dead tuples in
+the hot table and its index until autovacuum reclaims them, and the DELETE
+holds row locks while it runs. Run the job often enough (e.g. hourly) that
+each run moves a small slice.
+
+Run it periodically (cron, Cloud Scheduler, ...):
+    python log_retention.py                # once
+    python log_retention.py --loop 3600    # every hour
+"""
+import argparse
+import datetime
+import gzip
+import json
+import os
+import re
+import time
+
+from sqlalchemy import Column, MetaData, String, Table, func, insert, inspect, literal, select, text
+
+import models
+from database import engine
+
+HOT_TABLE = models.VerificationLog.__table__
+ARCHIVE_PARENT = "verification_logs_archive"
+
+# A replayed nullifier is only dangerous while its session/token is valid
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", "300"))
+CLOCK_SKEW_SECONDS = 60
+
+
+def _json_default(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+class LogPartitioner:
+    def __init__(self, engine, hot_hours: float = 24, retention_days: int = 30, archive_dir: str = "archive"):
+        self.engine = engine
+        self.postgres = engine.dialect.name == "postgresql"
+        self.hot_seconds = max(hot_hours * 3600, SESSION_TTL_SECONDS + CLOCK_SKEW_SECONDS)
+        self.retention_days = max(retention_days, int(self.hot_seconds // 86400) + 1)
+        self.archive_dir = archive_dir
+        self._metadata = MetaData()
+        self._pattern = re.compile(r"^verification_logs_p?(\d{8})$")
+
+    # Timestamps: Postgres compares timestamptz. SQLite stores CURRENT_TIMESTAMP
+    # text ('YYYY-MM-DD HH:MM:SS', UTC) and compares it as a string, so the bound
+    # cutoff must use the same format - a bound datetime renders with
+    # microseconds and sorts a row stamped exactly at midnight before it.
+    def _ts(self, moment: datetime.datetime):
+        if self.postgres:
+            return moment
+        return literal(moment.astimezone(datetime.timezone.utc).strftime("%Y-%m-%d %H:%M:%S"), String)
+
+    def _now(self) -> datetime.datetime:
+        return datetime.datetime.now(datetime.timezone.utc)
+
+    def _partition_name(self, day: datetime.date) -> str:
+        return f"verification_logs_{'p' if self.postgres else ''}{day:%Y%m%d}"
+
+    def _table(self, name: str, **kwargs) -> Table:
+        """The hot table's columns, without keys or indexes."""
+        if name in self._metadata.tables:
+            return self._metadata.tables[name]
+        columns = [Column(c.name, c.type, nullable=c.nullable) for c in HOT_TABLE.columns]
+        return Table(name, self._metadata, *columns, **kwargs)
+
+    def _ensure_partition(self, conn, day: datetime.date) -> Table:
+        name = self._partition_name(day)
+        if self.postgres:
+            parent = self._table(ARCHIVE_PARENT, postgresql_partition_by="RANGE (verified_at)")
+            parent.create(conn, checkfirst=True)
+            start, end = day, day + datetime.timedelta(days=1)
+            conn.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {ARCHIVE_PARENT} "
+                f"FOR VALUES FROM ('{start:%Y-%m-%d} 00:00:00+00') TO ('{end:%Y-%m-%d} 00:00:00+00')"
+            ))
+            return parent
+        table = self._table(name)
+        table.create(conn, checkfirst=True)
+        return table
+
+    def partitions(self) -> dict:
+        """UTC day -> partition table name, for every existing partition."""
+        found = {}
+        for name in inspect(self.engine).get_table_names():
+            match = self._pattern.match(name)
+            if match:
+                found[datetime.datetime.strptime(match.group(1), "%Y%m%d").date()] = name
+        return found
+
+    def partition_old_rows(self, now: datetime.datetime = None) -> int:
+        """Move hot rows older than the hot window into their day partition."""
+        cutoff = (now or self._now()) - datetime.timedelta(seconds=self.hot_seconds)
+        moved = 0
+        with self.engine.begin() as conn:
+            oldest = conn.execute(select(func.min(HOT_TABLE.c.verified_at))).scalar()
+        if oldest is None:
+            return 0
+        day = oldest.date()
+        while day <= cutoff.date():
+            start = datetime.datetime.combine(day, datetime.time(), datetime.timezone.utc)
+            end = min(start + datetime.timedelta(days=1), cutoff)
+            in_range = (HOT_TABLE.c.verified_at >= self._ts(start)) & (HOT_TABLE.c.verified_at < self._ts(end))
+            # One transaction per day: rows are never in both tables or neither
+            with self.engine.begin() as conn:
+                if conn.execute(select(HOT_TABLE.c.id).where(in_range).limit(1)).first() is None:
+                    day += datetime.timedelta(days=1)
+                    continue
+                target = self._ensure_partition(conn, day)
+                columns = [c.name for c in HOT_TABLE.columns]
+                conn.execute(insert(target).from_select(columns, select(*HOT_TABLE.c).where(in_range)))
+                moved += conn.execute(HOT_TABLE.delete().where(in_range)).rowcount
+            day += datetime.timedelta(days=1)
+        return moved
+
+    def archive_expired(self, now: datetime.datetime = None) -> list:
+        """Write partitions older than the retention period to .jsonl.gz and drop them."""
+        oldest_kept = (now or self._now()).date() - datetime.timedelta(days=self.retention_days)
+        archived = []
+        for day, name in sorted(self.partitions().items()):
+            if day >= oldest_kept:
+                continue
+            os.makedirs(self.archive_dir, exist_ok=True)
+            path = os.path.join(self.archive_dir, f"verification_logs_{day:%Y%m%d}.jsonl.gz")
+            table = self._table(name)
+            rows = 0
+            with self.engine.connect() as conn:
+                with gzip.open(path + ".tmp", "wt", encoding="utf-8") as out:
+                    for row in conn.execution_options(yield_per=10000).execute(select(table)).mappings():
+                        out.write(json.dumps(dict(row), default=_json_default) + "\n")
+                        rows += 1
+            os.replace(path + ".tmp", path)
+            with self.engine.begin() as conn:
+                conn.execute(text(f"DROP TABLE {name}"))
+            self._metadata.remove(table)
+            archived.append((name, rows, path))
+        return archived
+
+    def run(self, now: datetime.datetime = None) -> dict:
+        moved = self.partition_old_rows(now)
+        archived = self.archive_expired(now)
+        return {"moved": moved, "archived": archived}
+
+
+def from_env() -> LogPartitioner:
+    return LogPartitioner(
+        engine,
+        hot_hours=float(os.getenv("LOG_HOT_HOURS", "24")),
+        retention_days=int(os.getenv("LOG_RETENTION_DAYS", "30")),
+        archive_dir=os.getenv("LOG_ARCHIVE_DIR", "archive"),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Partition, archive and drop old verification logs")
+    parser.add_argument("--loop", type=float, metavar="SECONDS", help="Repeat every SECONDS instead of once")
+    args = parser.parse_args()
+
+    models.Base.metadata.create_all(bind=engine)
+    partitioner = from_env()
+    while True:
+        result = partitioner.run()
+        print(f"[log_retention] moved {result['moved']} row(s) out of verification_logs")
+        for name, rows, path in result["archived"]:
+            print(f"[log_retention] archived {name} ({rows} rows) to {path}")
+        if not args.loop:
+            break
+        time.sleep(args.loop)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,99 +1,308 @@
-from fastapi import FastAPI, HTTPException, Depends
-from sqlalchemy.orm import Session
-from pydantic import BaseModel
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Depends, Request
+from fastapi.exception_handlers import http_exception_handler
+from fastapi.responses import PlainTextResponse
+from sqlalchemy import or_
+from sqlalchemy.orm import Session, load_only
+from sqlalchemy.exc import IntegrityError
 import models
-from database import engine, get_db
+from schemas import (
+    EnrollmentPayload, VerificationPayload, BatchVerificationPayload, CitizenLookupPayload,
+    enrollment_message, verification_message, proof_to_dict,
+)
+from database import engine, get_db, SessionLocal
+from db_types import HASH_BYTES, storable_hex
 import zkp
-import uuid
+import os
+import secrets
 import time
+import logging
+import structured_log
+import metrics
+from session_store import SessionStore
+from challenge_token import ChallengeSigner, load_keys
+from nullifier_filter import NullifierFilter
+from write_batcher import WriteBatcher
+from user_cache import UserLookupCache, register_invalidation
+import enroll_ingest
+import proof_pool
+import face_index as face_index_module
+import face_embedding
 
 # Create tables
 models.Base.metadata.create_all(bind=engine)
 
-app = FastAPI(title="eKyc ZKP Server")
-
-# Pydantic Models
-class ProofData(BaseModel):
-    commitmentR: str
-    challenge: str
-    response: str
-
-class EnrollmentPayload(BaseModel):
-    publicKey: str
-    commitment: str
-    idNumberHash: str
-    encryptedPII: str
-    proof: ProofData
-    timestamp: int
-    fullNameHash: str
-    dobHash: str
-    approval: int
-
-class VerificationPayload(BaseModel):
-    publicKey: str
-    proof: ProofData
-    nullifier: str
-    timestamp: int
-
-# In-memory session store (for simplicity)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Bulk enrollment starts the proof pool on first use
+    proof_pool.shutdown()
+
+app = FastAPI(title="eKyc ZKP Server", lifespan=lifespan)
+
+# JSON logs go through a queue; request threads never write to stdout
+structured_log.setup()
+logger = structured_log.get_logger("api")
+
+@app.exception_handler(HTTPException)
+async def log_rejection(request: Request, exc: HTTPException):
+    metrics.reject(request.url.path, exc.detail)
+    structured_log.event(logger, logging.INFO, "request.rejected",
+                         path=request.url.path, status=exc.status_code, detail=exc.detail)
+    return await http_exception_handler(request, exc)
+
+# In-memory session store with TTL expiry and a size cap
 # In prod, use Redis
-sessions = {}
+sessions = SessionStore(
+    ttl_seconds=float(os.getenv("SESSION_TTL_SECONDS", "300")),
+    max_sessions=int(os.getenv("SESSION_MAX", "100000")),
+    shards=int(os.getenv("SESSION_SHARDS", "16")),
+)
+
+# Challenge mode:
+#   session - ids kept in this worker's SessionStore (verify must hit the same worker)
+#   token   - stateless HMAC-signed tokens any worker/instance can check;
+#             CHALLENGE_SECRET (comma-separated hex keys, newest first) must be
+#             shared by all of them
+CHALLENGE_MODE = os.getenv("CHALLENGE_MODE", "session")
+
+if CHALLENGE_MODE == "token":
+    if os.getenv("CHALLENGE_SECRET"):
+        challenge_keys = load_keys(os.environ["CHALLENGE_SECRET"])
+    else:
+        logger.warning("CHALLENGE_SECRET not set, using a per-process key (single worker only)")
+        challenge_keys = [secrets.token_bytes(32)]
+    challenge_signer = ChallengeSigner(challenge_keys, sessions.ttl)
+else:
+    challenge_signer = None
+
+def session_valid(session_id: str) -> bool:
+    if challenge_signer is not None:
+        return challenge_signer.verify(session_id) is not None
+    return session_id in sessions
+
+# Used token nonces are kept until the token expires, then purged
+USED_CHALLENGE_PURGE_SECONDS = 60
+_next_purge = 0.0
+
+def _purge_used_challenges(db: Session):
+    global _next_purge
+    now = time.monotonic()
+    if now < _next_purge:
+        return
+    _next_purge = now + USED_CHALLENGE_PURGE_SECONDS
+    db.query(models.UsedChallenge) \
+        .filter(models.UsedChallenge.expires_ms < int(time.time() * 1000)) \
+        .delete(synchronize_session=False)
+    db.commit()
+
+def claim_challenges(db: Session, session_ids: list) -> list:
+    """
+    Use up challenges before the login is logged; one entry per id: None if
+    it is invalid or expired, else the rows to insert in the same transaction
+    as the login's VerificationLog.
+    Session ids are removed from this worker's store (no rows). A token
+    yields a UsedChallenge for its nonce, whose primary key makes the token
+    single-use on every worker even when the proof is replayed with a new
+    nullifier; if the log write fails, the nonce stays unused.
+    """
+    if challenge_signer is None:
+        return [[] if sessions.consume(session_id) else None for session_id in session_ids]
+
+    _purge_used_challenges(db)
+    claimed = []
+    for session_id in session_ids:
+        claims = challenge_signer.claims(session_id)
+        claimed.append(None if claims is None else [models.UsedChallenge(nonce=claims[2], expires_ms=claims[1])])
+    return claimed
+
+def conflict_detail(db: Session, claim_rows: list) -> str:
+    """Rejection detail for an IntegrityError on a login's log and claim rows."""
+    if any(db.get(models.UsedChallenge, row.nonce) is not None for row in claim_rows):
+        return "Invalid or expired session"
+    return "Replay attack detected (Nullifier used)"
+
+# Bloom prefilter of used nullifiers: fresh nullifiers skip the DB lookup.
+# The unique index on verification_logs.nullifier remains authoritative.
+if os.getenv("NULLIFIER_FILTER", "1") == "1":
+    nullifier_filter = NullifierFilter(
+        capacity=int(os.getenv("NULLIFIER_FILTER_CAPACITY", "1000000")),
+        fp_rate=float(os.getenv("NULLIFIER_FILTER_FP_RATE", "0.001")),
+    )
+    _db = SessionLocal()
+    try:
+        nullifier_filter.load(_db, models.VerificationLog)
+    finally:
+        _db.close()
+else:
+    nullifier_filter = None
+
+def nullifier_used(db: Session, nullifier: str) -> bool:
+    if nullifier_filter is not None and not nullifier_filter.might_contain(nullifier):
+        return False
+    with metrics.timed("nullifier_query"):
+        used = db.query(models.VerificationLog.id).filter(models.VerificationLog.nullifier == nullifier).first() is not None
+    if not used and nullifier_filter is not None:
+        nullifier_filter.record_false_positive()
+    return used
+
+def nullifier_logged(nullifier: str):
+    """Record a committed nullifier in the prefilter."""
+    if nullifier_filter is not None:
+        nullifier_filter.add(nullifier)
+
+# Group commit: inserts from concurrent requests share one transaction
+if os.getenv("WRITE_BATCH", "0") == "1":
+    write_batcher = WriteBatcher(
+        SessionLocal,
+        max_batch=int(os.getenv("WRITE_BATCH_MAX", "64")),
+        max_wait_ms=float(os.getenv("WRITE_BATCH_WAIT_MS", "5")),
+    )
+else:
+    write_batcher = None
+
+# Public key -> user id cache for the login path (USER_CACHE_SIZE=0 disables)
+if int(os.getenv("USER_CACHE_SIZE", "100000")) > 0:
+    user_cache = UserLookupCache(
+        max_entries=int(os.getenv("USER_CACHE_SIZE", "100000")),
+        ttl_seconds=float(os.getenv("USER_CACHE_TTL_SECONDS", "300")),
+    )
+    register_invalidation(user_cache, models.User)
+else:
+    user_cache = None
+
+def user_id_for_key(db: Session, public_key: str):
+    """Id of the user enrolled with public_key, or None."""
+    def load(key):
+        return db.query(models.User.id).filter(models.User.public_key == key).scalar()
+    with metrics.timed("user_query"):
+        if user_cache is None:
+            return load(public_key)
+        return user_cache.get_or_load(public_key, load)
+
+# Duplicate-face index over enrollment embeddings (FACE_INDEX=1 enables)
+face_index = face_index_module.from_env()
+if face_index is not None:
+    _db = SessionLocal()
+    try:
+        face_index.sync(_db, models.FaceEmbedding)
+    finally:
+        _db.close()
+    # Cluster at startup; later clustering runs in the background
+    face_index.wait_for_training()
+
+def face_vector(payload: EnrollmentPayload):
+    """
+    Embedding of the payload's faceFrames (required), computed by the face
+    embedding service, or None if the index is off. Blocks on an HTTP call.
+    """
+    if face_index is None:
+        return None
+    if payload.faceFrames is None:
+        raise HTTPException(status_code=400, detail="Face frames required")
+    try:
+        with metrics.timed("face_embed"):
+            vector = face_embedding.embed([payload.faceFrames])[0]
+    except face_embedding.EmbeddingUnavailable as e:
+        structured_log.event(logger, logging.ERROR, "enroll.face_embedding_unavailable", error=str(e))
+        raise HTTPException(status_code=503, detail="Face embedding service unavailable")
+    if vector is None:
+        raise HTTPException(status_code=400, detail="Invalid face frames")
+    return vector
+
+def check_duplicate_face(vector, public_key: str):
+    """Reject the enrollment if the face is already enrolled (the index must be synced)."""
+    with metrics.timed("face_search"):
+        match = face_index.find_duplicate(vector)
+    if match is not None:
+        user_id, score = match
+        structured_log.event(logger, logging.WARNING, "enroll.duplicate_face",
+                             matchedUserId=user_id, similarity=round(score, 4), publicKey=public_key)
+        raise HTTPException(status_code=400, detail="Face already enrolled")
+
+def insert_with_face(db: Session, user, vector) -> int:
+    """
+    Insert user with its face embedding and return its id. The face is checked
+    inside the insert transaction, behind face_index.lock_inserts(), so two
+    workers cannot both accept one face; this bypasses the write batcher.
+    Raises HTTPException for a duplicate face, IntegrityError on a
+    unique-constraint conflict.
+    """
+    try:
+        face_index_module.lock_inserts(db)
+        with metrics.timed("face_sync"):
+            face_index.sync(db, models.FaceEmbedding)
+        check_duplicate_face(vector, user.public_key)
+        user.face_embedding = models.FaceEmbedding(embedding=face_index_module.to_bytes(vector))
+        with metrics.timed("commit"):
+            db.add(user)
+            db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    face_index.add(user.id, vector)
+    return user.id
+
+def save(db: Session, obj, *related) -> int:
+    """
+    Insert obj (and related rows, in the same transaction) and return its id,
+    through the write batcher when enabled.
+    Raises IntegrityError on a unique-constraint conflict.
+    """
+    with metrics.timed("commit"):
+        if write_batcher is not None:
+            return write_batcher.submit(obj, *related).result()
+        db.add_all([obj, *related])
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            raise
+        db.refresh(obj)
+        return obj.id
 
 @app.get("/api/challenge")
 def get_challenge():
-    """Generate a random session ID for login"""
-    session_id = str(uuid.uuid4())
-    sessions[session_id] = int(time.time() * 1000)
+    """Generate a random session ID (or signed challenge token) for login"""
+    if challenge_signer is not None:
+        return {"sessionId": challenge_signer.issue()}
+    session_id = sessions.create()
     return {"sessionId": session_id}
 
+def enrolled_query(payload: EnrollmentPayload):
+    """Columns + filter finding a user with the payload's ID hash or public key."""
+    return (models.User.id_hash,), or_(models.User.id_hash == payload.idNumberHash,
+                                       models.User.public_key == payload.publicKey)
+
+def existing_detail(payload: EnrollmentPayload, id_hash: str) -> str:
+    """Rejection detail for an existing user row whose id_hash is `id_hash`."""
+    # Compact columns read back as lowercase hex
+    if id_hash.lower() == payload.idNumberHash.lower():
+        return "ID already enrolled"
+    return "Public key already enrolled"
+
 @app.post("/api/enroll")
 def enroll(payload: EnrollmentPayload, db: Session = Depends(get_db)):
-    # 1. Check if ID already enrolled
-    if db.query(models.User).filter(models.User.id_hash == payload.idNumberHash).first():
-        raise HTTPException(status_code=400, detail="ID already enrolled")
+    # 1. Check if ID or public key already enrolled
+    columns, condition = enrolled_query(payload)
+    with metrics.timed("duplicate_query"):
+        enrolled = db.query(*columns).filter(condition).first()
+    if enrolled:
+        raise HTTPException(status_code=400, detail=existing_detail(payload, enrolled.id_hash))
     
     # 2. Reconstruct message
-    # Message format must match Client: "ENROLL:commitment:id:name:dob:approval:ts"
-    # Wait, looking at ZKPEnrollmentManager.kt:
-    # "ENROLL:" + "commitment:$commitment:" + "id:$idNumberHash:" + ...
-    # Let's double check the exact format in ZKPEnrollmentManager.kt
-    
-    # From ZKPEnrollmentManager.kt:
-    # return "ENROLL:" +
-    #         "commitment:$commitment:" +
-    #         "id:$idNumberHash:" +
-    #         "name:$fullNameHash:" +
-    #         "dob:$dobHash:" +
-    #         "approval:$approval:" +
-    #         "ts:$timestamp"
-            
-    message = (f"ENROLL:commitment:{payload.commitment}:"
-               f"id:{payload.idNumberHash}:"
-               f"name:{payload.fullNameHash}:"
-               f"dob:{payload.dobHash}:"
-               f"approval:{payload.approval}:"
-               f"ts:{payload.timestamp}")
+    message = enrollment_message(payload)
                
     # 3. Verify Proof
-    proof_dict = {
-        "commitmentR": payload.proof.commitmentR,
-        "challenge": payload.proof.challenge,
-        "response": payload.proof.response
-    }
+    proof_dict = proof_to_dict(payload.proof)
     
     if not zkp.verify_proof(payload.publicKey, proof_dict, message):
         raise HTTPException(status_code=400, detail="Invalid ZKP Proof")
-        
-    # Log received payload
-    print(f"--- [SERVER] Received Enrollment Payload ---")
-    print(f"Public Key: {payload.publicKey}")
-    print(f"Commitment: {payload.commitment}")
-    print(f"ID Hash: {payload.idNumberHash}")
-    print(f"Encrypted PII: {payload.encryptedPII}")
-    print(f"Proof: {proof_dict}")
-    print(f"------------------------------------------")
-
-    # 4. Save to DB
+
+    # 4. Save to DB; a face is checked against every enrolled face in the
+    #    same transaction (after the proof, so the index cannot be probed
+    #    with unsigned payloads)
+    vector = face_vector(payload)
     new_user = models.User(
         public_key=payload.publicKey,
         commitment=payload.commitment,
@@ -101,58 +310,178 @@ def enroll(payload: EnrollmentPayload, db: Session = Depends(get_db)):
         encrypted_pii=payload.encryptedPII,
         enrollment_proof=proof_dict
     )
-    
-    print(f"--- [SERVER] Storing User to DB ---")
-    print(f"User ID Hash: {new_user.id_hash}")
-    print(f"User Public Key: {new_user.public_key}")
-    print(f"-----------------------------------")
 
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    try:
+        user_id = save(db, new_user) if vector is None else insert_with_face(db, new_user, vector)
+    except IntegrityError as e:
+        # Enrolled concurrently since the check above
+        raise HTTPException(status_code=400, detail=enroll_ingest.conflict_detail(e))
+    structured_log.event(logger, logging.INFO, "enroll.accepted", sample=True,
+                         userId=user_id, publicKey=payload.publicKey)
     
-    return {"success": True, "userId": new_user.id}
+    return {"success": True, "userId": user_id}
+
+@app.post("/api/enroll/bulk")
+async def enroll_bulk():
+    """
+    Bulk enrollment: the body is NDJSON, one /api/enroll payload per line.
+    Streams back one NDJSON result per line ({"line", "success", "userId" | "detail"})
+    as each chunk of BULK_ENROLL_CHUNK records is checked and committed.
+    """
+    return enroll_ingest.NDJSONStreamingResponse(
+        lambda byte_chunks: enroll_ingest.ingest_ndjson(byte_chunks, SessionLocal, face_index=face_index))
 
 @app.post("/api/verify")
 def verify(payload: VerificationPayload, sessionId: str, db: Session = Depends(get_db)):
     # 1. Check session validity (simple check)
-    if sessionId not in sessions:
+    if not session_valid(sessionId):
         raise HTTPException(status_code=400, detail="Invalid or expired session")
         
     # 2. Check nullifier (Replay Attack Prevention)
-    if db.query(models.VerificationLog).filter(models.VerificationLog.nullifier == payload.nullifier).first():
+    if nullifier_used(db, payload.nullifier):
         raise HTTPException(status_code=400, detail="Replay attack detected (Nullifier used)")
         
     # 3. Get User
-    user = db.query(models.User).filter(models.User.public_key == payload.publicKey).first()
-    if not user:
+    user_id = user_id_for_key(db, payload.publicKey)
+    if user_id is None:
         raise HTTPException(status_code=404, detail="User not found")
         
     # 4. Verify Proof
-    # Message: "VERIFY:$sessionId:$timestamp"
-    message = f"VERIFY:{sessionId}:{payload.timestamp}"
-    
-    proof_dict = {
-        "commitmentR": payload.proof.commitmentR,
-        "challenge": payload.proof.challenge,
-        "response": payload.proof.response
-    }
+    message = verification_message(sessionId, payload.timestamp)
+    proof_dict = proof_to_dict(payload.proof)
     
     if not zkp.verify_proof(payload.publicKey, proof_dict, message):
         raise HTTPException(status_code=400, detail="Invalid ZKP Proof")
+
+    # 5. Use up the session / challenge token
+    claim_rows = claim_challenges(db, [sessionId])[0]
+    if claim_rows is None:
+        raise HTTPException(status_code=400, detail="Invalid or expired session")
         
-    # 5. Log verification (consume nullifier)
+    # 6. Log verification (consume nullifier and token together)
     log = models.VerificationLog(
         nullifier=payload.nullifier,
         proof=proof_dict
     )
-    db.add(log)
-    db.commit()
+    try:
+        save(db, log, *claim_rows)
+    except IntegrityError:
+        # Nullifier or token used concurrently (e.g. by another worker) since the checks above
+        raise HTTPException(status_code=400, detail=conflict_detail(db, claim_rows))
+    nullifier_logged(payload.nullifier)
+    structured_log.event(logger, logging.INFO, "verify.accepted", sample=True,
+                         userId=user_id, nullifier=payload.nullifier)
     
-    # Remove session
-    del sessions[sessionId]
-    
-    return {"success": True, "userId": user.id}
+    return {"success": True, "userId": user_id}
+
+# Nullifiers per IN (...) query in verify_batch
+VERIFY_BATCH_CHUNK = int(os.getenv("VERIFY_BATCH_CHUNK", "1000"))
+
+@app.post("/api/verify/batch")
+def verify_batch(payload: BatchVerificationPayload, db: Session = Depends(get_db)):
+    """
+    Verify many logins in one request.
+    Session, nullifier and user checks run per item exactly as in /api/verify;
+    the surviving proofs are then checked together with zkp.verify_proofs_batch.
+    Returns one result per item, in order. At most VERIFY_BATCH_MAX items (422).
+    """
+    results = [None] * len(payload.items)
+    pending = []  # (index, user_id, proof_dict)
+    seen_nullifiers = set()
+    seen_sessions = set()
+
+    # Only nullifiers the prefilter cannot rule out go to the database
+    nullifiers = [item.nullifier for item in payload.items
+                  if nullifier_filter is None or nullifier_filter.might_contain(item.nullifier)]
+    used = set()
+    with metrics.timed("nullifier_query"):
+        for start in range(0, len(nullifiers), VERIFY_BATCH_CHUNK):
+            chunk = nullifiers[start:start + VERIFY_BATCH_CHUNK]
+            used.update(row.nullifier for row in db.query(models.VerificationLog.nullifier)
+                        .filter(models.VerificationLog.nullifier.in_(chunk)))
+
+    for i, item in enumerate(payload.items):
+        if item.sessionId in seen_sessions or not session_valid(item.sessionId):
+            results[i] = {"success": False, "detail": "Invalid or expired session"}
+            continue
+        if item.nullifier in used or item.nullifier in seen_nullifiers:
+            results[i] = {"success": False, "detail": "Replay attack detected (Nullifier used)"}
+            continue
+        user_id = user_id_for_key(db, item.publicKey)
+        if user_id is None:
+            results[i] = {"success": False, "detail": "User not found"}
+            continue
+
+        seen_nullifiers.add(item.nullifier)
+        seen_sessions.add(item.sessionId)
+        pending.append((i, user_id, proof_to_dict(item.proof)))
+
+    checks = zkp.verify_proofs_batch([
+        (payload.items[i].publicKey, proof_dict,
+         verification_message(payload.items[i].sessionId, payload.items[i].timestamp))
+        for i, _, proof_dict in pending
+    ])
+
+    verified = []
+    for (i, user_id, proof_dict), ok in zip(pending, checks):
+        if ok:
+            verified.append((i, user_id, proof_dict))
+        else:
+            results[i] = {"success": False, "detail": "Invalid ZKP Proof"}
+
+    accepted = []  # (index, user_id, [log, *claim_rows])
+    claimed = claim_challenges(db, [payload.items[i].sessionId for i, _, _ in verified])
+    for (i, user_id, proof_dict), claim_rows in zip(verified, claimed):
+        if claim_rows is None:
+            results[i] = {"success": False, "detail": "Invalid or expired session"}
+            continue
+        log = models.VerificationLog(nullifier=payload.items[i].nullifier, proof=proof_dict)
+        accepted.append((i, user_id, [log, *claim_rows]))
+
+    db.add_all([row for _, _, rows in accepted for row in rows])
+    try:
+        with metrics.timed("commit"):
+            db.commit()
+    except IntegrityError:
+        # Some nullifier or token was used concurrently: commit one by one to find it
+        db.rollback()
+        committed = []
+        for i, user_id, rows in accepted:
+            db.add_all(rows)
+            try:
+                db.commit()
+                committed.append((i, user_id, rows))
+            except IntegrityError:
+                db.rollback()
+                results[i] = {"success": False, "detail": conflict_detail(db, rows[1:])}
+        accepted = committed
+
+    for i, user_id, _ in accepted:
+        nullifier_logged(payload.items[i].nullifier)
+        results[i] = {"success": True, "userId": user_id}
+
+    for result in results:
+        if not result["success"]:
+            metrics.reject("/api/verify/batch", result["detail"])
+    return {"results": results}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """Per-stage latency histograms and rejection counters of this worker (Prometheus text format)."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/admin/stats")
+def admin_stats():
+    """[ADMIN] In-memory state of this worker: sessions, caches, prefilter, write batcher."""
+    return {
+        "sessions": sessions.stats(),
+        "keyCache": zkp.key_cache_stats(),
+        "nullifierFilter": nullifier_filter.stats() if nullifier_filter is not None else None,
+        "writeBatcher": write_batcher.stats() if write_batcher is not None else None,
+        "userCache": user_cache.stats() if user_cache is not None else None,
+        "faceIndex": face_index.stats() if face_index is not None else None,
+        "logging": structured_log.stats(),
+    }
 
 @app.get("/api/admin/check_citizen/{id_hash}")
 def check_citizen(id_hash: str, db: Session = Depends(get_db)):
@@ -162,7 +491,10 @@ def check_citizen(id_hash: str, db: Session = Depends(get_db)):
     if 'Hash(ID)' exists in the bank's database without revealing the ID to the bank 
     (if the bank didn't already have it) or dumping the whole DB.
     """
-    user = db.query(models.User).filter(models.User.id_hash == id_hash).first()
+    if not storable_hex(id_hash, HASH_BYTES):
+        return {"exists": False}
+    user = db.query(models.User).options(load_only(models.User.id, models.User.created_at)) \
+        .filter(models.User.id_hash == id_hash).first()
     
     if user:
         return {"exists": True, "user_id": user.id, "created_at": user.created_at}
@@ -170,5 +502,37 @@ def check_citizen(id_hash: str, db: Session = Depends(get_db)):
         return {"exists": False}
 
 
+# Batch citizen lookup: hashes per request and per IN (...) query
+# (SQLite allows at most 32766 bound parameters per statement)
+CITIZEN_LOOKUP_MAX = int(os.getenv("CITIZEN_LOOKUP_MAX", "50000"))
+CITIZEN_LOOKUP_CHUNK = int(os.getenv("CITIZEN_LOOKUP_CHUNK", "1000"))
+
+@app.post("/api/admin/check_citizens")
+def check_citizens(payload: CitizenLookupPayload, db: Session = Depends(get_db)):
+    """
+    [GOVERNMENT/ADMIN DEMO] Batch version of check_citizen.
+    Answers every hash in idHashes (in request order) with the same fields as
+    the single lookup, using one IN (...) query per CITIZEN_LOOKUP_CHUNK hashes.
+    """
+    if len(payload.idHashes) > CITIZEN_LOOKUP_MAX:
+        raise HTTPException(status_code=413, detail=f"At most {CITIZEN_LOOKUP_MAX} ID hashes per request")
+
+    # Hex of the wrong size cannot be in a compact id_hash column
+    unique = [h for h in dict.fromkeys(payload.idHashes) if storable_hex(h, HASH_BYTES)]
+    found = {}
+    for start in range(0, len(unique), CITIZEN_LOOKUP_CHUNK):
+        chunk = unique[start:start + CITIZEN_LOOKUP_CHUNK]
+        rows = db.query(models.User.id_hash, models.User.id, models.User.created_at) \
+            .filter(models.User.id_hash.in_(chunk))
+        # Compact columns read back as lowercase hex: key by the lowercase hash
+        for id_hash, user_id, created_at in rows:
+            found[id_hash.lower()] = {"exists": True, "user_id": user_id, "created_at": created_at}
+
+    return {"results": [
+        {"id_hash": id_hash, **found.get(id_hash.lower(), {"exists": False})}
+        for id_hash in payload.idHashes
+    ]}
+
+
 def detect(img):
     return random.choice([True, False])
\ No newline at end of file
@@ -0,0 +1,177 @@
+"""
+Async variant of the eKyc ZKP server.
+
+    uvicorn main_async:app --port 8001
+
+/api/challenge, /api/enroll and /api/verify run as coroutines: proof checks
+go to a process pool (proof_pool.py, PROOF_WORKERS processes, default one
+per core) and database access uses SQLAlchemy's async engine (aiosqlite for
+the local SQLite file, asyncpg for Postgres). Every other route, the session
+store, challenge tokens, the nullifier prefilter and the face index are
+shared with main.py.
+"""
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from starlette.concurrency import run_in_threadpool
+
+import enroll_ingest
+import main
+import metrics
+import models
+import proof_pool
+import structured_log
+from database import SessionLocal, get_async_sessionmaker
+from schemas import EnrollmentPayload, VerificationPayload, enrollment_message, verification_message, proof_to_dict
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await proof_pool.started()
+    yield
+    proof_pool.shutdown()
+
+app = FastAPI(title="eKyc ZKP Server (async)", lifespan=lifespan)
+app.add_exception_handler(HTTPException, main.log_rejection)
+
+
+async def nullifier_used(db, nullifier: str) -> bool:
+    if main.nullifier_filter is not None and not main.nullifier_filter.might_contain(nullifier):
+        return False
+    with metrics.timed("nullifier_query"):
+        result = await db.execute(
+            select(models.VerificationLog.id).where(models.VerificationLog.nullifier == nullifier).limit(1)
+        )
+    used = result.first() is not None
+    if not used and main.nullifier_filter is not None:
+        main.nullifier_filter.record_false_positive()
+    return used
+
+
+async def user_id_for_key(db, public_key: str):
+    """Async counterpart of main.user_id_for_key (shares the same cache)."""
+    with metrics.timed("user_query"):
+        user_id = main.user_cache.get(public_key) if main.user_cache is not None else None
+        if user_id is None:
+            result = await db.execute(
+                select(models.User.id).where(models.User.public_key == public_key).limit(1)
+            )
+            user_id = result.scalar()
+            if user_id is not None and main.user_cache is not None:
+                main.user_cache.put(public_key, user_id)
+    return user_id
+
+
+def insert_with_face(user, vector) -> int:
+    """main.insert_with_face on a sync session; the face sync and search are CPU-bound."""
+    with SessionLocal() as db:
+        return main.insert_with_face(db, user, vector)
+
+
+async def save(db, obj, *related) -> int:
+    """Async counterpart of main.save (shares the same write batcher)."""
+    with metrics.timed("commit"):
+        if main.write_batcher is not None:
+            return await asyncio.wrap_future(main.write_batcher.submit(obj, *related))
+        db.add_all([obj, *related])
+        try:
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            raise
+        return obj.id
+
+
+@app.get("/api/challenge")
+async def get_challenge():
+    """Generate a random session ID (or signed challenge token) for login"""
+    return main.get_challenge()
+
+
+@app.post("/api/enroll")
+async def enroll(payload: EnrollmentPayload):
+    async with get_async_sessionmaker()() as db:
+        # 1. Check if ID or public key already enrolled
+        columns, condition = main.enrolled_query(payload)
+        with metrics.timed("duplicate_query"):
+            existing = (await db.execute(select(*columns).where(condition).limit(1))).first()
+        if existing is not None:
+            raise HTTPException(status_code=400, detail=main.existing_detail(payload, existing.id_hash))
+
+        # 2-3. Reconstruct message and verify proof off the event loop
+        proof_dict = proof_to_dict(payload.proof)
+        if not await proof_pool.verify_proof(payload.publicKey, proof_dict, enrollment_message(payload)):
+            raise HTTPException(status_code=400, detail="Invalid ZKP Proof")
+
+        # 4. Save to DB; a face is checked in the same transaction, on a worker thread
+        vector = await run_in_threadpool(main.face_vector, payload)
+        new_user = models.User(
+            public_key=payload.publicKey,
+            commitment=payload.commitment,
+            id_hash=payload.idNumberHash,
+            encrypted_pii=payload.encryptedPII,
+            enrollment_proof=proof_dict
+        )
+        try:
+            if vector is None:
+                user_id = await save(db, new_user)
+            else:
+                user_id = await run_in_threadpool(insert_with_face, new_user, vector)
+        except IntegrityError as e:
+            raise HTTPException(status_code=400, detail=enroll_ingest.conflict_detail(e))
+
+        structured_log.event(main.logger, logging.INFO, "enroll.accepted", sample=True,
+                             userId=user_id, publicKey=payload.publicKey)
+        return {"success": True, "userId": user_id}
+
+
+@app.post("/api/verify")
+async def verify(payload: VerificationPayload, sessionId: str):
+    # 1. Check session validity
+    if not main.session_valid(sessionId):
+        raise HTTPException(status_code=400, detail="Invalid or expired session")
+
+    async with get_async_sessionmaker()() as db:
+        # 2. Check nullifier (Replay Attack Prevention)
+        if await nullifier_used(db, payload.nullifier):
+            raise HTTPException(status_code=400, detail="Replay attack detected (Nullifier used)")
+
+        # 3. Get User
+        user_id = await user_id_for_key(db, payload.publicKey)
+        if user_id is None:
+            raise HTTPException(status_code=404, detail="User not found")
+
+        # 4. Verify Proof
+        proof_dict = proof_to_dict(payload.proof)
+        message = verification_message(sessionId, payload.timestamp)
+        if not await proof_pool.verify_proof(payload.publicKey, proof_dict, message):
+            raise HTTPException(status_code=400, detail="Invalid ZKP Proof")
+
+        # 5. Use up the session / challenge token
+        claim_rows = (await db.run_sync(main.claim_challenges, [sessionId]))[0]
+        if claim_rows is None:
+            raise HTTPException(status_code=400, detail="Invalid or expired session")
+
+        # 6. Log verification (consume nullifier and token together)
+        try:
+            await save(db, models.VerificationLog(nullifier=payload.nullifier, proof=proof_dict), *claim_rows)
+        except IntegrityError:
+            detail = await db.run_sync(main.conflict_detail, claim_rows)
+            raise HTTPException(status_code=400, detail=detail)
+
+    main.nullifier_logged(payload.nullifier)
+    structured_log.event(main.logger, logging.INFO, "verify.accepted", sample=True,
+                         userId=user_id, nullifier=payload.nullifier)
+
+    return {"success": True, "userId": user_id}
+
+
+# Everything else (batch verify, admin endpoints) is served by the sync handlers
+_own_paths = {getattr(route, "path", None) for route in app.routes}
+for route in main.app.routes:
+    if getattr(route, "path", None) not in _own_paths:
+        app.router.routes.append(route)
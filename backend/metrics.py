@@ -0,0 +1,190 @@
+"""
+Per-stage latency histograms and rejection counters in Prometheus format.
+
+    with metrics.timed("nullifier_query"):
+        ...
+    metrics.reject("/api/verify", "Invalid ZKP Proof")
+
+Stages timed by main.py and zkp.py:
+
+  decode_point     public key (key cache) and R decoding     zkp
+  challenge_hash   recomputing c = H(R || P || message)       zkp
+  scalar_mult      s*G == R + c*P (single or batched)         zkp
+  duplicate_query  id_hash lookup before enrollment           main
+  nullifier_query  replay check                               main
+  user_query       public key -> user id                      main
+  face_embed       face embedding service call (/embed)       main
+  face_sync        loading other workers' face embeddings     main
+  face_search      duplicate-face lookup in the face index    main
+  commit           INSERT + COMMIT of the user / log row      main
+
+GET /metrics renders everything in the Prometheus text format. Each worker
+process keeps its own numbers (scrape every instance). zkp stages that run
+in proof_pool processes are collected there with capture() and sent back
+with the result, then record()ed in the API process.
+
+METRICS=0 turns the hooks off: timed() then returns a shared no-op context
+manager and reject() returns immediately.
+"""
+import bisect
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+ENABLED = os.getenv("METRICS", "1") != "0"
+
+# Seconds; stages range from ~10 us (hashing) to tens of ms (commit on a slow disk)
+BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025,
+           0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+# HTTPException detail -> reason label
+REJECTION_REASONS = {
+    "Invalid or expired session": "session",
+    "Replay attack detected (Nullifier used)": "replay",
+    "User not found": "unknown_user",
+    "Invalid ZKP Proof": "invalid_proof",
+    "ID already enrolled": "duplicate_id",
+    "Public key already enrolled": "duplicate_key",
+    "Face already enrolled": "duplicate_face",
+    "Face frames required": "missing_face",
+    "Invalid face frames": "invalid_face",
+    "Face embedding service unavailable": "face_service",
+}
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot: above the largest bucket
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.counts), self.sum
+
+
+class _Timer:
+    __slots__ = ("stage", "histogram", "start")
+
+    def __init__(self, stage: str, histogram: Histogram):
+        self.stage = stage
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        samples = _capture.samples
+        if samples is not None:
+            samples.append((self.stage, elapsed))
+        else:
+            self.histogram.observe(elapsed)
+
+
+class _NoopTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc):
+        pass
+
+
+class _Capture(threading.local):
+    samples = None
+
+
+_NOOP = _NoopTimer()
+_capture = _Capture()
+_stages = {}
+_stages_lock = threading.Lock()
+_rejections = defaultdict(int)  # (endpoint, reason) -> count
+_rejections_lock = threading.Lock()
+
+
+def stage_histogram(stage: str) -> Histogram:
+    histogram = _stages.get(stage)
+    if histogram is None:
+        with _stages_lock:
+            histogram = _stages.setdefault(stage, Histogram())
+    return histogram
+
+
+def timed(stage: str):
+    """Context manager recording the time spent in `stage`."""
+    if not ENABLED:
+        return _NOOP
+    return _Timer(stage, stage_histogram(stage))
+
+
+@contextmanager
+def capture():
+    """Collect (stage, seconds) samples of this thread instead of recording them."""
+    samples = []
+    _capture.samples = samples
+    try:
+        yield samples
+    finally:
+        _capture.samples = None
+
+
+def record(samples: list):
+    """Record samples collected by capture() in another process."""
+    for stage, seconds in samples:
+        stage_histogram(stage).observe(seconds)
+
+
+def reject(endpoint: str, detail: str):
+    """Count a request (or batch item) rejected with HTTPException-style `detail`."""
+    if not ENABLED:
+        return
+    key = (endpoint, REJECTION_REASONS.get(detail, "other"))
+    with _rejections_lock:
+        _rejections[key] += 1
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+    lines = [
+        "# HELP ekyc_stage_seconds Time spent in each request stage.",
+        "# TYPE ekyc_stage_seconds histogram",
+    ]
+    for stage in sorted(_stages):
+        counts, total = _stages[stage].snapshot()
+        cumulative = 0
+        for bound, count in zip(_stages[stage].buckets, counts):
+            cumulative += count
+            lines.append(f"ekyc_stage_seconds_bucket{_labels(stage=stage, le=repr(bound))} {cumulative}")
+        cumulative += counts[-1]
+        lines.append(f"ekyc_stage_seconds_bucket{_labels(stage=stage, le='+Inf')} {cumulative}")
+        lines.append(f"ekyc_stage_seconds_sum{_labels(stage=stage)} {total}")
+        lines.append(f"ekyc_stage_seconds_count{_labels(stage=stage)} {cumulative}")
+
+    lines += [
+        "# HELP ekyc_rejections_total Requests rejected, by endpoint and reason.",
+        "# TYPE ekyc_rejections_total counter",
+    ]
+    with _rejections_lock:
+        rejections = sorted(_rejections.items())
+    for (endpoint, reason), count in rejections:
+        lines.append(f"ekyc_rejections_total{_labels(endpoint=endpoint, reason=reason)} {count}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,175 @@
+"""
+Convert a SQLite database to the compact schema (see db_types.py).
+
+Copies users and verification_logs from an existing hex/JSON database into a
+new file whose key, hash and nullifier columns are raw bytes and whose proofs
+are packed, keeping ids and timestamps. The source is not modified; point
+DATABASE_URL at the new file and start the server with COMPACT_SCHEMA=1.
+
+Usage:
+    python migrate_compact.py [ekyc.db] [ekyc_compact.db]
+    python migrate_compact.py ekyc.db ekyc_compact.db --report     # + index sizes, lookup latency
+    python migrate_compact.py --synthetic 100000 --report          # benchmark on generated data
+
+Postgres deployments are not converted by this script; there the same change
+is an ALTER TABLE ... TYPE bytea USING decode(column, 'hex') per column.
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+# models.py picks its column types at import time
+os.environ["COMPACT_SCHEMA"] = "1"
+
+from sqlalchemy import JSON, MetaData, String, create_engine, insert, inspect, select
+
+import models
+from db_types import HexBinary, PackedProof
+
+COPY_BATCH = 5000
+
+
+def legacy_metadata() -> MetaData:
+    """The same tables with the original hex String / JSON column types."""
+    metadata = MetaData()
+    for table in models.Base.metadata.sorted_tables:
+        copy = table.to_metadata(metadata)
+        for column in copy.columns:
+            if isinstance(column.type, HexBinary):
+                column.type = String()
+            elif isinstance(column.type, PackedProof):
+                column.type = JSON()
+    return metadata
+
+
+def sqlite_engine(path: str):
+    return create_engine(f"sqlite:///{path}")
+
+
+def migrate(src_path: str, dst_path: str) -> dict:
+    """Copy every row from src_path into a new compact database at dst_path."""
+    if os.path.exists(dst_path):
+        raise SystemExit(f"{dst_path} already exists")
+    src, dst = sqlite_engine(src_path), sqlite_engine(dst_path)
+    legacy = legacy_metadata()
+    models.Base.metadata.create_all(dst)
+
+    copied = {}
+    existing = set(inspect(src).get_table_names())
+    with src.connect() as reader, dst.begin() as writer:
+        for table in models.Base.metadata.sorted_tables:
+            if table.name not in existing:
+                continue  # e.g. face_embeddings in a database older than the table
+            rows = reader.execute(select(legacy.tables[table.name])).mappings()
+            copied[table.name] = 0
+            while batch := rows.fetchmany(COPY_BATCH):
+                writer.execute(insert(table), [dict(row) for row in batch])
+                copied[table.name] += len(batch)
+    src.dispose()
+    dst.dispose()
+    return copied
+
+
+def generate_legacy(path: str, count: int):
+    """Write `count` users and `count` verification logs in the original schema."""
+    rand = random.Random(0)
+
+    def hex_bytes(n: int, prefix: str = "") -> str:
+        return prefix + rand.randbytes(n - len(prefix) // 2).hex()
+
+    def proof() -> dict:
+        return {"commitmentR": hex_bytes(33, rand.choice(["02", "03"])),
+                "challenge": hex_bytes(32), "response": hex_bytes(32)}
+
+    engine = sqlite_engine(path)
+    legacy = legacy_metadata()
+    legacy.create_all(engine)
+    with engine.begin() as conn:
+        for start in range(0, count, COPY_BATCH):
+            n = min(COPY_BATCH, count - start)
+            conn.execute(insert(legacy.tables["users"]), [{
+                "public_key": hex_bytes(33, rand.choice(["02", "03"])),
+                "commitment": hex_bytes(32),
+                "id_hash": hex_bytes(32),
+                "encrypted_pii": "dummy_encrypted_data",
+                "enrollment_proof": proof(),
+            } for _ in range(n)])
+            conn.execute(insert(legacy.tables["verification_logs"]), [{
+                "nullifier": hex_bytes(32),
+                "proof": proof(),
+            } for _ in range(n)])
+    engine.dispose()
+
+
+def index_sizes(path: str) -> dict:
+    """Bytes used by each table and index (SQLite dbstat)."""
+    with sqlite3.connect(path) as conn:
+        return dict(conn.execute("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name"))
+
+
+def lookup_latency(path: str, metadata: MetaData, samples: int = 2000) -> dict:
+    """Mean microseconds per single-row lookup (query + row decoding)."""
+    engine = sqlite_engine(path)
+    users = metadata.tables["users"]
+    logs = metadata.tables["verification_logs"]
+    results = {}
+    with engine.connect() as conn:
+        for label, table, column in (("users.public_key", users, users.c.public_key),
+                                     ("users.id_hash", users, users.c.id_hash),
+                                     ("verification_logs.nullifier", logs, logs.c.nullifier)):
+            keys = [row[0] for row in conn.execute(select(column).limit(samples))]
+            random.Random(1).shuffle(keys)
+            start = time.perf_counter()
+            for key in keys:
+                conn.execute(select(table).where(column == key)).first()
+            results[label] = (time.perf_counter() - start) / max(len(keys), 1) * 1e6
+    engine.dispose()
+    return results
+
+
+def report(src_path: str, dst_path: str):
+    before, after = index_sizes(src_path), index_sizes(dst_path)
+    print(f"\n{'table / index':<34}{'before KB':>12}{'after KB':>12}{'ratio':>8}")
+    for name in sorted(before):
+        if name in after and not name.startswith("sqlite_"):
+            print(f"{name:<34}{before[name] / 1024:>12.0f}{after[name] / 1024:>12.0f}"
+                  f"{after[name] / before[name]:>8.2f}")
+    src_size, dst_size = os.path.getsize(src_path), os.path.getsize(dst_path)
+    print(f"{'database file':<34}{src_size / 1024:>12.0f}{dst_size / 1024:>12.0f}{dst_size / src_size:>8.2f}")
+
+    legacy_lat = lookup_latency(src_path, legacy_metadata())
+    compact_lat = lookup_latency(dst_path, models.Base.metadata)
+    print(f"\n{'lookup (row incl. proof)':<34}{'before us':>12}{'after us':>12}")
+    for label in legacy_lat:
+        print(f"{label:<34}{legacy_lat[label]:>12.1f}{compact_lat[label]:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert a SQLite database to the compact schema")
+    parser.add_argument("src", nargs="?", default="ekyc.db")
+    parser.add_argument("dst", nargs="?", default="ekyc_compact.db")
+    parser.add_argument("--report", action="store_true", help="Compare index sizes and lookup latency")
+    parser.add_argument("--synthetic", type=int, metavar="N",
+                        help="Generate N users and N verification logs in a temporary database and migrate that")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        src, dst = args.src, args.dst
+        if args.synthetic:
+            src, dst = os.path.join(tmp, "legacy.db"), os.path.join(tmp, "compact.db")
+            print(f"Generating {args.synthetic} users / verification logs...")
+            generate_legacy(src, args.synthetic)
+
+        start = time.perf_counter()
+        copied = migrate(src, dst)
+        print(f"Migrated {copied} from {src} to {dst} in {time.perf_counter() - start:.1f}s")
+
+        if args.report:
+            report(src, dst)
+
+
+if __name__ == "__main__":
+    main()
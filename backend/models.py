@@ -1,22 +1,53 @@
-from sqlalchemy import Column, Integer, String, JSON, DateTime
+from sqlalchemy import BigInteger, Column, ForeignKey, Integer, LargeBinary, String, JSON, DateTime
+from sqlalchemy.orm import deferred, relationship
 from sqlalchemy.sql import func
 from database import Base
+from db_types import COMPACT_SCHEMA, PII_COMPRESSION, CompressedText, HexBinary, PackedProof, HASH_BYTES, POINT_BYTES
+
+# Column types for keys, hashes and proofs (see db_types.py)
+if COMPACT_SCHEMA:
+    PointType = HexBinary(POINT_BYTES)
+    HashType = HexBinary(HASH_BYTES)
+    # SHA-256 from the Android client, the proof's R point from the Python tools
+    CommitmentType = HexBinary()
+    ProofType = PackedProof()
+else:
+    PointType = HashType = CommitmentType = String
+    ProofType = JSON
+
+PIIType = CompressedText if PII_COMPRESSION else String
 
 class User(Base):
     __tablename__ = "users"
 
     id = Column(Integer, primary_key=True, index=True)
-    public_key = Column(String, unique=True, index=True, nullable=False)
-    commitment = Column(String, nullable=False)
-    id_hash = Column(String, unique=True, index=True, nullable=False)
-    encrypted_pii = Column(String, nullable=False) # Stored as JSON string
-    enrollment_proof = Column(JSON, nullable=False)
+    public_key = Column(PointType, unique=True, index=True, nullable=False)
+    commitment = Column(CommitmentType, nullable=False)
+    id_hash = Column(HashType, unique=True, index=True, nullable=False)
+    # Blobs the login path never reads: deferred, loaded on first attribute access
+    encrypted_pii = deferred(Column(PIIType, nullable=False)) # Stored as JSON string
+    enrollment_proof = deferred(Column(ProofType, nullable=False))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Inserted together with the user; never loaded on the request path
+    face_embedding = relationship("FaceEmbedding", uselist=False, lazy="noload")
+
+class FaceEmbedding(Base):
+    __tablename__ = "face_embeddings"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    embedding = Column(LargeBinary, nullable=False)  # float16 unit vector (face_index.to_bytes)
 
 class VerificationLog(Base):
     __tablename__ = "verification_logs"
 
     id = Column(Integer, primary_key=True, index=True)
-    nullifier = Column(String, unique=True, index=True, nullable=False)
-    proof = Column(JSON, nullable=False)
+    nullifier = Column(HashType, unique=True, index=True, nullable=False)
+    proof = Column(ProofType, nullable=False)
     verified_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class UsedChallenge(Base):
+    __tablename__ = "used_challenges"
+
+    # Nonce of a challenge token that has been used for a login (CHALLENGE_MODE=token)
+    nonce = Column(String, primary_key=True)
+    expires_ms = Column(BigInteger, index=True, nullable=False)
@@ -0,0 +1,97 @@
+"""
+In-process probabilistic prefilter for used nullifiers.
+
+Almost every /api/verify carries a fresh nullifier, so the replay lookup
+`SELECT ... WHERE nullifier = ?` nearly always comes back empty. A Bloom
+filter of every nullifier already logged answers "definitely new" for those
+requests without touching the database; only a "maybe" goes on to the real
+query. The unique index on verification_logs.nullifier stays the source of
+truth (other workers' nullifiers are caught there on commit).
+
+The filter is scalable: when the current stage reaches its capacity a new,
+twice as large stage with a tighter false-positive rate is added, so the
+overall rate stays near the configured target however many rows the log has.
+"""
+import hashlib
+import math
+import threading
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, fp_rate: float):
+        self.capacity = max(1, capacity)
+        self.fp_rate = fp_rate
+        # Optimal size and hash count for n items at false-positive rate p
+        self.num_bits = max(8, int(math.ceil(-self.capacity * math.log(fp_rate) / (math.log(2) ** 2))))
+        self.num_hashes = max(1, int(round(self.num_bits / self.capacity * math.log(2))))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, value: str):
+        # Kirsch-Mitzenmacher double hashing: h1 + i*h2
+        digest = hashlib.blake2b(value.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        m = self.num_bits
+        return [(h1 + i * h2) % m for i in range(self.num_hashes)]
+
+    def add(self, value: str):
+        for pos in self._positions(value):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, value: str) -> bool:
+        bits = self.bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(value))
+
+    @property
+    def size_bytes(self) -> int:
+        return len(self.bits)
+
+
+class NullifierFilter:
+    def __init__(self, capacity: int = 1_000_000, fp_rate: float = 0.001):
+        self.fp_rate = fp_rate
+        # Stage i gets fp_rate * 0.5^(i+1), so the sum stays below fp_rate
+        self._stages = [BloomFilter(capacity, fp_rate / 2)]
+        self._lock = threading.Lock()
+
+        self.checks = 0
+        self.maybe = 0
+        self.false_positives = 0
+
+    def add(self, nullifier: str):
+        with self._lock:
+            stage = self._stages[-1]
+            if stage.count >= stage.capacity:
+                stage = BloomFilter(stage.capacity * 2, stage.fp_rate / 2)
+                self._stages.append(stage)
+            stage.add(nullifier)
+
+    def might_contain(self, nullifier: str) -> bool:
+        """False means the nullifier was definitely never logged."""
+        self.checks += 1
+        if any(nullifier in stage for stage in self._stages):
+            self.maybe += 1
+            return True
+        return False
+
+    def record_false_positive(self):
+        """Called when the database found nothing after a "maybe"."""
+        self.false_positives += 1
+
+    def load(self, db, model):
+        """Fill the filter from every nullifier already in the log table."""
+        for (nullifier,) in db.query(model.nullifier).yield_per(10000):
+            self.add(nullifier)
+
+    def stats(self) -> dict:
+        return {
+            "items": sum(stage.count for stage in self._stages),
+            "stages": len(self._stages),
+            "size_bytes": sum(stage.size_bytes for stage in self._stages),
+            "target_fp_rate": self.fp_rate,
+            "checks": self.checks,
+            "maybe": self.maybe,
+            "false_positives": self.false_positives,
+        }
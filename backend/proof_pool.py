@@ -0,0 +1,79 @@
+"""
+Process pool for CPU-bound proof verification.
+
+Elliptic-curve math holds the GIL, so running it on the event loop (or in
+Starlette's threadpool) limits a worker to one core. The async app hands
+every proof check to a ProcessPoolExecutor sized to the core count instead;
+each pool process has its own zkp module, curve tables and key cache.
+
+The zkp stage timings of a call are captured in the pool process and
+recorded in the caller's metrics, so /metrics shows them either way.
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import metrics
+import zkp
+
+_pool = None
+_lock = threading.Lock()
+
+# Processes in the running pool (0 until start())
+workers = 0
+
+
+def _warm_up():
+    # Importing zkp in the child builds the generator table once, up front
+    return zkp.backend.name
+
+
+def start(count: int = None):
+    """Start the pool (blocking until every process is warm) and return it."""
+    global _pool, workers
+    with _lock:
+        if _pool is None:
+            count = count or int(os.getenv("PROOF_WORKERS", "0")) or os.cpu_count() or 1
+            pool = ProcessPoolExecutor(max_workers=count)
+            for future in [pool.submit(_warm_up) for _ in range(count)]:
+                future.result()
+            _pool, workers = pool, count
+    return _pool
+
+
+async def started():
+    """The pool, started on a thread if needed so the event loop never waits for it."""
+    if _pool is None:
+        await asyncio.get_running_loop().run_in_executor(None, start)
+    return _pool
+
+
+def shutdown():
+    global _pool, workers
+    with _lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool, workers = None, 0
+
+
+def _timed_call(fn, *args):
+    """Runs in the pool process: fn's result plus its metrics samples."""
+    with metrics.capture() as samples:
+        result = fn(*args)
+    return result, samples
+
+
+async def _run(fn, *args):
+    loop = asyncio.get_running_loop()
+    result, samples = await loop.run_in_executor(await started(), _timed_call, fn, *args)
+    metrics.record(samples)
+    return result
+
+
+async def verify_proof(public_key_hex: str, proof: dict, message: str) -> bool:
+    return await _run(zkp.verify_proof, public_key_hex, proof, message)
+
+
+async def verify_proofs_batch(items: list) -> list:
+    return await _run(zkp.verify_proofs_batch, items)
@@ -0,0 +1,135 @@
+"""
+Request models shared by the API servers, the bulk ingestion path and the
+tools, plus the signed-message formats that must match the Android client.
+"""
+import base64
+import binascii
+import hashlib
+import os
+
+from pydantic import BaseModel, Field, field_validator
+from typing import List, Optional
+
+from db_types import HASH_BYTES, POINT_BYTES, storable_hex
+
+# Items per /api/verify/batch request (more is rejected with 422)
+VERIFY_BATCH_MAX = int(os.getenv("VERIFY_BATCH_MAX", "500"))
+
+# Size of MobileKYCModel's face embedding (FaceEmbeddingWrapper in ekyc-train.ipynb)
+FACE_EMBEDDING_DIM = 128
+# Face clip limits: the model reads SEQ_LEN = 8 frames (224x224 JPEGs are ~15 KB)
+FACE_FRAMES_MAX = 8
+FACE_FRAME_MAX_BYTES = int(os.getenv("FACE_FRAME_MAX_BYTES", str(256 * 1024)))
+
+
+def _hex_field(length: int = None):
+    # With COMPACT_SCHEMA=1 these fields are stored as bytes, so reject
+    # non-hex (or wrong-size) input here (422) rather than failing in the INSERT/SELECT
+    def check(value: str) -> str:
+        if not storable_hex(value, length):
+            raise ValueError("must be a hex string" if length is None else f"must be {length} bytes of hex")
+        return value
+    return check
+
+# Pydantic Models
+class ProofData(BaseModel):
+    commitmentR: str
+    challenge: str
+    response: str
+
+class EnrollmentPayload(BaseModel):
+    publicKey: str
+    commitment: str
+    idNumberHash: str
+    encryptedPII: str
+    proof: ProofData
+    timestamp: int
+    fullNameHash: str
+    dobHash: str
+    approval: int
+    # Face clip (base64 JPEG/PNG frames) for the duplicate-face check, required
+    # with FACE_INDEX=1 and signed as part of the enrollment message when
+    # present; the server computes the embedding from it (face_embedding.py)
+    faceFrames: Optional[List[str]] = Field(default=None, min_length=1, max_length=FACE_FRAMES_MAX)
+
+    _check_key = field_validator("publicKey")(_hex_field(POINT_BYTES))
+    _check_hash = field_validator("idNumberHash")(_hex_field(HASH_BYTES))
+    _check_commitment = field_validator("commitment")(_hex_field())
+
+    @field_validator("faceFrames")
+    @classmethod
+    def _check_frames(cls, value: Optional[List[str]]) -> Optional[List[str]]:
+        for frame in value or ():
+            try:
+                size = len(base64.b64decode(frame, validate=True))
+            except binascii.Error:
+                raise ValueError("frames must be base64")
+            if size > FACE_FRAME_MAX_BYTES:
+                raise ValueError(f"frames must be at most {FACE_FRAME_MAX_BYTES} bytes")
+        return value
+
+class VerificationPayload(BaseModel):
+    publicKey: str
+    proof: ProofData
+    nullifier: str
+    timestamp: int
+
+    _check_key = field_validator("publicKey")(_hex_field(POINT_BYTES))
+    _check_nullifier = field_validator("nullifier")(_hex_field(HASH_BYTES))
+
+class BatchVerificationItem(VerificationPayload):
+    sessionId: str
+
+class BatchVerificationPayload(BaseModel):
+    items: List[BatchVerificationItem] = Field(max_length=VERIFY_BATCH_MAX)
+
+class CitizenLookupPayload(BaseModel):
+    idHashes: List[str]
+
+    @field_validator("idHashes")
+    @classmethod
+    def _check_hex(cls, value: List[str]) -> List[str]:
+        check = _hex_field()
+        for id_hash in value:
+            check(id_hash)
+        return value
+
+def face_digest(frames: List[str]) -> str:
+    """sha256 hex over the sha256 digests of the decoded frames, in order."""
+    digest = hashlib.sha256()
+    for frame in frames:
+        digest.update(hashlib.sha256(base64.b64decode(frame)).digest())
+    return digest.hexdigest()
+
+def enrollment_message(payload: EnrollmentPayload) -> str:
+    # Message format must match Client: "ENROLL:commitment:id:name:dob:approval:ts"
+    # From ZKPEnrollmentManager.kt:
+    # return "ENROLL:" +
+    #         "commitment:$commitment:" +
+    #         "id:$idNumberHash:" +
+    #         "name:$fullNameHash:" +
+    #         "dob:$dobHash:" +
+    #         "approval:$approval:" +
+    #         "ts:$timestamp"
+    # With faceFrames the client appends ":face:<face_digest>", so the
+    # frames cannot be swapped without invalidating the proof
+    message = (f"ENROLL:commitment:{payload.commitment}:"
+               f"id:{payload.idNumberHash}:"
+               f"name:{payload.fullNameHash}:"
+               f"dob:{payload.dobHash}:"
+               f"approval:{payload.approval}:"
+               f"ts:{payload.timestamp}")
+    if payload.faceFrames is not None:
+        message += f":face:{face_digest(payload.faceFrames)}"
+    return message
+
+def verification_message(session_id: str, timestamp: int) -> str:
+    # Message: "VERIFY:$sessionId:$timestamp"
+    return f"VERIFY:{session_id}:{timestamp}"
+
+def proof_to_dict(proof: ProofData) -> dict:
+    return {
+        "commitmentR": proof.commitmentR,
+        "challenge": proof.challenge,
+        "response": proof.response
+    }
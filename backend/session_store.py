@@ -0,0 +1,128 @@
+"""
+In-memory login session store with TTL expiry and a size cap.
+
+Sessions are spread over `shards` independent shards, each with its own lock,
+dict and expiry heap, so concurrent threadpool workers rarely contend.
+Expired sessions are dropped lazily from the top of each shard's heap on
+every access (O(log n) per expiry, never a full scan). When a shard is full
+the session closest to expiry - with a single TTL, the oldest - is evicted.
+"""
+import heapq
+import threading
+import time
+import uuid
+
+
+class _Shard:
+    __slots__ = ("lock", "sessions", "heap")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sessions = {}  # session_id -> (created_ms, expires_at)
+        self.heap = []      # (expires_at, session_id); may hold stale entries
+
+
+class SessionStore:
+    def __init__(self, ttl_seconds: float = 300, max_sessions: int = 100_000, shards: int = 16):
+        self.ttl = ttl_seconds
+        self.max_sessions = max_sessions
+        self._shards = [_Shard() for _ in range(shards)]
+        self._max_per_shard = max(1, max_sessions // shards)
+
+        self._counter_lock = threading.Lock()
+        self.created = 0
+        self.consumed = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def _shard(self, session_id: str) -> _Shard:
+        return self._shards[hash(session_id) % len(self._shards)]
+
+    def _count(self, name: str, amount: int = 1):
+        if amount:
+            with self._counter_lock:
+                setattr(self, name, getattr(self, name) + amount)
+
+    def _expire(self, shard: _Shard, now: float) -> int:
+        """Drop expired sessions from the top of the heap; caller holds the lock."""
+        expired = 0
+        heap = shard.heap
+        while heap and heap[0][0] <= now:
+            expires_at, session_id = heapq.heappop(heap)
+            entry = shard.sessions.get(session_id)
+            if entry is not None and entry[1] == expires_at:
+                del shard.sessions[session_id]
+                expired += 1
+        return expired
+
+    def _evict(self, shard: _Shard) -> int:
+        """Evict live sessions closest to expiry until the shard has room."""
+        evicted = 0
+        heap = shard.heap
+        while len(shard.sessions) >= self._max_per_shard and heap:
+            expires_at, session_id = heapq.heappop(heap)
+            entry = shard.sessions.get(session_id)
+            if entry is not None and entry[1] == expires_at:
+                del shard.sessions[session_id]
+                evicted += 1
+        return evicted
+
+    def create(self) -> str:
+        """Create a new session and return its id."""
+        session_id = str(uuid.uuid4())
+        now = time.monotonic()
+        expires_at = now + self.ttl
+        shard = self._shard(session_id)
+        with shard.lock:
+            expired = self._expire(shard, now)
+            evicted = self._evict(shard)
+            shard.sessions[session_id] = (int(time.time() * 1000), expires_at)
+            heapq.heappush(shard.heap, (expires_at, session_id))
+        self._count("created")
+        self._count("expired", expired)
+        self._count("evicted", evicted)
+        return session_id
+
+    def get(self, session_id: str):
+        """Creation time (ms since epoch) of a live session, or None."""
+        shard = self._shard(session_id)
+        with shard.lock:
+            expired = self._expire(shard, time.monotonic())
+            entry = shard.sessions.get(session_id)
+        self._count("expired", expired)
+        return entry[0] if entry is not None else None
+
+    def __contains__(self, session_id: str) -> bool:
+        return self.get(session_id) is not None
+
+    def consume(self, session_id: str) -> bool:
+        """Remove a session after use. Returns False if it was not live."""
+        shard = self._shard(session_id)
+        with shard.lock:
+            expired = self._expire(shard, time.monotonic())
+            removed = shard.sessions.pop(session_id, None) is not None
+        self._count("expired", expired)
+        if removed:
+            self._count("consumed")
+        return removed
+
+    def __len__(self) -> int:
+        return sum(len(shard.sessions) for shard in self._shards)
+
+    def stats(self) -> dict:
+        # Collect expired sessions in idle shards too so "size" is accurate
+        now = time.monotonic()
+        for shard in self._shards:
+            with shard.lock:
+                expired = self._expire(shard, now)
+            self._count("expired", expired)
+        return {
+            "size": len(self),
+            "max_sessions": self.max_sessions,
+            "ttl_seconds": self.ttl,
+            "shards": len(self._shards),
+            "created": self.created,
+            "consumed": self.consumed,
+            "expired": self.expired,
+            "evicted": self.evicted,
+        }
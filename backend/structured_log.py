@@ -0,0 +1,183 @@
+"""
+Non-blocking structured logging for the API.
+
+Request threads only build a LogRecord and put it on a bounded in-memory
+queue (logging.handlers.QueueHandler); a QueueListener thread formats each
+record as one JSON line and writes it to stdout, where Cloud Run / Cloud
+Logging picks up `severity` and the extra fields. If the queue is full the
+record is dropped and counted instead of blocking the request.
+
+    log = structured_log.get_logger("api")
+    structured_log.event(log, logging.INFO, "enroll.accepted", sample=True, userId=1)
+
+- LOG_LEVEL (default INFO): records below it are discarded before any work.
+- LOG_SUCCESS_SAMPLE (default 0.01): fraction of `sample=True` events
+  (successful requests) that are kept; rejections and errors are not sampled.
+- LOG_QUEUE_SIZE (default 10000): records waiting for the writer thread.
+
+Fields are redacted on the writer thread: encrypted PII, proofs, commitments
+and ID hashes are replaced by "[redacted]", public keys and nullifiers are
+shortened to a prefix that is still useful for correlating requests.
+"""
+import atexit
+import datetime
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+
+ROOT_LOGGER = "ekyc"
+
+# Field names are compared lowercased with "_" removed (encryptedPII == encrypted_pii)
+REDACTED_FIELDS = {"encryptedpii", "pii", "proof", "enrollmentproof", "commitment", "idnumberhash", "idhash"}
+SHORTENED_FIELDS = {"publickey", "nullifier"}
+SHORTENED_CHARS = 12
+
+
+def _normalize(key: str) -> str:
+    return key.lower().replace("_", "")
+
+
+def redact(value):
+    """Copy of `value` with PII fields removed from every nested dict."""
+    if isinstance(value, dict):
+        clean = {}
+        for key, item in value.items():
+            name = _normalize(str(key))
+            if name in REDACTED_FIELDS:
+                clean[key] = "[redacted]"
+            elif name in SHORTENED_FIELDS and isinstance(item, str) and len(item) > SHORTENED_CHARS:
+                clean[key] = item[:SHORTENED_CHARS] + "..."
+            else:
+                clean[key] = redact(item)
+        return clean
+    if isinstance(value, (list, tuple)):
+        return [redact(item) for item in value]
+    return value
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(),
+            "severity": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(redact(getattr(record, "fields", None) or {}))
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class SuccessSampler:
+    """Keeps a `rate` fraction of routine success events."""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.sampled_out = 0
+
+    def keep(self) -> bool:
+        if random.random() < self.rate:
+            return True
+        self.sampled_out += 1
+        return False
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops (and counts) records when the queue is full."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Skip QueueHandler.prepare's formatting: the listener formats the record
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_lock = threading.Lock()
+_handler = None
+_sampler = None
+_listener = None
+
+
+def setup(level: str = None, success_sample: float = None, queue_size: int = None, stream=None):
+    """Route the `ekyc` loggers through the queue. Idempotent per process."""
+    global _handler, _sampler, _listener
+    with _lock:
+        if _listener is not None:
+            return
+        level = level or os.getenv("LOG_LEVEL", "INFO")
+        if success_sample is None:
+            success_sample = float(os.getenv("LOG_SUCCESS_SAMPLE", "0.01"))
+        if queue_size is None:
+            queue_size = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+        writer = logging.StreamHandler(stream or sys.stdout)
+        writer.setFormatter(JsonFormatter())
+        _sampler = SuccessSampler(success_sample)
+        _handler = DroppingQueueHandler(queue.Queue(maxsize=queue_size))
+        _listener = logging.handlers.QueueListener(_handler.queue, writer)
+        _listener.start()
+        atexit.register(shutdown)
+
+        root = logging.getLogger(ROOT_LOGGER)
+        root.setLevel(level.upper())
+        root.addHandler(_handler)
+        root.propagate = False
+
+
+def shutdown():
+    """Flush queued records and stop the writer thread."""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+            logging.getLogger(ROOT_LOGGER).removeHandler(_handler)
+
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+def event(logger: logging.Logger, level: int, message: str, sample: bool = False, **fields):
+    """Log `message` with structured `fields`; sample=True marks a routine success."""
+    if not logger.isEnabledFor(level):
+        return
+    # Decided before a LogRecord is built, so dropped successes cost almost nothing
+    if sample and _sampler is not None and not _sampler.keep():
+        return
+    logger.log(level, message, extra={"fields": fields})
+
+
+def stats() -> dict:
+    if _handler is None:
+        return {"enabled": False}
+    return {
+        "enabled": True,
+        "level": logging.getLevelName(logging.getLogger(ROOT_LOGGER).level),
+        "success_sample": _sampler.rate,
+        "queued": _handler.queue.qsize(),
+        "dropped": _handler.dropped,
+        "sampled_out": _sampler.sampled_out,
+    }
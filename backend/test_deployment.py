@@ -1,3 +1,39 @@
+"""
+End-to-end smoke test, and a concurrent load generator.
+
+    python test_deployment.py [--url URL | --local] # enroll one user, check it persisted,
+                                                    # log in and replay the login
+
+    python test_deployment.py --load --local        # start uvicorn main:app on a temp SQLite DB
+    python test_deployment.py --load --url http://localhost:8000 \
+        --rate 200 --requests 5000 --mix challenge=1,verify=1,enroll=0.1
+
+Load mode pre-generates everything before the clock starts: key pairs for
+--users enrolled users, one fresh enrollment payload per enroll request, and
+for every verify request a challenge fetched from the server plus its proof.
+The timed phase then sends the shuffled challenge / verify / enroll mix:
+
+  --rate R         open model: request i is due at i/R seconds regardless of
+                   how earlier requests are doing (at most --max-in-flight
+                   outstanding). Latency is measured from the due time, so
+                   server stalls are not hidden.
+  --concurrency C  closed model: C workers send back to back. Simple, but a
+                   slow response delays the next send, which hides queueing
+                   (coordinated omission) - reported as a warning.
+
+Reports throughput, latency percentiles per request type and a breakdown of
+errors by status code / exception and detail; --out also writes JSON.
+Pre-fetched challenges must outlive the run (SESSION_TTL_SECONDS, default 300).
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import tempfile
+from collections import Counter
+
 import requests
 import time
 import uuid
@@ -126,13 +162,256 @@ def test_check_citizen(id_hash):
     except Exception as e:
         print(f"❌ Error: {e}")
 
-if __name__ == "__main__":
-    # Check if requests is installed
+def test_login_replay():
+    """
+    Log in once, then send the same proof and challenge again with a fresh
+    nullifier: the server must reject it (session mode and CHALLENGE_MODE=token).
+    """
+    import client_proofs
+    print(f"\nTesting Login Replay against {BASE_URL}...")
     try:
-        import requests
-    except ImportError:
-        print("Please install requests: pip install requests")
-        exit(1)
+        sk, _ = generate_key_pair()
+        enrolled = requests.post(f"{BASE_URL}/api/enroll", json=client_proofs.enrollment_payload(sk))
+        session_id = requests.get(f"{BASE_URL}/api/challenge").json()["sessionId"]
+        payload = client_proofs.verification_payload(sk, session_id)
+        first = requests.post(f"{BASE_URL}/api/verify", params={"sessionId": session_id}, json=payload)
+        replay = dict(payload, nullifier=hashlib.sha256(uuid.uuid4().bytes).hexdigest())
+        second = requests.post(f"{BASE_URL}/api/verify", params={"sessionId": session_id}, json=replay)
+        print(f"Enroll: {enrolled.status_code}, first login: {first.status_code}, replay: {second.status_code} {second.text}")
+
+        if enrolled.status_code == 200 and first.status_code == 200 and second.status_code == 400:
+            print("✅ Login Replay rejected.")
+            return True
+        print("❌ Login Replay FAILED: replayed proof was not rejected.")
+        return False
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        return False
+
+# --- Load generation ---
+
+OPS = ("challenge", "verify", "enroll")
+# An open-model request sent this late (seconds) means the generator fell behind
+LAG_WARNING_SECONDS = 0.01
+
+
+def parse_mix(text: str) -> dict:
+    mix = {}
+    for part in text.split(","):
+        op, _, weight = part.partition("=")
+        if op not in OPS:
+            raise ValueError(f"Unknown request type {op!r} (expected one of {', '.join(OPS)})")
+        mix[op] = float(weight or 1)
+    return mix
+
+
+async def prepare(client, total: int, mix: dict, users: int, seed: int) -> list:
+    """Every request of the run as (op, method, path, params, payload), in send order."""
+    import client_proofs
+
+    rand = random.Random(seed)
+    ops = rand.choices(list(mix), weights=list(mix.values()), k=total)
+
+    keys = []
+    if "verify" in ops:
+        keys = [client_proofs.generate_key() for _ in range(users)]
+        for sk in keys:
+            (await client.post("/api/enroll", json=client_proofs.enrollment_payload(sk))).raise_for_status()
+
+    plan = []
+    for i, op in enumerate(ops):
+        if op == "challenge":
+            plan.append((op, "GET", "/api/challenge", None, None))
+        elif op == "enroll":
+            payload = client_proofs.enrollment_payload(client_proofs.generate_key())
+            plan.append((op, "POST", "/api/enroll", None, payload))
+        else:
+            session_id = (await client.get("/api/challenge")).json()["sessionId"]
+            payload = client_proofs.verification_payload(keys[i % users], session_id)
+            plan.append((op, "POST", "/api/verify", {"sessionId": session_id}, payload))
+    return plan
+
+
+async def send(client, request, due: float, results: list):
+    op, method, path, params, payload = request
+    sent = time.perf_counter()
+    try:
+        r = await client.request(method, path, params=params, json=payload)
+        error = None
+        if r.status_code != 200:
+            try:
+                detail = r.json().get("detail")
+            except ValueError:
+                detail = r.text[:80]
+            error = f"{r.status_code} {detail}"
+    except Exception as e:
+        error = type(e).__name__
+    done = time.perf_counter()
+    # latency counts from when the request was due; service time from when it was sent
+    results.append((op, done - due, done - sent, sent - due, error))
+
 
-    id_hash = test_enrollment()
-    test_check_citizen(id_hash)
+async def open_loop(client, plan: list, rate: float, max_in_flight: int) -> list:
+    results = []
+    slots = asyncio.Semaphore(max_in_flight)
+
+    async def one(request, due):
+        try:
+            await send(client, request, due, results)
+        finally:
+            slots.release()
+
+    tasks = []
+    start = time.perf_counter()
+    for i, request in enumerate(plan):
+        due = start + i / rate
+        delay = due - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        await slots.acquire()
+        tasks.append(asyncio.create_task(one(request, due)))
+    await asyncio.gather(*tasks)
+    return results
+
+
+async def closed_loop(client, plan: list, concurrency: int) -> list:
+    results = []
+    pending = iter(plan)
+
+    async def worker():
+        for request in pending:
+            await send(client, request, time.perf_counter(), results)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return results
+
+
+def percentiles(values: list) -> dict:
+    ordered = sorted(values)
+    if not ordered:
+        return {}
+    pick = lambda q: ordered[min(len(ordered) - 1, int(len(ordered) * q))] * 1000
+    return {"p50_ms": pick(0.50), "p90_ms": pick(0.90), "p99_ms": pick(0.99), "p999_ms": pick(0.999),
+            "max_ms": ordered[-1] * 1000, "mean_ms": statistics.fmean(ordered) * 1000}
+
+
+def summarize(results: list, elapsed: float, open_model: bool) -> dict:
+    report = {"elapsed_s": elapsed, "requests": len(results), "ops": {}}
+    for op in OPS:
+        rows = [r for r in results if r[0] == op]
+        if not rows:
+            continue
+        ok = [r for r in rows if r[4] is None]
+        report["ops"][op] = {
+            "requests": len(rows),
+            "ok": len(ok),
+            "ok_per_s": len(ok) / elapsed,
+            "latency": percentiles([r[1] for r in ok]),
+            "service": percentiles([r[2] for r in ok]),
+        }
+    report["ok_per_s"] = sum(o["ok"] for o in report["ops"].values()) / elapsed
+    report["errors"] = dict(Counter(f"{op}: {error}" for op, _, _, _, error in results if error).most_common())
+
+    warnings = []
+    if open_model:
+        lags = sorted(r[3] for r in results)
+        late = sum(lag > LAG_WARNING_SECONDS for lag in lags)
+        report["send_lag"] = percentiles(lags)
+        if late > len(lags) * 0.01:
+            warnings.append(f"coordinated omission: {late} requests were sent more than "
+                            f"{LAG_WARNING_SECONDS * 1000:.0f} ms late (generator or --max-in-flight saturated); "
+                            f"the target rate was not reached")
+    else:
+        warnings.append("coordinated omission: closed-loop latencies exclude time requests would have "
+                        "waited behind slow responses; use --rate for user-facing latency")
+    report["warnings"] = warnings
+    return report
+
+
+def print_report(report: dict):
+    print(f"\n{report['requests']} requests in {report['elapsed_s']:.1f} s, {report['ok_per_s']:.1f} ok/s")
+    print(f"{'request':<11}{'ok':>7}{'ok/s':>9}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'p99.9 ms':>10}{'max ms':>9}")
+    for op, r in report["ops"].items():
+        lat = r["latency"] or dict.fromkeys(("p50_ms", "p90_ms", "p99_ms", "p999_ms", "max_ms"), float("nan"))
+        print(f"{op:<11}{r['ok']:>7}{r['ok_per_s']:>9.1f}{lat['p50_ms']:>9.1f}{lat['p90_ms']:>9.1f}"
+              f"{lat['p99_ms']:>9.1f}{lat['p999_ms']:>10.1f}{lat['max_ms']:>9.1f}")
+    if "send_lag" in report:
+        lag = report["send_lag"]
+        print(f"send lag: p99 {lag['p99_ms']:.1f} ms, max {lag['max_ms']:.1f} ms")
+    if report["errors"]:
+        print("errors:")
+        for error, count in report["errors"].items():
+            print(f"  {count:>6}  {error}")
+    for warning in report["warnings"]:
+        print(f"WARNING: {warning}")
+
+
+async def run_load(base_url: str, args) -> dict:
+    import httpx
+
+    mix = parse_mix(args.mix)
+    connections = args.max_in_flight if args.rate else args.concurrency
+    limits = httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as client:
+        print(f"Preparing {args.requests} requests ({args.mix}) against {base_url}...")
+        plan = await prepare(client, args.requests, mix, args.users, args.seed)
+        start = time.perf_counter()
+        if args.rate:
+            results = await open_loop(client, plan, args.rate, args.max_in_flight)
+        else:
+            results = await closed_loop(client, plan, args.concurrency)
+        elapsed = time.perf_counter() - start
+    return summarize(results, elapsed, open_model=bool(args.rate))
+
+
+def main():
+    global BASE_URL
+    parser = argparse.ArgumentParser(description="Smoke test or load test an eKyc backend")
+    parser.add_argument("--url", default=BASE_URL)
+    parser.add_argument("--load", action="store_true", help="Run the load generator instead of the smoke test")
+    parser.add_argument("--local", nargs="?", const="main:app", metavar="APP",
+                        help="Start uvicorn APP (default main:app) on a temporary SQLite database")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--rate", type=float, help="Open model: target requests per second")
+    parser.add_argument("--concurrency", type=int, default=16, help="Closed model: requests in flight")
+    parser.add_argument("--max-in-flight", type=int, default=256, help="Open model: cap on outstanding requests")
+    parser.add_argument("--mix", default="challenge=1,verify=1,enroll=0.1", help="Relative weights per request type")
+    parser.add_argument("--users", type=int, default=50, help="Enrolled users whose keys sign verify requests")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="Also write the report as JSON")
+    args = parser.parse_args()
+
+    report = None
+    replay_rejected = True
+    with tempfile.TemporaryDirectory() as tmp:
+        proc = None
+        BASE_URL = args.url
+        if args.local:
+            from bench_async import free_port, start_server
+            port = free_port()
+            proc = start_server(args.local, port, os.path.join(tmp, "local.db"), os.cpu_count() or 1)
+            BASE_URL = f"http://127.0.0.1:{port}"
+        try:
+            if args.load:
+                report = asyncio.run(run_load(BASE_URL, args))
+            else:
+                test_check_citizen(test_enrollment())
+                replay_rejected = test_login_replay()
+        finally:
+            if proc is not None:
+                proc.terminate()
+                proc.wait()
+
+    if report is None:
+        if not replay_rejected:
+            raise SystemExit(1)
+        return
+    print_report(report)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
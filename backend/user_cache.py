@@ -0,0 +1,115 @@
+"""
+Read-through cache for the public key -> user id lookup on login.
+
+A user's key does not change after enrollment, so /api/verify does not need
+to ask the database who owns it on every login. UserLookupCache keeps found
+users in a bounded LRU whose entries also expire after `ttl_seconds`;
+unknown keys are not cached, so a user who enrolls is visible immediately.
+
+register_invalidation() hooks SQLAlchemy events so deleting a user, changing
+its public key, or any bulk UPDATE/DELETE on the table drops the affected
+entries. The events only see this process's writes; the TTL bounds how long
+another worker can keep serving a deleted or re-keyed user.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+
+class UserLookupCache:
+    def __init__(self, max_entries: int = 100_000, ttl_seconds: float = 300):
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self._entries = OrderedDict()   # public key hex -> (user id, expires at), LRU order
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get_or_load(self, public_key_hex: str, load):
+        """Return the cached user id for the key, else load(key) and cache a non-None result."""
+        user_id = self.get(public_key_hex)
+        if user_id is None:
+            user_id = load(public_key_hex)
+            if user_id is not None:
+                self.put(public_key_hex, user_id)
+        return user_id
+
+    def get(self, public_key_hex: str):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(public_key_hex)
+            if entry is None:
+                self.misses += 1
+                return None
+            user_id, expires = entry
+            if expires <= now:
+                del self._entries[public_key_hex]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(public_key_hex)
+            self.hits += 1
+            return user_id
+
+    def put(self, public_key_hex: str, user_id: int):
+        with self._lock:
+            self._entries[public_key_hex] = (user_id, time.monotonic() + self.ttl)
+            self._entries.move_to_end(public_key_hex)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, public_key_hex: str):
+        with self._lock:
+            if self._entries.pop(public_key_hex, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+
+def register_invalidation(cache: UserLookupCache, user_model):
+    """Keep `cache` consistent with deletes and re-keys of `user_model` rows."""
+
+    @event.listens_for(user_model, "after_delete")
+    def _deleted(mapper, connection, target):
+        cache.invalidate(target.public_key)
+
+    @event.listens_for(user_model, "after_update")
+    def _updated(mapper, connection, target):
+        history = inspect(target).attrs.public_key.history
+        for old_key in history.deleted or ():
+            cache.invalidate(old_key)
+
+    @event.listens_for(Session, "do_orm_execute")
+    def _bulk(orm_execute_state):
+        # query(User).delete() / update(User) ... bypass the mapper events
+        if (orm_execute_state.is_update or orm_execute_state.is_delete) and \
+                any(m.class_ is user_model for m in orm_execute_state.all_mappers):
+            cache.clear()
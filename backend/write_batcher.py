@@ -0,0 +1,120 @@
+"""
+Group commit for enrollment and verification-log inserts.
+
+Each login used to pay for its own transaction (one fsync on SQLite, one
+round trip on Postgres). WriteBatcher collects the inserts that concurrent
+requests submit, commits up to `max_batch` of them - or whatever arrived
+within `max_wait_ms` of the first one - in a single transaction on a
+background thread, and then resolves each caller's Future with the new row
+id. Rows submitted together (a login's log and its used challenge token)
+are committed in the same transaction.
+
+If the combined commit hits a unique constraint (duplicate id_hash, replayed
+nullifier, ...), the batch is retried row by row so the IntegrityError is
+delivered only to the request that caused it.
+"""
+import atexit
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from sqlalchemy.exc import IntegrityError
+
+_STOP = object()
+
+
+class WriteBatcher:
+    def __init__(self, session_factory, max_batch: int = 64, max_wait_ms: float = 5):
+        self.session_factory = session_factory
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="write-batcher", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+        self.batches = 0
+        self.rows = 0
+        self.conflicts = 0
+
+    def submit(self, obj, *related) -> Future:
+        """Queue ORM instances for insertion together; the Future yields obj's id."""
+        future = Future()
+        self._queue.put(((obj, *related), future))
+        return future
+
+    def close(self):
+        """Flush everything queued so far and stop the writer thread."""
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+            batch = [first]
+            deadline = time.monotonic() + self.max_wait
+            stop = False
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            self._commit(batch)
+            if stop:
+                return
+
+    def _commit(self, batch: list):
+        db = self.session_factory(expire_on_commit=False)
+        try:
+            db.add_all([obj for objs, _ in batch for obj in objs])
+            try:
+                db.commit()
+            except IntegrityError:
+                db.rollback()
+                self._commit_one_by_one(db, batch)
+            else:
+                for objs, future in batch:
+                    future.set_result(objs[0].id)
+            self.batches += 1
+            self.rows += len(batch)
+        except Exception as e:
+            db.rollback()
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            db.close()
+
+    def _commit_one_by_one(self, db, batch: list):
+        for objs, future in batch:
+            db.add_all(objs)
+            try:
+                db.commit()
+            except IntegrityError as e:
+                db.rollback()
+                self.conflicts += 1
+                future.set_exception(e)
+            else:
+                future.set_result(objs[0].id)
+
+    def stats(self) -> dict:
+        return {
+            "pending": self._queue.qsize(),
+            "batches": self.batches,
+            "rows": self.rows,
+            "avg_batch": self.rows / self.batches if self.batches else 0.0,
+            "conflicts": self.conflicts,
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait * 1000,
+        }
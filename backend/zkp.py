@@ -3,12 +3,35 @@ from ecdsa import SECP256k1, VerifyingKey, BadSignatureError
 from ecdsa.ellipticcurve import Point
 from ecdsa.util import sigdecode_string
 import binascii
+import os
+import threading
+import ec_backend
+from key_cache import PublicKeyCache
+import metrics
+from structured_log import get_logger
 
 # Curve parameters
+log = get_logger("zkp")
+
 curve = SECP256k1
 generator = curve.generator
 order = curve.order
 
+# Active curve backend (see ec_backend.py); ZKP_EC_BACKEND overrides the choice
+backend = ec_backend.select_backend()
+
+# Differential mode: every verification is repeated on the reference backend
+# and disagreements are reported. Meant for staging, not production traffic.
+DIFFERENTIAL = os.getenv("ZKP_DIFFERENTIAL", "0") == "1"
+
+# Decoded public keys (and, for frequent users, precomputed point tables)
+KEY_CACHE_SIZE = int(os.getenv("ZKP_KEY_CACHE_SIZE", "100000"))
+KEY_TABLE_BUDGET_BYTES = int(float(os.getenv("ZKP_KEY_TABLE_BUDGET_MB", "0")) * 1024 * 1024)
+KEY_TABLE_MIN_USES = int(os.getenv("ZKP_KEY_TABLE_MIN_USES", "3"))
+
+_key_caches = {}
+_key_caches_lock = threading.Lock()
+
 def sha256(data: bytes) -> bytes:
     return hashlib.sha256(data).digest()
 
@@ -32,18 +55,13 @@ def hex_to_point(hex_str: str) -> Point:
     except Exception as e:
         raise ValueError(f"Invalid point hex: {hex_str}") from e
 
-def compute_challenge(R: Point, P: Point, message: str) -> int:
-    """
-    Compute challenge c = Hash(R || P || message)
-    """
+def _hash_challenge(r_bytes: bytes, p_bytes: bytes, message: str) -> int:
     digest = hashlib.sha256()
     
     # R (compressed)
-    r_bytes = R.to_bytes(encoding="compressed")
     digest.update(r_bytes)
     
     # P (compressed)
-    p_bytes = P.to_bytes(encoding="compressed")
     digest.update(p_bytes)
     
     # Message
@@ -53,38 +71,147 @@ def compute_challenge(R: Point, P: Point, message: str) -> int:
     hash_bytes = digest.digest()
     return int.from_bytes(hash_bytes, byteorder='big') % order
 
-def verify_proof(public_key_hex: str, proof: dict, message: str) -> bool:
+def compute_challenge(R: Point, P: Point, message: str) -> int:
+    """
+    Compute challenge c = Hash(R || P || message)
+    """
+    return _hash_challenge(R.to_bytes(encoding="compressed"),
+                           P.to_bytes(encoding="compressed"),
+                           message)
+
+def key_cache(curve_backend=None) -> PublicKeyCache:
+    """Public-key cache for a backend (decoded points are backend specific)."""
+    curve_backend = curve_backend or backend
+    cache = _key_caches.get(curve_backend.name)
+    if cache is None:
+        with _key_caches_lock:
+            cache = _key_caches.get(curve_backend.name)
+            if cache is None:
+                cache = PublicKeyCache(curve_backend, KEY_CACHE_SIZE,
+                                       KEY_TABLE_BUDGET_BYTES, KEY_TABLE_MIN_USES)
+                _key_caches[curve_backend.name] = cache
+    return cache
+
+def key_cache_stats() -> dict:
+    return key_cache().stats()
+
+def _parse_proof(public_key_hex: str, proof: dict, message: str, curve_backend):
     """
-    Verify Schnorr Proof
+    Parse one proof on the given backend and run the cheap challenge check.
+    Returns ((P, R, c, s), key_table) on success or None if the proof is
+    already invalid. key_table is the cached per-key table for P, if any.
     """
     try:
-        # 1. Parse inputs
-        P = hex_to_point(public_key_hex)
-        R = hex_to_point(proof['commitmentR'])
+        with metrics.timed("decode_point"):
+            P, key_table = key_cache(curve_backend).get(public_key_hex)
+            R = curve_backend.decode_point(binascii.unhexlify(proof['commitmentR']))
         c_claimed = hex_to_int(proof['challenge'])
         s = hex_to_int(proof['response'])
-        
-        # 2. Recompute challenge
-        c_computed = compute_challenge(R, P, message)
-        
-        # 3. Check challenge equality
-        if c_claimed != c_computed:
-            print(f"Challenge mismatch: claimed={c_claimed}, computed={c_computed}")
-            return False
-            
-        # 4. Verify equation: s*G == R + c*P
-        # left = s*G
-        left = generator * s
-        
-        # right = R + c*P
-        right = R + (P * c_claimed)
-        
-        if left == right:
+    except Exception as e:
+        log.debug("Verification error: %s", e)
+        return None
+
+    with metrics.timed("challenge_hash"):
+        c_computed = _hash_challenge(curve_backend.encode_point(R), curve_backend.encode_point(P), message)
+    if c_claimed != c_computed:
+        log.debug("Challenge mismatch: claimed=%x, computed=%x", c_claimed, c_computed)
+        return None
+    return (P, R, c_claimed, s), key_table
+
+def _verify_proof(public_key_hex: str, proof: dict, message: str, curve_backend) -> bool:
+    # 1-3. Parse inputs, recompute and compare the challenge
+    parsed = _parse_proof(public_key_hex, proof, message, curve_backend)
+    if parsed is None:
+        return False
+
+    # 4. Verify equation: s*G == R + c*P (the backend picks the evaluation strategy)
+    entry, key_table = parsed
+    try:
+        with metrics.timed("scalar_mult"):
+            ok = curve_backend.verify_equation(*entry, key_table=key_table)
+        if ok:
             return True
-        else:
-            print("Equation mismatch")
-            return False
-            
+        log.debug("Equation mismatch")
+        return False
     except Exception as e:
-        print(f"Verification error: {e}")
+        log.debug("Verification error: %s", e)
         return False
+
+def verify_proof(public_key_hex: str, proof: dict, message: str, curve_backend=None) -> bool:
+    """
+    Verify Schnorr Proof on `curve_backend` (defaults to the active backend).
+    """
+    result = _verify_proof(public_key_hex, proof, message, curve_backend or backend)
+    if DIFFERENTIAL and curve_backend is None and backend.name != ec_backend.EcdsaBackend.name:
+        reference = _verify_proof(public_key_hex, proof, message, ec_backend.get_backend(ec_backend.EcdsaBackend.name))
+        if reference != result:
+            log.error("Differential mismatch: %s=%s, ecdsa=%s, publicKey=%s",
+                      backend.name, result, reference, public_key_hex[:12])
+    return result
+
+def verify_proofs_batch(items: list, curve_backend=None) -> list:
+    """
+    Verify many Schnorr proofs at once.
+
+    `items` is a list of (public_key_hex, proof, message) tuples, the same
+    arguments `verify_proof` takes. Returns one bool per item, in order.
+
+    Challenges are checked per proof, then all remaining equations are
+    handed to the backend in one call. Only the python backend combines
+    them (into one random-linear-combination multi-scalar multiplication);
+    the others check them one by one, which on libsecp256k1 is still about
+    ten times faster than the python batch. If the combined check fails,
+    every proof is re-checked on its own so the bad ones are reported.
+    """
+    curve_backend = curve_backend or backend
+    results = [False] * len(items)
+    parsed = []
+    for i, (public_key_hex, proof, message) in enumerate(items):
+        entry = _parse_proof(public_key_hex, proof, message, curve_backend)
+        if entry is not None:
+            parsed.append((i, entry[0]))
+
+    if not parsed:
+        return results
+
+    try:
+        with metrics.timed("scalar_mult"):
+            batch_ok = curve_backend.verify_equations([entry for _, entry in parsed])
+    except Exception:
+        batch_ok = False
+
+    if batch_ok:
+        for i, _ in parsed:
+            results[i] = True
+        return results
+
+    # Batch failed: fall back to individual checks to locate the bad proofs
+    for i, entry in parsed:
+        try:
+            results[i] = curve_backend.verify_equation(*entry)
+        except Exception:
+            results[i] = False
+        if not results[i]:
+            log.debug("Equation mismatch")
+    return results
+
+def differential_verify(items: list, backend_names: list = None) -> list:
+    """
+    Run the same (public_key_hex, proof, message) items through several
+    backends, single and batched, and return the items whose results
+    disagree as (index, {path: result}) pairs. An empty list means all
+    backends agree.
+    """
+    backend_names = backend_names or ec_backend.available_backends()
+    per_path = {}
+    for name in backend_names:
+        curve_backend = ec_backend.get_backend(name)
+        per_path[name] = [_verify_proof(*item, curve_backend) for item in items]
+        per_path[f"{name}/batch"] = verify_proofs_batch(items, curve_backend)
+
+    mismatches = []
+    for i in range(len(items)):
+        outcome = {path: results[i] for path, results in per_path.items()}
+        if len(set(outcome.values())) > 1:
+            mismatches.append((i, outcome))
+    return mismatches
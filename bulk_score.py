@@ -0,0 +1,220 @@
+"""
+Offline bulk scoring of ID / face pairs with the eKYC model.
+
+    python bulk_score.py --dir audit/ --out scores.csv
+    python bulk_score.py --pairs pairs.csv --out scores.parquet --workers 8 --batch-size 16
+
+Input is either --pairs, a CSV with `id` and `face` columns (image paths,
+face may also be a video) and an optional `key` column, or --dir, where
+every subdirectory is one enrollment holding an `id.*` and a `face.*` file.
+
+Pipeline (compared to debug_model.py, which does everything per image):
+  - DataLoader worker processes decode and resize to 224x224 uint8, the
+    same PIL bilinear resize torchvision's Resize applies to PIL images
+  - the main process normalizes a whole batch in one vectorized op
+  - workers decode and ship a single face image as one frame, not an
+    8-frame clip; the main process builds the clip with a stride-0 `expand`.
+    The traced model reshapes the clip with `view`, so `.contiguous()` at the
+    model call still copies all SEQ_LEN frames: the saving is in decoding
+    and worker-to-main transfer, not in the model's input memory
+  - prefetch_factor batches per worker are decoded while the model runs
+
+Rows (key, id, face, liveness, matching, error) are streamed to CSV, or to
+Parquet if --out ends in .parquet (needs pyarrow). Unreadable files get an
+error row instead of stopping the run.
+"""
+import warnings
+# Suppress the specific numpy/importlib warning on Windows
+warnings.filterwarnings("ignore", category=RuntimeWarning, module="importlib._bootstrap")
+
+import argparse
+import csv
+import glob
+import os
+import time
+
+import numpy as np
+import torch
+from PIL import Image
+from torch.utils.data import DataLoader, Dataset
+
+from inference_service import DEFAULT_MODEL, SEQ_LEN, VIDEO_EXTENSIONS, load_face_frames, supports_batching
+
+IMG_SIZE = 224
+MEAN = torch.tensor([0.485, 0.456, 0.406]).view(1, 3, 1, 1)
+STD = torch.tensor([0.229, 0.224, 0.225]).view(1, 3, 1, 1)
+COLUMNS = ["key", "id", "face", "liveness", "matching", "error"]
+
+
+def read_pairs(pairs_path=None, directory=None):
+    """List of (key, id_path, face_path)."""
+    if pairs_path:
+        base = os.path.dirname(os.path.abspath(pairs_path))
+        with open(pairs_path, newline='', encoding='utf-8') as f:
+            return [(row.get('key') or str(i), os.path.join(base, row['id']), os.path.join(base, row['face']))
+                    for i, row in enumerate(csv.DictReader(f))]
+    pairs = []
+    for entry in sorted(os.scandir(directory), key=lambda e: e.name):
+        if not entry.is_dir():
+            continue
+        ids = glob.glob(os.path.join(entry.path, 'id.*'))
+        faces = glob.glob(os.path.join(entry.path, 'face.*'))
+        pairs.append((entry.name, ids[0] if ids else '', faces[0] if faces else ''))
+    return pairs
+
+
+def to_uint8(image):
+    """HWC uint8 tensor of the image resized to IMG_SIZE x IMG_SIZE."""
+    image = image.convert('RGB').resize((IMG_SIZE, IMG_SIZE), Image.BILINEAR)
+    return torch.from_numpy(np.asarray(image, dtype=np.uint8).copy())
+
+
+class PairDataset(Dataset):
+    """Decodes one pair in a worker process: id [H, W, 3], face [F, H, W, 3] (F = 1 or SEQ_LEN)."""
+
+    def __init__(self, pairs):
+        self.pairs = pairs
+
+    def __len__(self):
+        return len(self.pairs)
+
+    def __getitem__(self, index):
+        key, id_path, face_path = self.pairs[index]
+        item = {"key": key, "id": id_path, "face": face_path}
+        try:
+            item["id_pixels"] = to_uint8(Image.open(id_path))
+            if face_path.lower().endswith(VIDEO_EXTENSIONS):
+                frames = load_face_frames(face_path, SEQ_LEN)
+                item["face_pixels"] = torch.stack([to_uint8(frame) for frame in frames])
+            else:
+                item["face_pixels"] = to_uint8(Image.open(face_path)).unsqueeze(0)
+        except Exception as e:
+            item["error"] = f"{type(e).__name__}: {e}"
+        return item
+
+
+def collate(items):
+    """Keep the uint8 pixels as they are; failed items travel separately."""
+    ok = [item for item in items if "error" not in item]
+    return {
+        "ok": ok,
+        "failed": [item for item in items if "error" in item],
+        "id_pixels": torch.stack([item["id_pixels"] for item in ok]) if ok else None,
+    }
+
+
+def normalize(pixels):
+    """[N, H, W, 3] uint8 -> [N, 3, H, W] float, ImageNet-normalized, in one pass per op."""
+    return pixels.permute(0, 3, 1, 2).float().div_(255).sub_(MEAN).div_(STD)
+
+
+def face_clips(items):
+    """[B, SEQ_LEN, 3, H, W]: still images are expanded (a view), videos normalized per frame."""
+    if all(item["face_pixels"].shape[0] == 1 for item in items):
+        faces = normalize(torch.stack([item["face_pixels"][0] for item in items]))
+        return faces.unsqueeze(1).expand(-1, SEQ_LEN, -1, -1, -1)
+    clips = [normalize(item["face_pixels"]).expand(SEQ_LEN, -1, -1, -1) for item in items]
+    return torch.stack(clips)
+
+
+class RowWriter:
+    """Streams result rows to CSV or Parquet."""
+
+    def __init__(self, path):
+        self.parquet = path.endswith('.parquet')
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            self._pa = pa
+            self._schema = pa.schema([("key", pa.string()), ("id", pa.string()), ("face", pa.string()),
+                                      ("liveness", pa.float32()), ("matching", pa.float32()),
+                                      ("error", pa.string())])
+            self._writer = pq.ParquetWriter(path, self._schema)
+        else:
+            self._file = open(path, 'w', newline='', encoding='utf-8')
+            self._writer = csv.DictWriter(self._file, fieldnames=COLUMNS)
+            self._writer.writeheader()
+
+    def write(self, rows):
+        if not rows:
+            return
+        if self.parquet:
+            columns = {name: [row.get(name) for row in rows] for name in COLUMNS}
+            self._writer.write_table(self._pa.Table.from_pydict(columns, schema=self._schema))
+        else:
+            self._writer.writerows(rows)
+            self._file.flush()
+
+    def close(self):
+        if self.parquet:
+            self._writer.close()
+        else:
+            self._file.close()
+
+
+def score_batch(model, batch, batched):
+    items = batch["ok"]
+    if not items:
+        return []
+    ids = normalize(batch["id_pixels"])
+    # The traced graph views the clip as [B * SEQ_LEN, ...], so this copies the full
+    # clip (as .repeat did); only decode and worker transfer handle a single frame
+    faces = face_clips(items).contiguous()
+    with torch.inference_mode():
+        if batched:
+            live, match = model(ids, faces)
+        else:
+            outputs = [model(ids[i:i + 1], faces[i:i + 1]) for i in range(len(items))]
+            live = torch.cat([o[0] for o in outputs])
+            match = torch.cat([o[1] for o in outputs])
+    return [{"key": item["key"], "id": item["id"], "face": item["face"],
+             "liveness": float(l), "matching": float(m), "error": None}
+            for item, l, m in zip(items, live.reshape(-1).tolist(), match.reshape(-1).tolist())]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk score ID / face pairs')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--pairs', type=str, help='CSV with id, face (and optional key) columns')
+    source.add_argument('--dir', type=str, help='Directory of <enrollment>/id.* + face.* folders')
+    parser.add_argument('--out', type=str, required=True, help='Output .csv or .parquet')
+    parser.add_argument('--model', type=str, default=DEFAULT_MODEL, help='Path to model file')
+    parser.add_argument('--batch-size', type=int, default=16)
+    parser.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 2) - 1), help='Decode processes')
+    parser.add_argument('--prefetch', type=int, default=4, help='Batches decoded ahead per worker')
+    parser.add_argument('--threads', type=int, help='torch intra-op threads for inference')
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    pairs = read_pairs(args.pairs, args.dir)
+    print(f"Scoring {len(pairs)} pairs with {args.workers} decode worker(s), batch {args.batch_size}")
+
+    model = torch.jit.load(args.model)
+    model.eval()
+    batched = supports_batching(model)
+
+    loader = DataLoader(PairDataset(pairs), batch_size=args.batch_size, collate_fn=collate,
+                        num_workers=args.workers,
+                        prefetch_factor=args.prefetch if args.workers > 0 else None,
+                        persistent_workers=False)
+    writer = RowWriter(args.out)
+    done = failed = 0
+    start = time.perf_counter()
+    try:
+        for batch in loader:
+            rows = score_batch(model, batch, batched)
+            rows += [{"key": item["key"], "id": item["id"], "face": item["face"],
+                      "liveness": None, "matching": None, "error": item["error"]} for item in batch["failed"]]
+            writer.write(rows)
+            done += len(rows)
+            failed += len(batch["failed"])
+            elapsed = time.perf_counter() - start
+            print(f"\r{done}/{len(pairs)} pairs, {done / elapsed:.1f} pairs/s, {failed} failed", end='', flush=True)
+    finally:
+        writer.close()
+    print(f"\n[OK] Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+"""
+Long-running CPU inference service for the eKYC liveness / matching model.
+
+debug_model.py scores one (ID image, face clip) pair per process; this loads
+the TorchScript model once and keeps it warm. Requests are queued and a
+single worker thread groups them into dynamic batches: a batch is run as
+soon as it holds --max-batch requests or the oldest request has waited
+--max-wait-ms, whichever comes first.
+
+    # HTTP service: POST /score {"idImage": <base64>, "faceFrames": [<base64>, ...]}
+    python inference_service.py --port 8100 --max-batch 8 --max-wait-ms 10
+
+    # Also POST /embed {"faces": [[<base64>, ...], ...]} -> {"embeddings": [[128 floats] | null, ...]},
+    # the face embeddings the backend's duplicate-face check uses (FACE_EMBEDDING_URL)
+    python inference_service.py --port 8100 --embedding-model ekyc_face_embedding_mobile.ptl
+
+    # Throughput / p99 latency for several batch caps (dummy_id.png, dummy_face.png)
+    python inference_service.py --bench --batch-sizes 1,2,4,8,16 --requests 256
+"""
+import warnings
+# Suppress the specific numpy/importlib warning on Windows
+warnings.filterwarnings("ignore", category=RuntimeWarning, module="importlib._bootstrap")
+
+import argparse
+import asyncio
+import base64
+import io
+import queue
+import statistics
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import torch
+from PIL import Image
+
+from debug_model import load_image, preprocess_image
+
+DEFAULT_MODEL = 'android/app/src/main/assets/ekyc_model_mobile.ptl'
+# Exported next to the notebook by ekyc-train.ipynb (FaceEmbeddingWrapper); server side only
+DEFAULT_EMBEDDING_MODEL = 'ekyc_face_embedding_mobile.ptl'
+SEQ_LEN = 8
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.webm')
+
+
+def load_face_frames(path, seq_len=SEQ_LEN):
+    """PIL frames for a face clip: seq_len evenly spaced video frames, or one image repeated."""
+    if not path.lower().endswith(VIDEO_EXTENSIONS):
+        return [load_image(path)] * seq_len
+
+    import cv2
+    cap = cv2.VideoCapture(path)
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    wanted = {int(i * max(total - 1, 0) / max(seq_len - 1, 1)) for i in range(seq_len)}
+    frames = []
+    index = 0
+    while len(frames) < seq_len:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        if index in wanted:
+            frames.append(Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)))
+        index += 1
+    cap.release()
+    if not frames:
+        raise ValueError(f"No frames could be read from {path}")
+    # Pad short clips with their last frame, as in training
+    return frames + [frames[-1]] * (seq_len - len(frames))
+
+
+def to_face_tensor(face_frames, seq_len=SEQ_LEN):
+    """Face tensor [seq_len, 3, 224, 224], frames resampled to seq_len."""
+    if len(face_frames) != seq_len:
+        step = len(face_frames) / seq_len
+        face_frames = [face_frames[int(i * step)] for i in range(seq_len)]
+    return torch.stack([preprocess_image(frame) for frame in face_frames])
+
+
+def to_tensors(id_image, face_frames, seq_len=SEQ_LEN):
+    """ID tensor [3, 224, 224] and face tensor [seq_len, 3, 224, 224]."""
+    return preprocess_image(id_image), to_face_tensor(face_frames, seq_len)
+
+
+def supports_batching(model, inputs=None):
+    """The model is traced with batch 1; check it still accepts a larger batch."""
+    inputs = inputs or (torch.zeros(2, 3, 224, 224), torch.zeros(2, SEQ_LEN, 3, 224, 224))
+    with torch.inference_mode():
+        try:
+            outputs = model(*inputs)
+            outputs = outputs if isinstance(outputs, tuple) else (outputs,)
+            if all(output.shape[0] == 2 for output in outputs):
+                return True
+        except Exception as e:
+            print(f"[WARN] Batched inference failed ({e})")
+    print("[WARN] Model only accepts batch size 1, batching disabled")
+    return False
+
+
+class BatchingInferenceService:
+    def __init__(self, model_path=DEFAULT_MODEL, max_batch=8, max_wait_ms=10.0, threads=None):
+        if threads:
+            torch.set_num_threads(threads)
+        self.model = torch.jit.load(model_path)
+        self.model.eval()
+        self.max_wait = max_wait_ms / 1000
+        self.max_batch = max_batch if supports_batching(self.model, self._probe_inputs()) else 1
+
+        self._queue = queue.Queue()
+        self._closed = False
+        self.batches = 0
+        self.items = 0
+        self._worker = threading.Thread(target=self._run, name="inference-batcher", daemon=True)
+        self._worker.start()
+
+    def _probe_inputs(self):
+        """A batch of 2 dummy inputs for supports_batching."""
+        return torch.zeros(2, 3, 224, 224), torch.zeros(2, SEQ_LEN, 3, 224, 224)
+
+    def _forward(self, id_batch, face_batch):
+        """One batched model call; one (liveness_score, matching_score) per item."""
+        live, match = self.model(id_batch, face_batch)
+        return list(zip(live.reshape(-1).tolist(), match.reshape(-1).tolist()))
+
+    def submit(self, *tensors):
+        """Queue one item (the model's inputs without the batch dimension); the Future resolves to its result."""
+        if self._closed:
+            raise RuntimeError("Inference service is closed")
+        future = Future()
+        self._queue.put((tensors, future))
+        return future
+
+    def score(self, id_tensor, face_tensor):
+        return self.submit(id_tensor, face_tensor).result()
+
+    def _next_batch(self):
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)  # let the outer loop see the shutdown
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            self.batches += 1
+            self.items += len(batch)
+            try:
+                inputs = [torch.stack(column) for column in zip(*(tensors for tensors, _ in batch))]
+                with torch.inference_mode():
+                    results = self._forward(*inputs)
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+
+    def close(self):
+        self._closed = True
+        self._queue.put(None)
+        self._worker.join()
+
+    def stats(self):
+        return {
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait * 1000,
+            "queued": self._queue.qsize(),
+            "batches": self.batches,
+            "requests": self.items,
+            "mean_batch": self.items / self.batches if self.batches else 0.0,
+        }
+
+
+class FaceEmbeddingService(BatchingInferenceService):
+    """Batched face embeddings: face tensor [SEQ_LEN, 3, 224, 224] -> 128 floats (L2-normalized)."""
+
+    def __init__(self, model_path=DEFAULT_EMBEDDING_MODEL, max_batch=8, max_wait_ms=10.0, threads=None):
+        super().__init__(model_path, max_batch, max_wait_ms, threads)
+
+    def _probe_inputs(self):
+        return (torch.zeros(2, SEQ_LEN, 3, 224, 224),)
+
+    def _forward(self, face_batch):
+        return self.model(face_batch).tolist()
+
+
+def create_app(service, embedding_service=None):
+    from fastapi import FastAPI, HTTPException
+    from pydantic import BaseModel
+    from starlette.concurrency import run_in_threadpool
+
+    class ScoreRequest(BaseModel):
+        idImage: str            # base64 JPEG / PNG
+        faceFrames: list[str]   # base64 frames of the face clip, resampled to SEQ_LEN
+
+    class EmbedRequest(BaseModel):
+        faces: list[list[str]]  # face clips, base64 frames each (as faceFrames above)
+
+    app = FastAPI(title="eKYC Inference Service")
+
+    def decode(data):
+        return Image.open(io.BytesIO(base64.b64decode(data))).convert('RGB')
+
+    @app.post("/score")
+    async def score(request: ScoreRequest):
+        if not request.faceFrames:
+            raise HTTPException(status_code=400, detail="faceFrames is empty")
+        try:
+            # Decoding and preprocessing run in the threadpool, inference in the batcher
+            id_tensor, face_tensor = await run_in_threadpool(
+                lambda: to_tensors(decode(request.idImage), [decode(f) for f in request.faceFrames]))
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Invalid image: {e}")
+        live, match = await asyncio.wrap_future(service.submit(id_tensor, face_tensor))
+        return {"liveness": live, "matching": match}
+
+    @app.post("/embed")
+    async def embed(request: EmbedRequest):
+        if embedding_service is None:
+            raise HTTPException(status_code=503, detail="No face embedding model loaded (--embedding-model)")
+
+        def prepare(frames):
+            # An unreadable clip gets a null embedding instead of failing the whole request
+            try:
+                return to_face_tensor([decode(f) for f in frames]) if frames else None
+            except Exception:
+                return None
+
+        tensors = await run_in_threadpool(lambda: [prepare(frames) for frames in request.faces])
+        results = iter(await asyncio.gather(*(asyncio.wrap_future(embedding_service.submit(t))
+                                              for t in tensors if t is not None)))
+        return {"embeddings": [next(results) if t is not None else None for t in tensors]}
+
+    @app.get("/stats")
+    def stats():
+        if embedding_service is None:
+            return service.stats()
+        return {**service.stats(), "embedding": embedding_service.stats()}
+
+    return app
+
+
+def benchmark(args):
+    id_tensor, face_tensor = to_tensors(load_image(args.id), load_face_frames(args.face))
+    print(f"{'max batch':>10}{'mean batch':>12}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for max_batch in (int(b) for b in args.batch_sizes.split(",")):
+        service = BatchingInferenceService(args.model, max_batch, args.max_wait_ms, args.threads)
+        for _ in range(3):
+            service.score(id_tensor, face_tensor)
+        service.batches = service.items = 0
+
+        # Enough concurrent callers to fill every batch
+        latencies = []
+
+        def one(_):
+            start = time.perf_counter()
+            service.score(id_tensor, face_tensor)
+            latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(2 * service.max_batch, 2)) as pool:
+            list(pool.map(one, range(args.requests)))
+        elapsed = time.perf_counter() - start
+        stats = service.stats()
+        service.close()
+
+        latencies.sort()
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        print(f"{service.max_batch:>10}{stats['mean_batch']:>12.2f}{args.requests / elapsed:>10.1f}"
+              f"{statistics.median(latencies) * 1000:>10.1f}{p99 * 1000:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Batched eKYC inference service')
+    parser.add_argument('--model', type=str, default=DEFAULT_MODEL, help='Path to model file')
+    parser.add_argument('--embedding-model', type=str, nargs='?', const=DEFAULT_EMBEDDING_MODEL,
+                        help=f'Also serve POST /embed with this face embedding model (default: {DEFAULT_EMBEDDING_MODEL})')
+    parser.add_argument('--max-batch', type=int, default=8)
+    parser.add_argument('--max-wait-ms', type=float, default=10.0)
+    parser.add_argument('--threads', type=int, help='torch intra-op threads (default: torch decides)')
+    parser.add_argument('--host', type=str, default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8100)
+    parser.add_argument('--bench', action='store_true', help='Benchmark batch sizes instead of serving')
+    parser.add_argument('--batch-sizes', type=str, default='1,2,4,8,16')
+    parser.add_argument('--requests', type=int, default=256)
+    parser.add_argument('--id', type=str, default='dummy_id.png', help='ID image for --bench')
+    parser.add_argument('--face', type=str, default='dummy_face.png', help='Face image or video for --bench')
+    args = parser.parse_args()
+
+    if args.bench:
+        benchmark(args)
+        return
+
+    import uvicorn
+    service = BatchingInferenceService(args.model, args.max_batch, args.max_wait_ms, args.threads)
+    print(f"[OK] Model loaded, max batch {service.max_batch}, max wait {args.max_wait_ms} ms")
+    embedding_service = None
+    if args.embedding_model:
+        embedding_service = FaceEmbeddingService(args.embedding_model, args.max_batch, args.max_wait_ms, args.threads)
+        print(f"[OK] Face embedding model loaded, max batch {embedding_service.max_batch}")
+    try:
+        uvicorn.run(create_app(service, embedding_service), host=args.host, port=args.port)
+    finally:
+        service.close()
+        if embedding_service is not None:
+            embedding_service.close()
+
+
+if __name__ == "__main__":
+    main()